@@ -1,12 +1,30 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base_agent import BaseAgent
+from app.core.handoff import stage_result
+from app.core.structured import STRING, array_of, object_of
 import json
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+_RANKED_ACTION = object_of({
+    "rank": {"type": "integer", "minimum": 1},
+    "title": STRING,
+    "justification": STRING,
+})
+
+# Structured output: the JSON layout the system prompt already asks for, now enforced
+BACKCASTING_SCHEMA = object_of({
+    "near_term_prioritization": array_of(_RANKED_ACTION),
+    "medium_term_prioritization": array_of(_RANKED_ACTION),
+    "long_term_prioritization": array_of(_RANKED_ACTION),
+})
+
 class BackcastingAgent(BaseAgent):
+    consumes = ["high_impact"]
+    output_schema = BACKCASTING_SCHEMA
+
     def get_system_prompt(self) -> str:
         return """You are the Backcasting Agent, a strategic prioritization specialist tasked with ranking immediate action items from highest to lowest priority to guide sequencing, resource allocation, and strategic focus.
 
@@ -90,8 +108,7 @@ Guidelines for the Agent
         strategic_question = input_data.get('strategic_question', 'N/A')
         
         # Extract High-Impact Initiatives Agent output
-        high_impact_data = input_data.get('high_impact', {}).get('data', {})
-        execution_ready_initiatives = high_impact_data.get('execution_ready_initiatives', [])
+        execution_ready_initiatives = stage_result(input_data, 'high_impact').structured or []
         
         # Extract immediate action items organized by time horizon
         near_term_actions = []
@@ -137,13 +154,13 @@ Guidelines for the Agent
         near_term_text = format_actions(near_term_actions, "Near-Term (0-2 years)")
         medium_term_text = format_actions(medium_term_actions, "Medium-Term (2-5 years)")
         long_term_text = format_actions(long_term_actions, "Long-Term (5-10 years)")
+        actions_text = self.condense_context("\n".join([near_term_text, medium_term_text, long_term_text]))
         
         return f"""Original Problem Statement: {strategic_question}
 
 High-Impact Initiatives Agent provided the following immediate action items:
-{near_term_text}
-{medium_term_text}
-{long_term_text}
+
+{actions_text}
 
 INSTRUCTIONS: 
 1. Prioritize EACH immediate action item within its time horizon using the 3 criteria (Urgency, Impact, Feasibility)
@@ -156,6 +173,9 @@ Focus on creating an actionable priority sequence that decision-makers can execu
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             prompt = self.format_prompt(input_data)
+            if self.structured_output:
+                return self.format_output(await self.invoke_structured(prompt))
+
             response = await self.invoke_llm(prompt)
             
             # Parse JSON from response
@@ -288,7 +308,7 @@ Focus on creating an actionable priority sequence that decision-makers can execu
             ]
         }
 
-    def format_output(self, prioritization_data: Dict[str, Any], response: str) -> Dict[str, Any]:
+    def format_output(self, prioritization_data: Dict[str, Any], response: Optional[str] = None) -> Dict[str, Any]:
         """Format the output in a structured way."""
         # Create a human-readable markdown format
         markdown_output = "\n\n"
@@ -314,11 +334,14 @@ Focus on creating an actionable priority sequence that decision-makers can execu
             else:
                 markdown_output += f"# {section_title}\n\nNo action items identified for this time horizon.\n\n"
         
+        data = {
+            "prioritized_actions": prioritization_data,
+            "formatted_output": markdown_output
+        }
+        # Structured replies keep no raw text
+        if response is not None:
+            data["raw_llm_response"] = response
         return {
             "status": "success",
-            "data": {
-                "prioritized_actions": prioritization_data,
-                "formatted_output": markdown_output,
-                "raw_llm_response": response
-            }
+            "data": data
         }
\ No newline at end of file
@@ -1,8 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from langchain_core.messages import HumanMessage, SystemMessage
 import asyncio
-from app.core.llm import get_llm
+from app.core.llm import get_llm, llm_pool, DEFAULT_MODEL
+from app.core.llm_cache import llm_cache, cache_bypassed
+from app.core.singleflight import llm_singleflight
+from app.core.rate_limiter import llm_rate_limiter, estimate_tokens
+from app.core import concurrency
+from app.core.concurrency import llm_concurrency
+from app.core.deadline import current_budget, BudgetExhausted
+from app.core.streaming import streaming_enabled, emit_event, tagged_events, parsed_events
+from app.core.section_parser import IncrementalSectionParser
+from app.core.profiles import current_output_token_limit
+from app.core.condensation import context_condenser
+from app.core.structured import (
+    LLM_STRUCTURED_OUTPUT, JSON_GENERATION_CONFIG, StructuredOutputError,
+    schema_instructions, parse_structured_response,
+)
 import json
 import logging
 import sys
@@ -26,8 +40,19 @@ logging.getLogger('httpcore').setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
 class BaseAgent(ABC):
+    # Model profile borrowed from the shared LLM client pool (None = process default)
+    llm_model = None
+    llm_settings: Dict[str, Any] = {}
+    # Upstream agent outputs (input_data keys) read by format_prompt; drives pipeline scheduling
+    consumes: List[str] = []
+    # JSON schema of the agent's result when LLM_STRUCTURED_OUTPUT is on (None = markdown only)
+    output_schema: Optional[Dict[str, Any]] = None
+    # Whether streamed text replies are split into "section" events (see match_section_header)
+    streams_sections = False
+    # LLM calls one run of the agent makes; sizes the analysis attempt budget
+    llm_calls = 1
+
     def __init__(self):
-        self.llm = get_llm()
         self.max_retries = 3  # Reduced retries for deployment
         self.timeout = 90  # Reduced timeout for deployment constraints
         self.base_retry_delay = 1  # Faster retry for deployment
@@ -35,6 +60,24 @@ class BaseAgent(ABC):
         self.required_fields = ['strategic_question', 'time_frame', 'region']
         self.optional_fields = ['additional_context', 'analysis_depth', 'creativity_level', 'focus_areas']
 
+    @property
+    def structured_output(self) -> bool:
+        """Whether this agent asks for schema-constrained JSON instead of markdown"""
+        return LLM_STRUCTURED_OUTPUT and self.output_schema is not None
+
+    @property
+    def llm(self):
+        """Shared LLM client for this agent, borrowed from the process-wide pool"""
+        return get_llm(self.llm_model, **self._effective_llm_settings())
+
+    def _effective_llm_settings(self) -> Dict[str, Any]:
+        """The agent's settings, with max_output_tokens lowered for a degraded (shortened) stage"""
+        limit = current_output_token_limit()
+        if limit is None:
+            return self.llm_settings
+        current = llm_pool.settings_for(self.llm_model or DEFAULT_MODEL, **self.llm_settings).get("max_output_tokens")
+        return {**self.llm_settings, "max_output_tokens": min(limit, current) if current else limit}
+
     @abstractmethod
     def get_system_prompt(self) -> str:
         """
@@ -140,6 +183,31 @@ class BaseAgent(ABC):
         
         return " ".join(instructions) if instructions else ""
 
+    def condense_context(self, text: str) -> str:
+        """Upstream stage output, compacted before it is inlined in this agent's prompt"""
+        return context_condenser.condense(text, self.__class__.__name__)
+
+    def match_section_header(self, line: str) -> Optional[str]:
+        """Key of the section a (stripped) response line opens, or None if it is not a header"""
+        return None
+
+    def format_section(self, key: str, index: int, lines: List[str]) -> Any:
+        """Structured data of one completed section of a streamed response"""
+        return "\n".join(lines)
+
+    def section_parser(self) -> IncrementalSectionParser:
+        """Incremental parser that emits a "section" event for each section as it completes"""
+        def on_section(key: str, index: int, lines: List[str]):
+            try:
+                data = self.format_section(key, index, lines)
+            except Exception as e:
+                # Early sections are a convenience; the final result is parsed from the full text
+                logger.warning(f"{self.__class__.__name__}: could not format streamed section {key}: {e}")
+                return
+            if data is not None:
+                emit_event({"event": "section", "section": key, "index": index, "data": data})
+        return IncrementalSectionParser(self.match_section_header, on_section)
+
     def format_output(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Format the output data"""
         return {
@@ -159,49 +227,156 @@ class BaseAgent(ABC):
             "too many requests" in error_str
         )
 
-    async def invoke_llm(self, prompt: str) -> str:
-        """Invoke the LLM with enhanced retry logic for rate limits and timeout"""
+    def _response_cache_key(self, prompt: str) -> str:
+        """Content hash of everything that determines this agent's LLM output"""
+        model = self.llm_model or DEFAULT_MODEL
+        settings = llm_pool.settings_for(model, **self._effective_llm_settings())
+        return llm_cache.make_key(model, settings, self.system_prompt, prompt)
+
+    async def invoke_structured(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Invoke the LLM in JSON mode for a result matching the schema (output_schema by default),
+        validated in one pass. Raises StructuredOutputError (and drops the reply from the cache)
+        if it does not match."""
+        schema = schema or self.output_schema
+        prompt = f"{prompt}\n\n{schema_instructions(schema)}"
+        with tagged_events(format="json"):
+            response = await self.invoke_llm(prompt, generation_config=JSON_GENERATION_CONFIG)
+        try:
+            return parse_structured_response(response, schema)
+        except StructuredOutputError as e:
+            await llm_cache.discard(self._response_cache_key(prompt))
+            logger.error(f"{self.__class__.__name__}: structured reply rejected: {e}")
+            raise
+
+    async def invoke_llm(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        """Invoke the LLM, serving repeated prompts from the shared response cache
+        and joining an identical call that is already in flight"""
+        # Streamed text replies are also reported section by section as each one completes
+        parser = None
+        if self.streams_sections and generation_config is None and streaming_enabled():
+            parser = self.section_parser()
+        with parsed_events(parser):
+            return await self._invoke_llm_cached(prompt, generation_config)
+
+    async def _invoke_llm_cached(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        cache_key = self._response_cache_key(prompt)
+        if llm_cache.enabled:
+            cached_response = await llm_cache.get(cache_key)
+            if cached_response is not None:
+                logger.info(f"{self.__class__.__name__}: served response from LLM cache")
+                emit_event({"event": "delta", "text": cached_response, "cached": True})
+                return cached_response
+
+        # Requests that opted out of the cache want a fresh generation of their own
+        if cache_bypassed():
+            return await self._invoke_and_store(prompt, cache_key, generation_config)
+
+        if llm_singleflight.in_flight(cache_key):
+            logger.info(f"{self.__class__.__name__}: joining identical in-flight LLM call")
+            # A streamed call relays its deltas, from the first one, to every caller that joins it
+            relayed = llm_singleflight.streaming(cache_key)
+            response = await llm_singleflight.do(cache_key, lambda: self._invoke_and_store(prompt, cache_key, generation_config))
+            if not relayed:
+                emit_event({"event": "delta", "text": response, "coalesced": True})
+            return response
+        return await llm_singleflight.do(cache_key, lambda: self._invoke_and_store(prompt, cache_key, generation_config))
+
+    async def _invoke_and_store(self, prompt: str, cache_key: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        response = await self._invoke_llm_with_retries(prompt, generation_config)
+        await llm_cache.set(cache_key, response)
+        return response
+
+    async def _invoke_llm_with_retries(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        """Invoke the LLM with retries for rate limits and timeouts, within the request's deadline and attempt budget"""
+        budget = current_budget()
+        messages = [
+            SystemMessage(content=self.system_prompt),
+            HumanMessage(content=prompt)
+        ]
         for attempt in range(self.max_retries):
+            if budget:
+                budget.start_attempt(retry=attempt > 0)
             try:
-                messages = [
-                    SystemMessage(content=self.system_prompt),
-                    HumanMessage(content=prompt)
-                ]
-                
-                response = await asyncio.wait_for(
-                    self.llm.ainvoke(messages),
-                    timeout=self.timeout
-                )
+                if streaming_enabled() and attempt > 0:
+                    # Tell listeners to discard partial text from the failed attempt
+                    emit_event({"event": "retry", "attempt": attempt + 1})
+                content = await self._call_llm(messages, prompt, generation_config)
                 
-                return response.content
+                await llm_rate_limiter.settle(estimate_tokens(content))
+                return content
                 
+            except BudgetExhausted:
+                raise
+            
             except asyncio.TimeoutError:
-                if attempt < self.max_retries - 1:
-                    delay = self.base_retry_delay * (2 ** attempt) + random.uniform(0, 1)
-                    logger.warning(f"Timeout on attempt {attempt + 1}, retrying in {delay:.2f} seconds...")
-                    await asyncio.sleep(delay)
-                    continue
-                raise TimeoutError(f"Agent timed out. Please try again with a more focused prompt.")
+                error = TimeoutError("Agent timed out. Please try again with a more focused prompt.")
+                reason = "Timeout"
+                delay = self.base_retry_delay * (2 ** attempt) + random.uniform(0, 1)
             
             except Exception as e:
                 if self.is_rate_limit_error(e):
-                    if attempt < self.max_retries - 1:
-                        # Exponential backoff with jitter for rate limit errors
-                        delay = self.base_retry_delay * (2 ** attempt) + random.uniform(0, 2)
-                        logger.warning(f"Rate limit hit on attempt {attempt + 1}, retrying in {delay:.2f} seconds...")
-                        await asyncio.sleep(delay)
-                        continue
-                    raise HTTPException(
+                    # Exponential backoff with jitter for rate limit errors
+                    error = HTTPException(
                         status_code=429,
                         detail="Rate limit exceeded. Please try again later."
                     )
+                    reason = "Rate limit hit"
+                    delay = self.base_retry_delay * (2 ** attempt) + random.uniform(0, 2)
                 else:
-                    if attempt < self.max_retries - 1:
-                        delay = self.base_retry_delay + random.uniform(0, 1)
-                        logger.warning(f"Error on attempt {attempt + 1}: {str(e)}, retrying in {delay:.2f} seconds...")
-                        await asyncio.sleep(delay)
-                        continue
-                    raise e
+                    error = e
+                    reason = f"Error ({str(e)})"
+                    delay = self.base_retry_delay + random.uniform(0, 1)
+            
+            if attempt == self.max_retries - 1:
+                raise error
+            if budget and not budget.allows_retry(delay):
+                logger.warning(f"{reason} on attempt {attempt + 1}, not retrying: analysis budget exhausted")
+                raise error
+            logger.warning(f"{reason} on attempt {attempt + 1}, retrying in {delay:.2f} seconds...")
+            await asyncio.sleep(delay)
+
+    async def _call_llm(self, messages: List[Any], prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        """Single upstream attempt inside an adaptive concurrency slot"""
+        # Per-call generation settings (e.g. JSON mode) go with the request, not the pooled client
+        call_kwargs = {"generation_config": generation_config} if generation_config else {}
+        await llm_concurrency.acquire()
+        started_at = None
+        timeout = self.timeout
+        outcome = concurrency.ERROR
+        try:
+            # Every upstream attempt draws from the process-wide RPM/TPM budget
+            await llm_rate_limiter.acquire(estimate_tokens(self.system_prompt, prompt))
+            # Never wait past the analysis deadline
+            budget = current_budget()
+            timeout = budget.attempt_timeout(self.timeout) if budget else self.timeout
+            started_at = time.monotonic()
+            if streaming_enabled():
+                content = await asyncio.wait_for(self._stream_llm(messages, **call_kwargs), timeout=timeout)
+            else:
+                response = await asyncio.wait_for(self.llm.ainvoke(messages, **call_kwargs), timeout=timeout)
+                content = response.content
+            outcome = concurrency.SUCCESS
+            return content
+        except asyncio.TimeoutError:
+            # Hitting a deadline-clipped timeout says nothing about provider load
+            outcome = concurrency.TIMEOUT if timeout >= self.timeout else concurrency.ERROR
+            raise
+        except Exception as e:
+            if self.is_rate_limit_error(e):
+                outcome = concurrency.RATE_LIMITED
+            raise
+        finally:
+            llm_concurrency.release(started_at, outcome)
+
+    async def _stream_llm(self, messages: List[Any], **call_kwargs) -> str:
+        """Stream the response, emitting each text delta, and return the full text"""
+        parts = []
+        async for chunk in self.llm.astream(messages, **call_kwargs):
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            if text:
+                parts.append(text)
+                emit_event({"event": "delta", "text": text})
+        return "".join(parts)
 
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process the input data and return the result"""
@@ -215,8 +390,8 @@ class BaseAgent(ABC):
             # Add customization instructions to the prompt
             customization_instructions = self.get_customization_instructions(input_data)
             if customization_instructions:
-                # Add customization instructions to the input data
-                input_data['customization_instructions'] = customization_instructions
+                # Add customization instructions to (a copy of) the shared, read-only input data
+                input_data = {**input_data, 'customization_instructions': customization_instructions}
                 logger.info(f"Customization instructions: {customization_instructions}")
             
             prompt = self.format_prompt(input_data)
@@ -1,10 +1,35 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from .base_agent import BaseAgent
+from app.core.handoff import stage_result
+from app.core.structured import STRING, array_of, object_of, string_list
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Structured output: three case studies plus the next practice recommendation
+BEST_PRACTICES_SCHEMA = object_of({
+    "best_practices": array_of(object_of({
+        "title": STRING,
+        "time_frame": STRING,
+        "organization": STRING,
+        "challenge": STRING,
+        "problem": STRING,
+        "solution": STRING,
+        "implementation_steps": string_list(min_items=1),
+        "results": STRING,
+        "tags": string_list(),
+        "reference": STRING,
+    }), min_items=1, max_items=3),
+    "next_practice": STRING,
+    "implementation_steps": string_list(min_items=1),
+    "success_metrics": string_list(min_items=1),
+})
+
 class BestPracticesAgent(BaseAgent):
+    consumes = ["problem_explorer"]
+    output_schema = BEST_PRACTICES_SCHEMA
+    streams_sections = True
+
     def get_system_prompt(self) -> str:
         return """You are the Best Practices Research Agent - an advanced analytical specialist trained to conduct rigorous, cross-domain investigations into proven solutions for challenges similar to the one presented.
 
@@ -121,7 +146,7 @@ Output Guidelines
         time_frame = input_data.get('time_frame', 'N/A')
         region = input_data.get('region', 'N/A')
         # Get the structured output from ProblemExplorerAgent
-        problem_explorer_output = input_data.get('problem_explorer', {}).get('data', {}).get('structured_output', {})
+        problem_explorer_output = stage_result(input_data, 'problem_explorer').structured or {}
         
         problem_context = ""
         if problem_explorer_output:
@@ -134,6 +159,7 @@ Output Guidelines
             acknowledgment = problem_explorer_output.get('acknowledgment', '')
             if acknowledgment:
                 problem_context = f"{acknowledgment}\n{problem_context}" # Prepend acknowledgment
+        problem_context = self.condense_context(problem_context)
         
         return f"""Strategic Question: {strategic_question}
 Time Frame: {time_frame}
@@ -147,6 +173,9 @@ Please provide 3 best practices and a next practice recommendation."""
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             prompt = self.format_prompt(input_data)
+            if self.structured_output:
+                return self._format_structured_output(await self.invoke_structured(prompt))
+
             response = await self.invoke_llm(prompt)
             
             # Extract references from the response
@@ -207,6 +236,62 @@ Please provide 3 best practices and a next practice recommendation."""
         
         return practices
 
+    def match_section_header(self, line: str) -> Optional[str]:
+        if line.startswith('### Best Practice'):
+            return 'best_practice'
+        if line.startswith('### '):
+            # Next Practice Recommendation, Key Implementation Steps, Success Metrics
+            return 'recommendation'
+        return None
+
+    def format_section(self, key: str, index: int, lines: List[str]) -> Any:
+        if key == 'best_practice':
+            practices = self._parse_practices("\n".join(lines))
+            return {**practices[0], "number": index} if practices else None
+        return {"title": lines[0].strip().lstrip('#').strip(), "content": "\n".join(lines[1:]).strip()}
+
+    def _render_practice(self, practice: Dict[str, Any]) -> str:
+        """One case study in the markdown layout of the text reply, from its title line on"""
+        steps = "\n".join(f"{i}. {step}" for i, step in enumerate(practice['implementation_steps'], 1))
+        return (
+            f"{practice['title']}\n"
+            f"**Time Frame:** {practice['time_frame']}\n"
+            f"**Organization:** {practice['organization']}\n"
+            f"**Challenge:** {practice['challenge']}\n"
+            f"**Problem:** {practice['problem']}\n"
+            f"**Solution:** {practice['solution']}\n"
+            f"**Implementation Steps:**\n{steps}\n"
+            f"**Results:** {practice['results']}\n"
+            f"**Categorical Tags:** {', '.join(practice['tags'])}\n"
+            f"**Reference:** {practice['reference']}"
+        )
+
+    def _format_structured_output(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Practices, references and markdown built from a validated structured reply"""
+        practices = []
+        references = []
+        markdown_output = " \n\n"
+        for number, practice in enumerate(result['best_practices'], 1):
+            content = self._render_practice(practice)
+            practices.append({"number": number, "title": practice['title'], "content": content})
+            references.append({"id": number, "title": f"Best Practice {number} Reference", "source": practice['reference']})
+            markdown_output += f"# Best Practice {number}: {content}\n\n---\n\n"
+
+        markdown_output += f"# Next Practice Recommendation\n{result['next_practice']}\n\n"
+        markdown_output += "# Key Implementation Steps\n"
+        markdown_output += "".join(f"{i}. {step}\n" for i, step in enumerate(result['implementation_steps'], 1))
+        markdown_output += "\n# Success Metrics\n"
+        markdown_output += "".join(f"{i}. {metric}\n" for i, metric in enumerate(result['success_metrics'], 1))
+
+        return {
+            "status": "success",
+            "data": {
+                "structured_practices": practices,
+                "references": references,
+                "formatted_output": markdown_output
+            }
+        }
+
     def format_output(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Format the output in a structured way."""
         raw_response = data.get("raw_response", "")
@@ -1,5 +1,7 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base_agent import BaseAgent
+from app.core.handoff import stage_result
+from app.core.structured import STRING, array_of, object_of, one_of, string_list
 import json
 import re
 import asyncio
@@ -7,7 +9,24 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Structured output: exactly one initiative per time horizon
+HIGH_IMPACT_SCHEMA = object_of({
+    "initiatives": array_of(object_of({
+        "title": STRING,
+        "time_horizon": one_of("Near-Term", "Medium-Term", "Long-Term"),
+        "why_important": STRING,
+        "who_it_impacts": STRING,
+        "estimated_cost": STRING,
+        "success_metrics": string_list(min_items=1),
+        "immediate_tasks": string_list(min_items=1, max_items=5),
+    }), min_items=3, max_items=3),
+})
+
 class HighImpactAgent(BaseAgent):
+    consumes = ["research_synthesis", "strategic_action"]
+    output_schema = HIGH_IMPACT_SCHEMA
+    streams_sections = True
+
     def __init__(self):
         super().__init__()
         # Increase timeout for High Impact Agent as it processes complex data
@@ -136,8 +155,7 @@ Guidelines for the Agent
         strategic_question = input_data.get('strategic_question', 'N/A')
         
         # Extract Strategic Action Agent output
-        strategic_action_data = input_data.get('strategic_action', {}).get('data', {})
-        action_plan_sections = strategic_action_data.get('structured_action_plan', {})
+        action_plan_sections = stage_result(input_data, 'strategic_action').structured or {}
         
         # Group high-priority items by time horizon
         high_priority_by_horizon = {
@@ -176,7 +194,7 @@ Guidelines for the Agent
                 high_priority_text += f"No high-priority actions identified for {horizon} timeframe.\n\n"
         
         # Also include research synthesis insights if available
-        research_synthesis = input_data.get('research_synthesis', {}).get('data', {}).get('structured_synthesis', {})
+        research_synthesis = stage_result(input_data, 'research_synthesis').structured or {}
         insights_text = ""
         if research_synthesis:
             insights_text = "\n\nKey Research Insights:\n"
@@ -189,8 +207,10 @@ Guidelines for the Agent
         return f"""Original Problem Statement: {strategic_question}
 
 Additional Context: {input_data.get('prompt', 'None provided')}
-{high_priority_text}
-{insights_text}
+
+{self.condense_context(high_priority_text)}
+
+{self.condense_context(insights_text)}
 
 INSTRUCTIONS: Create exactly 3 comprehensive initiatives - one for each time horizon. Each initiative should combine ALL the high-priority actions within that time horizon into one strategic implementation plan.
 
@@ -223,9 +243,9 @@ Create exactly 3 initiatives total. Make titles specific and descriptive based o
             logger.info(f"Generated prompt length: {len(prompt)} characters")
             
             # Check if we have strategic action data
-            strategic_action_data = input_data.get('strategic_action', {}).get('data', {})
-            action_plan_sections = strategic_action_data.get('structured_action_plan', {})
-            logger.info(f"Strategic action data keys: {list(strategic_action_data.keys())}")
+            strategic_action = stage_result(input_data, 'strategic_action')
+            action_plan_sections = strategic_action.structured or {}
+            logger.info(f"Strategic action data keys: {list(strategic_action.data.keys())}")
             logger.info(f"Action plan sections keys: {list(action_plan_sections.keys())}")
             
             # Count high-priority items across all time horizons
@@ -269,6 +289,11 @@ Create exactly 3 initiatives total. Make titles specific and descriptive based o
             
             # Try to get LLM response with better error handling
             try:
+                if self.structured_output:
+                    # The schema guarantees three complete initiatives, so no parsing or fallback set
+                    result = await self.invoke_structured(prompt)
+                    return self.format_output(result["initiatives"])
+
                 logger.info("Invoking LLM for High Impact analysis...")
                 response = await self.invoke_llm(prompt)
                 logger.info(f"LLM response received, length: {len(response)} characters")
@@ -382,6 +407,14 @@ Create exactly 3 initiatives total. Make titles specific and descriptive based o
                 "agent_type": self.__class__.__name__
             }
 
+    def match_section_header(self, line: str) -> Optional[str]:
+        # Every blueprint starts at its title line
+        return 'blueprint' if line.startswith('**Title:**') else None
+
+    def format_section(self, key: str, index: int, lines: List[str]) -> Any:
+        blueprints = self._parse_blueprints("\n".join(lines))
+        return blueprints[0] if blueprints else None
+
     def _parse_blueprints(self, response: str) -> List[Dict[str, Any]]:
         """Parse the text-based blueprint format from LLM response"""
         blueprints = []
@@ -493,7 +526,7 @@ Create exactly 3 initiatives total. Make titles specific and descriptive based o
         
         return blueprints
 
-    def format_output(self, blueprints: List[Dict[str, Any]], response: str) -> Dict[str, Any]:
+    def format_output(self, blueprints: List[Dict[str, Any]], response: Optional[str] = None) -> Dict[str, Any]:
         """Format the output in a structured way."""
         # Create a human-readable markdown format
         markdown_output = "\n\n"
@@ -531,11 +564,14 @@ Create exactly 3 initiatives total. Make titles specific and descriptive based o
                 if i < len(blueprints):  # Don't add separator after last item
                     markdown_output += "---\n\n"
 
+        data = {
+            "execution_ready_initiatives": blueprints,
+            "formatted_output": markdown_output
+        }
+        # Structured replies keep no raw text
+        if response is not None:
+            data["raw_llm_response"] = response
         return {
             "status": "success",
-            "data": {
-                "execution_ready_initiatives": blueprints,
-                "formatted_output": markdown_output,
-                "raw_llm_response": response
-            }
+            "data": data
         } 
\ No newline at end of file
@@ -1,11 +1,31 @@
 from typing import Dict, Any, List
 from .base_agent import BaseAgent
+from app.core.handoff import stage_result
+from app.core.structured import STRING, array_of, object_of, one_of
 import logging
 import asyncio
 
 logger = logging.getLogger(__name__)
 
+_SCAN_ITEM = object_of({
+    "title": STRING,
+    "domain": STRING,
+    "description": STRING,
+    "impact": {"type": "integer", "minimum": 1, "maximum": 10},
+    "time": one_of("Near", "Medium", "Long"),
+})
+
+# Structured output: the three scan sections of the markdown format
+HORIZON_SCANNING_SCHEMA = object_of({
+    "weak_signals": array_of(_SCAN_ITEM, min_items=1),
+    "key_uncertainties": array_of(_SCAN_ITEM, min_items=1),
+    "change_drivers": array_of(object_of({"category": STRING, "description": STRING}), min_items=1),
+})
+
 class HorizonScanningAgent(BaseAgent):
+    consumes = ["problem_explorer"]
+    output_schema = HORIZON_SCANNING_SCHEMA
+
     def get_system_prompt(self) -> str:
         return """You are the Strategic Horizon Scanning Agent, a foresight-focused analytical system designed to anticipate emerging change, surface early signals, and map strategic uncertainties.
 
@@ -120,7 +140,7 @@ Output Guidelines
         time_frame = input_data.get('time_frame', 'N/A')
         region = input_data.get('region', 'N/A')
         
-        problem_explorer_data = input_data.get('problem_explorer', {}).get('data', {}).get('structured_output', {})
+        problem_explorer_data = stage_result(input_data, 'problem_explorer').structured or {}
         problem_summary = "Not available."
         if problem_explorer_data:
             # Try to get a concise problem definition from Phase 1 or acknowledgment
@@ -152,6 +172,9 @@ Adhere strictly to the output format sections: ## Weak Signals:, ## Key Uncertai
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             prompt = self.format_prompt(input_data)
+            if self.structured_output:
+                return self._format_structured_output(await self.invoke_structured(prompt))
+
             response = await self.invoke_llm(prompt)
             
             return self.format_output({
@@ -166,6 +189,32 @@ Adhere strictly to the output format sections: ## Weak Signals:, ## Key Uncertai
                 "agent_type": self.__class__.__name__
             }
 
+    def _format_structured_output(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Markdown in the layout of the text reply, built from a validated structured reply"""
+        markdown_output = "\n\n"
+        for key, heading in [("weak_signals", "Weak Signals"), ("key_uncertainties", "Key Uncertainties")]:
+            markdown_output += f"# {heading}:\n\n"
+            for number, item in enumerate(result[key], 1):
+                markdown_output += (
+                    f"**{number}. {item['title']}**\n"
+                    f"- **Domain:** {item['domain']}\n"
+                    f"- **Description:** {item['description']}\n"
+                    f"- **Impact:** {item['impact']}\n"
+                    f"- **Time:** {item['time']}\n\n"
+                )
+            markdown_output += "---\n\n"
+        markdown_output += "# Change Drivers:\n\n"
+        for driver in result["change_drivers"]:
+            markdown_output += f"**{driver['category']}:** {driver['description']}\n\n"
+
+        return {
+            "status": "success",
+            "data": {
+                "structured_scan": result,
+                "formatted_output": markdown_output
+            }
+        }
+
     def format_output(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Format the output in a structured way."""
         raw_response = data.get("raw_response", "")
@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 from .base_agent import BaseAgent
 from .problem_explorer_agent import ProblemExplorerAgent
 from .best_practices_agent import BestPracticesAgent
@@ -8,6 +8,14 @@ from .research_synthesis_agent import ResearchSynthesisAgent
 from .strategic_action_agent import StrategicActionAgent
 from .high_impact_agent import HighImpactAgent
 from .backcasting_agent import BackcastingAgent
+from app.core.llm_cache import llm_cache_bypass
+from app.core.deadline import RequestBudget, request_budget
+from app.core.priority import API, priority_class
+from app.core.profiles import PipelineProfile, get_profile, output_token_limit, SKIPPED
+from app.core.dag import DagScheduler
+from app.core.handoff import StageResult
+from types import MappingProxyType
+from contextlib import contextmanager
 import asyncio
 import time
 from fastapi import HTTPException
@@ -39,7 +47,51 @@ except ImportError as e:
 
 logger = logging.getLogger(__name__)
 
+# Agent display names and the input_data keys their outputs are stored under
+AGENT_KEYS = {
+    "Problem Explorer": "problem_explorer",
+    "Best Practices": "best_practices",
+    "Horizon Scanning": "horizon_scanning",
+    "Scenario Planning": "scenario_planning",
+    "Research Synthesis": "research_synthesis",
+    "Strategic Action": "strategic_action",
+    "High Impact": "high_impact",
+    "Backcasting": "backcasting"
+}
+
+# Session statuses a client may resume from; a processing session is still running somewhere
+RESUMABLE_STATUSES = ["failed", "cancelled"]
+
+class AnalysisRun:
+    """Per-analysis state, so one orchestrator instance can serve concurrent analyses."""
+
+    def __init__(self, budget: Optional[RequestBudget] = None, user_id: Optional[int] = None,
+                 session_id: Optional[int] = None, restored_results: Optional[Dict[str, Any]] = None,
+                 priority: str = API, profile: Optional[PipelineProfile] = None):
+        self.profile = profile or get_profile()
+        self.budget = budget or self.profile.new_budget()
+        self.user_id = user_id
+        # Priority class its LLM calls are dispatched with (interactive, api or bulk)
+        self.priority = priority
+        # Set when resuming a stored session: its id and the agent results that need not run again
+        self.session_id: Optional[int] = session_id
+        # Called with the session id as soon as a new session has been created
+        self.on_session_created: Optional[Callable[[int], None]] = None
+        self.restored_results: Dict[str, Any] = restored_results or {}
+        # Stages the profile skipped or shortened to stay within the deadline: {agent: {"mode", "reason"}}
+        self.degraded_stages: Dict[str, Dict[str, Any]] = {}
+        self.prior_processing_time = 0.0
+        # Status of the stored session when it was loaded for resuming
+        self.prior_status: Optional[str] = None
+        self.session_start_time: Optional[float] = None
+        self.timeline: Optional[Dict[str, Any]] = None
+
 class OrchestratorAgent(BaseAgent):
+    """
+    Long-lived pipeline coordinator. Holds only shared, read-only state (agents and
+    database availability); everything about a particular analysis lives in its AnalysisRun.
+    """
+
     def __init__(self):
         super().__init__()
         # Initialize agents in the desired order
@@ -53,14 +105,9 @@ class OrchestratorAgent(BaseAgent):
             "High Impact": HighImpactAgent(),
             "Backcasting": BackcastingAgent()
         }
-        self.last_request_time = 0
-        self.min_request_interval = 2.0  # Minimum time between requests in seconds
-        self.max_retries = 3
-        self.base_delay = 1.0  # Base delay for exponential backoff
-        
-        # Database session tracking
-        self.current_session_id = None
-        self.session_start_time = None
+        # Pipeline graph, used to budget the stages still ahead of each agent
+        self.dependencies = self.build_scheduler().dependencies
+        # Checked once for the lifetime of the process
         self.db_enabled = self._test_database_connection()
 
     def _test_database_connection(self) -> bool:
@@ -113,30 +160,35 @@ Provide a coordinated analysis plan and execution strategy."""
                 results.append(f"{agent_type.replace('_', ' ').title()}: {input_data[agent_type].get('data', {})}")
         return '\n'.join(results) if results else 'No previous results available'
 
-    def _create_analysis_session(self, input_data: Dict[str, Any]) -> None:
+    def _create_analysis_session(self, run: AnalysisRun, input_data: Dict[str, Any]) -> None:
         """Create database session for the analysis."""
         if not self.db_enabled or not DATABASE_AVAILABLE:
             return
+        if run.session_id:
+            self._reopen_analysis_session(run)
+            return
             
         try:
-            self.current_session_id = DatabaseService.create_analysis_session(
+            run.session_id = DatabaseService.create_analysis_session(
                 strategic_question=input_data.get('strategic_question', ''),
                 time_frame=input_data.get('time_frame', ''),
                 region=input_data.get('region', ''),
                 additional_instructions=input_data.get('prompt', ''),
-                user_id=input_data.get('user_id')
+                user_id=run.user_id or input_data.get('user_id')
             )
-            self.session_start_time = time.time()
+            run.session_start_time = time.time()
             
-            if self.current_session_id:
+            if run.session_id:
                 # Minimal logging - just session creation
-                print(f"Created database session {self.current_session_id}")
+                print(f"Created database session {run.session_id}")
+                if run.on_session_created:
+                    run.on_session_created(run.session_id)
                 # Log session creation
                 DatabaseService.log_system_event(
                     log_level="INFO",
                     component="orchestrator",
-                    message=f"Analysis session {self.current_session_id} started",
-                    session_id=self.current_session_id,
+                    message=f"Analysis session {run.session_id} started",
+                    session_id=run.session_id,
                     details={
                         "strategic_question": input_data.get('strategic_question', ''),
                         "time_frame": input_data.get('time_frame', ''),
@@ -148,11 +200,70 @@ Provide a coordinated analysis plan and execution strategy."""
                 
         except Exception as e:
             print(f"Error creating database session: {str(e)}")
-            self.current_session_id = None
+            run.session_id = None
+
+    def prepare_resume(self, session_id: int, budget: Optional[RequestBudget] = None):
+        """
+        Rebuild the original request and the completed agent results of a stored session.
+        Returns (input_data, run) for process() or the stream, or None if the session is unavailable.
+        """
+        if not self.db_enabled or not DATABASE_AVAILABLE:
+            return None
+        session = DatabaseService.get_analysis_session(session_id)
+        if not session:
+            return None
+
+        # Stored structured_data is the agent's result['data']; wrap it the way process() returns it
+        restored_results = {
+            agent_name: {
+                "status": "success",
+                "data": data,
+                "agent_type": self.agents[agent_name].__class__.__name__,
+                "session_id": session_id
+            }
+            for agent_name, data in DatabaseService.get_completed_agent_results(session_id).items()
+            if agent_name in self.agents
+        }
+        input_data = {
+            "strategic_question": session.get('strategic_question') or '',
+            "time_frame": session.get('time_frame') or '',
+            "region": session.get('region') or '',
+            "prompt": session.get('additional_instructions') or ''
+        }
+        run = AnalysisRun(budget, user_id=session.get('user_id'), session_id=session_id, restored_results=restored_results)
+        run.prior_processing_time = session.get('total_processing_time') or 0.0
+        run.prior_status = session.get('status')
+        return input_data, run
+
+    def claim_resume(self, run: AnalysisRun) -> bool:
+        """
+        Reopen a failed or cancelled session for the run resuming it. False if the session is
+        in any other state, including when a concurrent request has just reopened it.
+        """
+        if run.prior_status not in RESUMABLE_STATUSES:
+            return False
+        return DatabaseService.reopen_analysis_session(run.session_id, RESUMABLE_STATUSES)
 
-    def _save_agent_result(self, agent_name: str, result: Dict[str, Any], processing_time: float) -> Optional[int]:
+    def _reopen_analysis_session(self, run: AnalysisRun) -> None:
+        """Mark a stored session as processing again before resuming it."""
+        try:
+            # Total processing time keeps accumulating across resumes
+            run.session_start_time = time.time() - run.prior_processing_time
+            DatabaseService.update_session_status(session_id=run.session_id, status="processing")
+            print(f"Resuming database session {run.session_id} ({len(run.restored_results)} agent results reused)")
+            DatabaseService.log_system_event(
+                log_level="INFO",
+                component="orchestrator",
+                message=f"Analysis session {run.session_id} resumed",
+                session_id=run.session_id,
+                details={"reused_agents": list(run.restored_results)}
+            )
+        except Exception as e:
+            print(f"Error reopening database session: {str(e)}")
+
+    def _save_agent_result(self, run: AnalysisRun, agent_name: str, result: Dict[str, Any], processing_time: float) -> Optional[int]:
         """Save individual agent result to database and return the result ID."""
-        if not self.db_enabled or not self.current_session_id or not DATABASE_AVAILABLE:
+        if not self.db_enabled or not run.session_id or not DATABASE_AVAILABLE:
             return None
             
         try:
@@ -196,7 +307,7 @@ Provide a coordinated analysis plan and execution strategy."""
             status = "completed" if result.get('status') != 'error' else "failed"
             
             result_id = DatabaseService.save_agent_result(
-                session_id=self.current_session_id,
+                session_id=run.session_id,
                 agent_name=agent_name,
                 agent_type=agent_type,
                 raw_response=raw_response,
@@ -207,11 +318,11 @@ Provide a coordinated analysis plan and execution strategy."""
             )
             
             if result_id:
-                print(f"Saved result for agent {agent_name} in session {self.current_session_id}")
+                print(f"Saved result for agent {agent_name} in session {run.session_id}")
                 print(f"Saved {agent_name} result to database (ID: {result_id})")
                 # Add database IDs to the result so they can be passed to frontend
                 result['agent_result_id'] = result_id
-                result['session_id'] = self.current_session_id
+                result['session_id'] = run.session_id
                 return result_id
             else:
                 print(f"Failed to save result for agent {agent_name}")
@@ -221,256 +332,194 @@ Provide a coordinated analysis plan and execution strategy."""
             print(f"Error saving agent result to database: {str(e)}")
             return None
 
-    def _update_session_completion(self, status: str = "completed") -> None:
+    def _update_session_completion(self, run: AnalysisRun, status: str = "completed", details: Optional[Dict[str, Any]] = None) -> None:
         """Update session completion status and total processing time."""
-        if not self.db_enabled or not self.current_session_id or not DATABASE_AVAILABLE:
+        if not self.db_enabled or not run.session_id or not DATABASE_AVAILABLE:
             return
             
         try:
             total_time = None
-            if self.session_start_time:
-                total_time = time.time() - self.session_start_time
+            if run.session_start_time:
+                total_time = time.time() - run.session_start_time
             
             success = DatabaseService.update_session_status(
-                session_id=self.current_session_id,
+                session_id=run.session_id,
                 status=status,
                 total_processing_time=total_time
             )
             
             if success:
-                logger.info(f"Updated session {self.current_session_id} status to {status}")
+                logger.info(f"Updated session {run.session_id} status to {status}")
                 # Log completion
                 DatabaseService.log_system_event(
                     log_level="INFO",
                     component="orchestrator",
-                    message=f"Analysis session {self.current_session_id} {status}",
-                    session_id=self.current_session_id,
+                    message=f"Analysis session {run.session_id} {status}",
+                    session_id=run.session_id,
                     details={
                         "total_processing_time": total_time,
-                        "status": status
+                        "status": status,
+                        **(details or {})
                     }
                 )
             else:
-                logger.error(f"Failed to update session {self.current_session_id} status")
+                logger.error(f"Failed to update session {run.session_id} status")
                 
         except Exception as e:
             logger.error(f"Error updating session completion: {str(e)}")
 
-    async def rate_limited_process(self, agent, input_data: Dict[str, Any], agent_name: str) -> Dict[str, Any]:
+    async def rate_limited_process(self, agent, input_data: Dict[str, Any], agent_name: str, run: AnalysisRun) -> Dict[str, Any]:
         """
-        Process with rate limiting, exponential backoff, and retries.
-        Now includes database result saving.
+        Run one agent and save its result to the database.
+        Timeouts and retries happen per LLM call, inside the analysis budget (app/core/deadline.py),
+        and LLM calls are rate limited globally (app/core/rate_limiter.py).
         """
-        retries = 0
         agent_start_time = time.time()
+        # The profile may skip or shorten this stage if the stages ahead no longer fit the deadline
+        remaining = run.budget.remaining()
+        plan = run.profile.plan_stage(agent_name, self.dependencies, remaining)
+        if plan and plan["mode"] == SKIPPED:
+            return self._skip_stage(run, agent_name, plan)
+        allowance = None
+        # Minimal logging - just progress
+        print(f"{agent_name} started processing...")
         
-        while retries < self.max_retries:
-            try:
-                current_time = time.time()
-                time_since_last_request = current_time - self.last_request_time
-                
-                if time_since_last_request < self.min_request_interval:
-                    await asyncio.sleep(self.min_request_interval - time_since_last_request)
-                
-                # Add jitter to prevent thundering herd
-                jitter = random.uniform(0, 0.1)
-                await asyncio.sleep(jitter)
-                
-                # Minimal logging - just progress
-                print(f"{agent_name} started processing...")
-                
-                # Add timeout to the process call
-                result = await asyncio.wait_for(
-                    agent.process(input_data),
-                    timeout=60  # Increased timeout to 60 seconds
-                )
-                
-                # Calculate processing time
-                processing_time = time.time() - agent_start_time
-                
-                # Minimal completion logging
-                print(f"{agent_name} completed with status: {result.get('status', 'unknown')}")
-                
-                # Save agent result to database
-                self._save_agent_result(agent_name, result, processing_time)
-                
-                self.last_request_time = time.time()
-                return result
-                
-            except asyncio.TimeoutError:
-                retries += 1
-                processing_time = time.time() - agent_start_time
-                
-                if retries == self.max_retries:
-                    # Save timeout result to database
-                    timeout_result = {
-                        "status": "error",
-                        "error": f"Agent {agent_name} timed out after {self.max_retries} retries. Please try again with a simpler prompt.",
-                        "agent_type": agent_name
-                    }
-                    self._save_agent_result(agent_name, timeout_result, processing_time)
-                    return timeout_result
-                    
-                delay = self.base_delay * (2 ** retries)  # Exponential backoff
-                await asyncio.sleep(delay)
-                
-            except HTTPException as he:
-                processing_time = time.time() - agent_start_time
-                
-                if he.status_code == 429:  # Rate limit exceeded
-                    retries += 1
-                    if retries == self.max_retries:
-                        rate_limit_result = {
-                            "status": "error",
-                            "error": f"Rate limit exceeded for {agent_name} after {self.max_retries} retries. Please try again in a few minutes.",
-                            "agent_type": agent_name
-                        }
-                        self._save_agent_result(agent_name, rate_limit_result, processing_time)
-                        return rate_limit_result
-                        
-                    delay = self.base_delay * (2 ** retries)  # Exponential backoff
-                    await asyncio.sleep(delay)
+        try:
+            # Requests may opt out of the response cache
+            with llm_cache_bypass(input_data.get('use_cache') is False), \
+                    output_token_limit(plan["max_output_tokens"] if plan else None):
+                # An optional stage may not eat into the time of the stages after it
+                allowance = run.profile.stage_allowance(agent_name, self.dependencies, remaining)
+                if allowance is not None:
+                    result = await asyncio.wait_for(agent.process(input_data), timeout=allowance)
                 else:
-                    # Save error result to database
-                    error_result = {
-                        "status": "error",
-                        "error": f"HTTP error {he.status_code}: {he.detail}",
-                        "agent_type": agent_name
-                    }
-                    self._save_agent_result(agent_name, error_result, processing_time)
-                    raise he
-                    
-            except Exception as e:
-                processing_time = time.time() - agent_start_time
-                print(f"Error in {agent_name}: {str(e)}")
-                retries += 1
-                
-                if retries == self.max_retries:
-                    error_result = {
-                        "status": "error",
-                        "error": f"Agent {agent_name} failed after {self.max_retries} retries: {str(e)}",
-                        "agent_type": agent_name
-                    }
-                    self._save_agent_result(agent_name, error_result, processing_time)
-                    return error_result
-                    
-                delay = self.base_delay * (2 ** retries)
-                await asyncio.sleep(delay)
-
-        # Fallback - should not be reached
-        fallback_result = {
-            "status": "error",
-            "error": f"Agent {agent_name} failed due to an unexpected issue after retries.",
-            "agent_type": agent_name
-        }
+                    result = await agent.process(input_data)
+                if plan:
+                    run.degraded_stages[agent_name] = plan
+                    result["degraded"] = plan
+        except asyncio.TimeoutError:
+            if allowance is not None:
+                return self._skip_stage(run, agent_name, {
+                    "mode": SKIPPED,
+                    "reason": f"exceeded its {allowance:.0f}s allowance"
+                })
+            result = {
+                "status": "error",
+                "error": f"Agent {agent_name} timed out",
+                "agent_type": agent_name
+            }
+        except HTTPException as he:
+            result = {
+                "status": "error",
+                "error": f"HTTP error {he.status_code}: {he.detail}",
+                "agent_type": agent_name
+            }
+        except Exception as e:
+            print(f"Error in {agent_name}: {str(e)}")
+            result = {
+                "status": "error",
+                "error": f"Agent {agent_name} failed: {str(e)}",
+                "agent_type": agent_name
+            }
+        
+        # Calculate processing time
         processing_time = time.time() - agent_start_time
-        self._save_agent_result(agent_name, fallback_result, processing_time)
-        return fallback_result
+        
+        # Minimal completion logging
+        print(f"{agent_name} completed with status: {result.get('status', 'unknown')}")
+        
+        # Save agent result to database
+        self._save_agent_result(run, agent_name, result, processing_time)
+        
+        return result
+
+    def _skip_stage(self, run: AnalysisRun, agent_name: str, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """Result of a stage the profile dropped. Not an error, so the stages after it still run."""
+        print(f"{agent_name} skipped: {plan['reason']}")
+        run.degraded_stages[agent_name] = plan
+        return {
+            "status": "skipped",
+            "agent_type": agent_name,
+            "degraded": plan
+        }
 
-    async def process(self, initial_input_data: Dict[str, Any]) -> Dict[str, Any]:
+    def build_scheduler(self) -> DagScheduler:
+        """Pipeline graph derived from the upstream outputs each agent declares it consumes"""
+        agent_by_key = {key: name for name, key in AGENT_KEYS.items()}
+        return DagScheduler({
+            agent_name: [agent_by_key[key] for key in agent.consumes]
+            for agent_name, agent in self.agents.items()
+        })
+
+    @property
+    def llm_calls(self) -> int:
+        """LLM calls of a full run (fanned-out agents make several)"""
+        return sum(agent.llm_calls for agent in self.agents.values())
+
+    @contextmanager
+    def run_scope(self, run: AnalysisRun):
+        """
+        Bind the run's budget and priority class around a pipeline, whichever entry point
+        drives it; a budget without a configured attempt cap is sized to this pipeline first.
+        """
+        run.budget.cover_calls(self.llm_calls)
+        with request_budget(run.budget), priority_class(run.priority):
+            yield
+
+    async def process(self, initial_input_data: Dict[str, Any], run: Optional[AnalysisRun] = None) -> Dict[str, Any]:
+        """Run the full pipeline within the run's deadline, LLM attempt budget and priority class"""
+        run = run or AnalysisRun()
+        with self.run_scope(run):
+            results = await self._run_pipeline(initial_input_data, run)
+        print(f"LLM budget used: {run.budget.get_stats()}")
+        return results
+
+    async def _run_pipeline(self, initial_input_data: Dict[str, Any], run: AnalysisRun) -> Dict[str, Any]:
         # Create database session at start
-        self._create_analysis_session(initial_input_data)
+        self._create_analysis_session(run, initial_input_data)
         
-        results: Dict[str, Any] = {}
-        # Make a mutable copy for accumulating results that feed into subsequent agents
+        # A resumed run starts from the agent results restored from its session
+        results: Dict[str, Any] = dict(run.restored_results)
+        # The request plus the results published so far, which feed into downstream agents
         cumulative_input_data = initial_input_data.copy()
+        for agent_name, result in run.restored_results.items():
+            cumulative_input_data[AGENT_KEYS[agent_name]] = StageResult(AGENT_KEYS[agent_name], result)
 
-        # Define a map for agent display names to their keys in input_data
-        agent_names_map = {
-            "Problem Explorer": "problem_explorer",
-            "Best Practices": "best_practices",
-            "Horizon Scanning": "horizon_scanning",
-            "Scenario Planning": "scenario_planning",
-            "Research Synthesis": "research_synthesis",
-            "Strategic Action": "strategic_action",
-            "High Impact": "high_impact",
-            "Backcasting": "backcasting"
-        }
-
-        # Helper to process an agent and handle its result
-        async def run_agent(agent_name: str, current_input_data: Dict[str, Any]):
-            agent_key = agent_names_map[agent_name]
-            agent_instance = self.agents[agent_name]
-            
-            result = await self.rate_limited_process(agent_instance, current_input_data.copy(), agent_name) # Pass a copy
-            
-            if result.get("status") == "error":
-                print(f"Error in {agent_name}: {result.get('error', 'Unknown error')}")
-                # Propagate the error result, it will be checked by the caller
-                results[agent_name] = result 
-                # Update session status to failed
-                self._update_session_completion("failed")
-                raise HTTPException(status_code=500, detail=f"Error in {agent_name}: {result.get('error', 'Unknown error')}")
-
+        # Helper to process an agent and publish its result to the agents that consume it
+        async def run_agent(agent_name: str):
+            # Agents get a read-only view of the shared input data, not a copy
+            result = await self.rate_limited_process(self.agents[agent_name], MappingProxyType(cumulative_input_data), agent_name, run)
             results[agent_name] = result
-            cumulative_input_data[agent_key] = result
+            if result.get("status") != "error":
+                cumulative_input_data[AGENT_KEYS[agent_name]] = StageResult(AGENT_KEYS[agent_name], result)
             return result
 
         try:
-            # --- Stage 1: Problem Explorer ---
-            await run_agent("Problem Explorer", cumulative_input_data)
-
-            # --- Stage 2: Best Practices, Horizon Scanning, Scenario Planning (Parallel) ---
-            agent_bp_name = "Best Practices"
-            agent_hs_name = "Horizon Scanning"
-            agent_sp_name = "Scenario Planning"
-
-            # Tasks for parallel execution
-            # They all use cumulative_input_data which now includes problem_explorer output
-            input_for_stage2 = cumulative_input_data.copy() 
-
-            bp_task = self.rate_limited_process(self.agents[agent_bp_name], input_for_stage2, agent_bp_name)
-            hs_task = self.rate_limited_process(self.agents[agent_hs_name], input_for_stage2, agent_hs_name)
-            sp_task = self.rate_limited_process(self.agents[agent_sp_name], input_for_stage2, agent_sp_name)
-            
-            stage2_results_list = await asyncio.gather(bp_task, hs_task, sp_task, return_exceptions=True)
-                
-            # Process results from asyncio.gather
-            parallel_agent_names = [agent_bp_name, agent_hs_name, agent_sp_name]
-            for i, result_or_exc in enumerate(stage2_results_list):
-                agent_name = parallel_agent_names[i]
-                agent_key = agent_names_map[agent_name]
-
-                if isinstance(result_or_exc, Exception):
-                    print(f"Exception in parallel agent {agent_name}: {str(result_or_exc)}")
-                    results[agent_name] = {"status": "error", "error": str(result_or_exc), "agent_type": agent_name}
-                    self._update_session_completion("failed")
-                    raise HTTPException(status_code=500, detail=f"Error in {agent_name} (parallel stage): {str(result_or_exc)}")
-                
-                result = result_or_exc
-                if result.get("status") == "error":
-                    print(f"Error in parallel agent {agent_name}: {result.get('error', 'Unknown error')}")
-                    results[agent_name] = result
-                    self._update_session_completion("failed")
-                    raise HTTPException(status_code=500, detail=f"Error in {agent_name} (parallel stage): {result.get('error', 'Unknown error')}")
-
-                results[agent_name] = result
-                cumulative_input_data[agent_key] = result
-
-            # --- Stage 3: Research Synthesis ---
-            await run_agent("Research Synthesis", cumulative_input_data)
-            
-            # --- Stage 4: Strategic Action ---
-            await run_agent("Strategic Action", cumulative_input_data)
-
-            # --- Stage 5: High Impact ---
-            await run_agent("High Impact", cumulative_input_data)
-
-            # --- Stage 6: Backcasting ---
-            # For Backcasting, we run it but don't strictly need to add its output to cumulative_input_data
-            # if no other agent consumes it from there. Results dict is the final output.
-            agent_bc_name = "Backcasting"
-            agent_bc = self.agents[agent_bc_name]
-            bc_result = await self.rate_limited_process(agent_bc, cumulative_input_data.copy(), agent_bc_name)
-            if bc_result.get("status") == "error":
-                print(f"Error in {agent_bc_name}: {bc_result.get('error', 'Unknown error')}")
-                results[agent_bc_name] = bc_result
-                self._update_session_completion("failed")
-                raise HTTPException(status_code=500, detail=f"Error in {agent_bc_name}: {bc_result.get('error', 'Unknown error')}")
-            results[agent_bc_name] = bc_result
+            # Every agent starts as soon as the outputs it consumes are ready;
+            # after a failure, agents downstream of it are not started
+            scheduler = self.build_scheduler()
+            try:
+                node_results = await scheduler.run(run_agent, failed=lambda result: result.get("status") == "error",
+                                                   completed=run.restored_results)
+            finally:
+                run.timeline = scheduler.get_timeline()
+                print(f"Pipeline critical path: {' -> '.join(run.timeline['critical_path'])} "
+                      f"({run.timeline['makespan_seconds']}s)")
+
+            for agent_name in scheduler.order:
+                result = node_results.get(agent_name)
+                if isinstance(result, Exception):
+                    print(f"Exception in agent {agent_name}: {str(result)}")
+                    results[agent_name] = {"status": "error", "error": str(result), "agent_type": agent_name}
+                    self._update_session_completion(run, "failed")
+                    raise HTTPException(status_code=500, detail=f"Error in {agent_name}: {str(result)}")
+                if result is not None and result.get("status") == "error":
+                    print(f"Error in {agent_name}: {result.get('error', 'Unknown error')}")
+                    self._update_session_completion(run, "failed")
+                    raise HTTPException(status_code=500, detail=f"Error in {agent_name}: {result.get('error', 'Unknown error')}")
 
             # Update session status to completed
-            self._update_session_completion("completed")
+            self._update_session_completion(run, "completed")
 
         except HTTPException as he:
             print(f"Orchestrator caught HTTPException: {he.detail}")
@@ -480,13 +529,13 @@ Provide a coordinated analysis plan and execution strategy."""
             # We could add more details to the 'results' if needed here.
             
             # Log the error to database
-            if self.db_enabled and self.current_session_id and DATABASE_AVAILABLE:
+            if self.db_enabled and run.session_id and DATABASE_AVAILABLE:
                 try:
                     DatabaseService.log_system_event(
                         log_level="ERROR",
                         component="orchestrator",
-                        message=f"Analysis session {self.current_session_id} failed: {he.detail}",
-                        session_id=self.current_session_id,
+                        message=f"Analysis session {run.session_id} failed: {he.detail}",
+                        session_id=run.session_id,
                         details={"error": he.detail, "status_code": he.status_code}
                     )
                 except Exception as e:
@@ -496,20 +545,20 @@ Provide a coordinated analysis plan and execution strategy."""
                 "status": "error",
                 "error_detail": he.detail,
                 "completed_stages_results": results, # Return what was completed
-                "session_id": self.current_session_id  # Include session ID for reference
+                "session_id": run.session_id  # Include session ID for reference
             }
         except Exception as e:
             print(f"Unexpected error in OrchestratorAgent.process: {str(e)}")
             
             # Update session status to failed and log error
-            self._update_session_completion("failed")
-            if self.db_enabled and self.current_session_id and DATABASE_AVAILABLE:
+            self._update_session_completion(run, "failed")
+            if self.db_enabled and run.session_id and DATABASE_AVAILABLE:
                 try:
                     DatabaseService.log_system_event(
                         log_level="ERROR",
                         component="orchestrator",
-                        message=f"Analysis session {self.current_session_id} failed unexpectedly: {str(e)}",
-                        session_id=self.current_session_id,
+                        message=f"Analysis session {run.session_id} failed unexpectedly: {str(e)}",
+                        session_id=run.session_id,
                         details={"error": str(e)}
                     )
                 except Exception as db_e:
@@ -519,11 +568,20 @@ Provide a coordinated analysis plan and execution strategy."""
                 "status": "error",
                 "error_detail": f"Orchestrator failed: {str(e)}",
                 "completed_stages_results": results,
-                "session_id": self.current_session_id
+                "session_id": run.session_id
             } 
             
         # Add session ID to successful results
-        if self.current_session_id:
-            results["session_id"] = self.current_session_id
+        if run.session_id:
+            results["session_id"] = run.session_id
             
-        return results 
\ No newline at end of file
+        return results 
+
+_orchestrator: Optional[OrchestratorAgent] = None
+
+def get_orchestrator() -> OrchestratorAgent:
+    """Process-wide orchestrator; agents and the database check are set up once and shared by all analyses"""
+    global _orchestrator
+    if _orchestrator is None:
+        _orchestrator = OrchestratorAgent()
+    return _orchestrator
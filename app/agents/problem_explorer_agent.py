@@ -1,10 +1,45 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from .base_agent import BaseAgent
+from app.core.structured import STRING, array_of, object_of, string_list
+from app.core.header_matcher import HeaderMatcher
 import logging
 
 logger = logging.getLogger(__name__)
 
+SECTION_TITLES = [
+    'Defining the Problem',
+    'Breaking Down the Problem',
+    'Information Assessment and Gathering',
+    'Solution Exploration and Innovation',
+    'Implementing the Solution',
+]
+
+# Lines restating the problem, and the header text (checklist number or name) of
+# each section, matched anywhere in a line
+ACKNOWLEDGMENT_PREFIXES = ('Step 1:', 'I understand')
+SECTION_HEADER_MATCHER = HeaderMatcher([
+    ('SECTION 1:', 'section1'), ('DEFINING THE PROBLEM', 'section1'),
+    ('SECTION 2:', 'section2'), ('BREAKING DOWN THE PROBLEM', 'section2'),
+    ('SECTION 3:', 'section3'), ('INFORMATION ASSESSMENT', 'section3'),
+    ('SECTION 4:', 'section4'), ('SOLUTION EXPLORATION', 'section4'),
+    ('SECTION 5:', 'section5'), ('IMPLEMENTING THE SOLUTION', 'section5'),
+    ('Key Takeaways', 'takeaways'),
+])
+
+# Structured output: the five checklist sections in order, each a list of answered questions
+PROBLEM_EXPLORER_SCHEMA = object_of({
+    "acknowledgment": STRING,
+    "sections": array_of(object_of({
+        "title": STRING,
+        "answers": array_of(object_of({"question": STRING, "answer": STRING}), min_items=1),
+    }), min_items=5, max_items=5),
+    "takeaways": string_list(min_items=3, max_items=5),
+})
+
 class ProblemExplorerAgent(BaseAgent):
+    output_schema = PROBLEM_EXPLORER_SCHEMA
+    streams_sections = True
+
     def get_system_prompt(self) -> str:
         return """Role & Objective
 You are the Problem Explorer Agent - a strategic analysis specialist trained to deconstruct complex challenges and establish a solid foundation for effective, context-aware solutions.
@@ -124,63 +159,14 @@ Please analyze this strategic challenge using The Problem Explorer's Checklist 
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             prompt = self.format_prompt(input_data)
+            if self.structured_output:
+                result = await self.invoke_structured(prompt)
+                return self.format_output({"structured_data": self._sections_from_structured(result)})
+
             response = await self.invoke_llm(prompt)
             
             # Parse the response into structured format
-            sections = {
-                'acknowledgment': '',
-                'section1': {'title': 'Defining the Problem', 'content': []},
-                'section2': {'title': 'Breaking Down the Problem', 'content': []},
-                'section3': {'title': 'Information Assessment and Gathering', 'content': []},
-                'section4': {'title': 'Solution Exploration and Innovation', 'content': []},
-                'section5': {'title': 'Implementing the Solution', 'content': []},
-                'takeaways': []
-            }
-            
-            current_section = None
-            lines = response.split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Check for acknowledgment
-                if line.startswith('Step 1:') or line.startswith('I understand'):
-                    sections['acknowledgment'] = line
-                    continue
-                
-                # Check for section headers
-                if 'SECTION 1:' in line or 'DEFINING THE PROBLEM' in line:
-                    current_section = 'section1'
-                    continue
-                elif 'SECTION 2:' in line or 'BREAKING DOWN THE PROBLEM' in line:
-                    current_section = 'section2'
-                    continue
-                elif 'SECTION 3:' in line or 'INFORMATION ASSESSMENT' in line:
-                    current_section = 'section3'
-                    continue
-                elif 'SECTION 4:' in line or 'SOLUTION EXPLORATION' in line:
-                    current_section = 'section4'
-                    continue
-                elif 'SECTION 5:' in line or 'IMPLEMENTING THE SOLUTION' in line:
-                    current_section = 'section5'
-                    continue
-                elif 'Key Takeaways' in line:
-                    current_section = 'takeaways'
-                    continue
-                
-                # Add content to current section
-                if current_section and current_section != 'acknowledgment':
-                    if current_section == 'takeaways':
-                        if line.startswith('-') or line.startswith('•'):
-                            sections[current_section].append(line.lstrip('- ').lstrip('• '))
-                    else:
-                        # Only add bullet point if the line doesn't already have one
-                        if line.startswith('-') or line.startswith('•'):
-                            sections[current_section]['content'].append(line)
-                        else:
-                            sections[current_section]['content'].append(f"- {line}")
+            sections = self._parse_sections(response)
             
             return self.format_output({
                 "raw_response": response,
@@ -195,10 +181,78 @@ Please analyze this strategic challenge using The Problem Explorer's Checklist 
                 "agent_type": self.__class__.__name__
             }
 
+    def match_section_header(self, line: str) -> Optional[str]:
+        """Checklist section a response line opens ('acknowledgment' for the restated problem)"""
+        if line.startswith(ACKNOWLEDGMENT_PREFIXES):
+            return 'acknowledgment'
+        return SECTION_HEADER_MATCHER.key(line)
+
+    def _parse_sections(self, response: str) -> Dict[str, Any]:
+        """Acknowledgment, checklist sections and takeaways of a markdown response"""
+        sections = {
+            'acknowledgment': '',
+            'section1': {'title': 'Defining the Problem', 'content': []},
+            'section2': {'title': 'Breaking Down the Problem', 'content': []},
+            'section3': {'title': 'Information Assessment and Gathering', 'content': []},
+            'section4': {'title': 'Solution Exploration and Innovation', 'content': []},
+            'section5': {'title': 'Implementing the Solution', 'content': []},
+            'takeaways': []
+        }
+        
+        current_section = None
+        lines = [line.strip() for line in response.split('\n')]
+        headers = SECTION_HEADER_MATCHER.scan(lines)
+        
+        for index, line in enumerate(lines):
+            if not line:
+                continue
+            
+            if line.startswith(ACKNOWLEDGMENT_PREFIXES):
+                key = 'acknowledgment'
+            else:
+                key = headers[index][0] if index in headers else None
+            # Check for acknowledgment
+            if key == 'acknowledgment':
+                sections['acknowledgment'] = line
+                continue
+            
+            # Check for section headers
+            if key is not None:
+                current_section = key
+                continue
+            
+            # Add content to current section
+            if current_section and current_section != 'acknowledgment':
+                if current_section == 'takeaways':
+                    if line.startswith('-') or line.startswith('•'):
+                        sections[current_section].append(line.lstrip('- ').lstrip('• '))
+                else:
+                    # Only add bullet point if the line doesn't already have one
+                    if line.startswith('-') or line.startswith('•'):
+                        sections[current_section]['content'].append(line)
+                    else:
+                        sections[current_section]['content'].append(f"- {line}")
+        
+        return sections
+
+    def format_section(self, key: str, index: int, lines: List[str]) -> Any:
+        return self._parse_sections("\n".join(lines))[key]
+
+    def _sections_from_structured(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """The parsed-markdown layout, built from a validated structured reply"""
+        sections = {'acknowledgment': result['acknowledgment']}
+        for number, (title, section) in enumerate(zip(SECTION_TITLES, result['sections']), 1):
+            sections[f'section{number}'] = {
+                'title': title,
+                'content': [f"- **{item['question']}**: {item['answer']}" for item in section['answers']],
+            }
+        sections['takeaways'] = result['takeaways']
+        return sections
+
     def format_output(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Format the output in a structured way."""
         structured_data_from_process = data.get("structured_data", {})
-        raw_response_from_process = data.get("raw_response", "")
+        raw_response_from_process = data.get("raw_response")
         
         # Create a human-readable markdown format
         markdown_output = "\n\n"
@@ -226,11 +280,14 @@ Please analyze this strategic challenge using The Problem Explorer's Checklist 
             for takeaway in structured_data_from_process['takeaways']:
                 markdown_output += f"- {takeaway}\n"
         
+        output = {
+            "structured_output": structured_data_from_process,
+            "formatted_output": markdown_output
+        }
+        # Structured replies keep no raw text
+        if raw_response_from_process is not None:
+            output["raw_response"] = raw_response_from_process
         return {
             "status": "success",
-            "data": {
-                "structured_output": structured_data_from_process,
-                "raw_response": raw_response_from_process,
-                "formatted_output": markdown_output
-            }
+            "data": output
         } 
\ No newline at end of file
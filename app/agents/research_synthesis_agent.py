@@ -1,5 +1,8 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base_agent import BaseAgent
+from app.core.handoff import stage_result
+from app.core.structured import STRING, object_of
+from app.core.header_matcher import HeaderMatcher
 import logging
 import json
 import re
@@ -7,8 +10,56 @@ import re
 
 logger = logging.getLogger(__name__)
 
+# Header text of each synthesis section, matched anywhere in a line
+SECTION_HEADERS = {
+    " Section 1: Key Insights": "key_insights",
+    "Section 1: Key Insights": "key_insights",
+    "Key Insights": "key_insights",
+
+    " Section 2: Opportunity Spaces": "opportunity_spaces",
+    "Section 2: Opportunity Spaces": "opportunity_spaces",
+    "Opportunity Spaces": "opportunity_spaces",
+
+    " Section 3: Risk & Resilience": "risk_and_resilience",
+    "Section 3: Risk & Resilience": "risk_and_resilience",
+    "Risk & Resilience": "risk_and_resilience",
+
+    " Section 4: Innovation Pathways": "innovation_pathways",
+    "Section 4: Innovation Pathways": "innovation_pathways",
+    "Innovation Pathways": "innovation_pathways",
+
+    "Section 5: Quick Wins vs Long-Term Strategies": "quick_wins_vs_long_term",
+    "Section 5: Quick Wins vs Long-Term Strategies": "quick_wins_vs_long_term",
+    "Quick Wins vs Long-Term Strategies": "quick_wins_vs_long_term"
+}
+SECTION_HEADER_MATCHER = HeaderMatcher(SECTION_HEADERS)
+
+# Subheadings of each synthesis section: (structured field, label in the markdown)
+SYNTHESIS_SUBHEADINGS = {
+    "key_insights": [("insight", "Insight"), ("actionable_implication", "Actionable Implication"),
+                     ("strategic_translation", "Strategic Translation")],
+    "opportunity_spaces": [("opportunity", "Opportunity"), ("rationale", "Rationale"),
+                           ("potential_impact", "Potential Impact")],
+    "risk_and_resilience": [("risk", "Risk"), ("resilience_strategy", "Resilience Strategy"),
+                            ("futureproofing", "Futureproofing")],
+    "innovation_pathways": [("gap", "Gap"), ("emerging_innovation", "Emerging Innovation"),
+                            ("strategic_fit", "Strategic Fit")],
+    "quick_wins_vs_long_term": [("quick_wins", "Quick Wins"), ("long_term_strategies", "Long-Term Strategies"),
+                                ("balance_consideration", "Balance Consideration")],
+}
+
+# Structured output: one consolidated paragraph per subheading
+RESEARCH_SYNTHESIS_SCHEMA = object_of({
+    section: object_of({field: STRING for field, _ in subheadings})
+    for section, subheadings in SYNTHESIS_SUBHEADINGS.items()
+})
+
 
 class ResearchSynthesisAgent(BaseAgent):
+    consumes = ["problem_explorer", "best_practices", "horizon_scanning", "scenario_planning"]
+    output_schema = RESEARCH_SYNTHESIS_SCHEMA
+    streams_sections = True
+
     def __init__(self):
         super().__init__()
         self.timeout = 120  # Increased timeout
@@ -141,7 +192,7 @@ Guidelines for the Agent
 
 
     def format_prompt(self, input_data: Dict[str, Any]) -> str:
-        problem_explorer_data = input_data.get('problem_explorer', {}).get('data', {}).get('structured_output', {})
+        problem_explorer_data = stage_result(input_data, 'problem_explorer').structured or {}
         problem_definition_text = "N/A"
         if problem_explorer_data:
             phase1_content = problem_explorer_data.get('phase1', {}).get('content', [])
@@ -150,13 +201,16 @@ Guidelines for the Agent
             elif problem_explorer_data.get('acknowledgment'):
                 problem_definition_text = problem_explorer_data.get('acknowledgment')
 
-        best_practices_data = input_data.get('best_practices', {}).get('data', {})
-        best_practices_list = best_practices_data.get('structured_practices', []) 
+        best_practices_list = stage_result(input_data, 'best_practices').structured or []
 
         # Horizon scanning data - current structure is likely raw text due to user revert
-        horizon_scan_raw_data = input_data.get('horizon_scanning', {}).get('data', {}).get('raw_sections', {})
+        horizon_scanning = stage_result(input_data, 'horizon_scanning')
+        horizon_scan_raw_data = horizon_scanning.data.get('raw_sections', {})
         horizon_scan_text = "N/A"
-        if isinstance(horizon_scan_raw_data, dict) and 'raw_response' in horizon_scan_raw_data: # Assuming old structure post-revert
+        if horizon_scanning.structured:
+            # Structured scans keep no raw text; their markdown carries the same content
+            horizon_scan_text = horizon_scanning.data.get('formatted_output', 'N/A')
+        elif isinstance(horizon_scan_raw_data, dict) and 'raw_response' in horizon_scan_raw_data: # Assuming old structure post-revert
             horizon_scan_text = horizon_scan_raw_data.get('raw_response', 'Horizon scan data not available or in unexpected format.')
         elif isinstance(horizon_scan_raw_data, str): # If raw_sections became just the string itself
              horizon_scan_text = horizon_scan_raw_data
@@ -165,7 +219,7 @@ Guidelines for the Agent
 
 
         # Scenario Planning data - access the new detailed structure
-        scenario_planning_output = input_data.get('scenario_planning', {}).get('data', {}).get('structured_scenario_output', {})
+        scenario_planning_output = stage_result(input_data, 'scenario_planning').structured or {}
         gbn_scenarios = scenario_planning_output.get('gbn_scenarios', [])
         change_progression_scenarios = scenario_planning_output.get('change_progression_scenarios', [])
 
@@ -184,6 +238,11 @@ Guidelines for the Agent
         # Format best practices
         best_practices_text = "\n".join([f"- {p.get('title','N/A')}: {p.get('description','N/A')}" for p in best_practices_list[:2]]) if best_practices_list else "N/A"
 
+        # Upstream output is inlined condensed
+        problem_definition_text = self.condense_context(problem_definition_text)
+        best_practices_text = self.condense_context(best_practices_text)
+        horizon_scan_text = self.condense_context(horizon_scan_text)
+
         return f"""Synthesize the following research findings for the strategic question: {input_data.get('strategic_question', 'N/A')}
 
 Problem Definition Context:
@@ -207,72 +266,17 @@ Ensure all insights are grounded in the provided research and scenarios.
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             prompt = self.format_prompt(input_data)
-            response = await self.invoke_llm(prompt)
-           
-            # New parsing logic for the 5 sections
-            parsed_data = {
-                "key_insights": [],
-                "opportunity_spaces": [],
-                "risk_and_resilience": [],
-                "innovation_pathways": [],
-                "quick_wins_vs_long_term": []
-            }
-           
-            current_section_key = None
-            section_headers = {
-                " Section 1: Key Insights": "key_insights",
-                "Section 1: Key Insights": "key_insights",
-                "Key Insights": "key_insights",
-                
-                " Section 2: Opportunity Spaces": "opportunity_spaces",
-                "Section 2: Opportunity Spaces": "opportunity_spaces",
-                "Opportunity Spaces": "opportunity_spaces",
-
-                " Section 3: Risk & Resilience": "risk_and_resilience",
-                "Section 3: Risk & Resilience": "risk_and_resilience",
-                "Risk & Resilience": "risk_and_resilience",
-
-                " Section 4: Innovation Pathways": "innovation_pathways",
-                "Section 4: Innovation Pathways": "innovation_pathways",
-                "Innovation Pathways": "innovation_pathways",
-
-                "Section 5: Quick Wins vs Long-Term Strategies": "quick_wins_vs_long_term",
-                "Section 5: Quick Wins vs Long-Term Strategies": "quick_wins_vs_long_term",
-                "Quick Wins vs Long-Term Strategies": "quick_wins_vs_long_term"
-            }
+            if self.structured_output:
+                result = await self.invoke_structured(prompt)
+                # Same layout the text parser produces: each subheading line followed by its paragraph
+                return self.format_output({
+                    section: [line for field, label in subheadings for line in (f"**{label}:**", result[section][field])]
+                    for section, subheadings in SYNTHESIS_SUBHEADINGS.items()
+                })
 
-            buffer = []
-            for line in response.split('\n'):
-                stripped_line = line.strip()
-                
-                matched_header = False
-                for header, key in section_headers.items():
-                    if header in stripped_line: # Using "in" for flexibility with potential leading/trailing chars
-                        if current_section_key and buffer: # Save previous section's buffer
-                            parsed_data[current_section_key].extend([l.strip() for l in buffer if l.strip()])
-                            buffer = []
-                        current_section_key = key
-                        # Remove the header itself from the line if it's the only content or starts the line
-                        content_after_header = stripped_line.replace(header, "").strip()
-                        if content_after_header:
-                            buffer.append(content_after_header)
-                        matched_header = True
-                        break # Move to next line once header is processed
-                
-                if matched_header:
-                    continue
-               
-                if current_section_key and stripped_line: # Add non-header lines to current section's buffer
-                    buffer.append(stripped_line)
-                elif current_section_key and not stripped_line and buffer: # Keep empty lines if they are part of a paragraph in buffer
-                    buffer.append("") # Preserve paragraph breaks
-            
-            if current_section_key and buffer: # Save the last section's buffer
-                parsed_data[current_section_key].extend([l.strip() for l in buffer if l.strip() or l == ""]) # Keep preserved empty lines if any
-                # Clean up trailing empty strings if any from paragraph preservation
-                while parsed_data[current_section_key] and parsed_data[current_section_key][-1] == "":
-                    parsed_data[current_section_key].pop()
+            response = await self.invoke_llm(prompt)
            
+            parsed_data = self._parse_sections(response)
             return self.format_output(parsed_data) # Pass the new parsed_data structure
            
         except Exception as e:
@@ -284,6 +288,57 @@ Ensure all insights are grounded in the provided research and scenarios.
             }
 
 
+    def _parse_sections(self, response: str) -> Dict[str, List[str]]:
+        """Lines of each of the five synthesis sections of a markdown response"""
+        # New parsing logic for the 5 sections
+        parsed_data = {
+            "key_insights": [],
+            "opportunity_spaces": [],
+            "risk_and_resilience": [],
+            "innovation_pathways": [],
+            "quick_wins_vs_long_term": []
+        }
+
+        current_section_key = None
+
+        buffer = []
+        lines = [line.strip() for line in response.split('\n')]
+        # Headers may appear anywhere in the line, with leading/trailing chars
+        headers = SECTION_HEADER_MATCHER.scan(lines)
+        for index, stripped_line in enumerate(lines):
+            matched_header = headers.get(index)
+            if matched_header:
+                key, header = matched_header
+                if current_section_key and buffer: # Save previous section's buffer
+                    parsed_data[current_section_key].extend([l.strip() for l in buffer if l.strip()])
+                    buffer = []
+                current_section_key = key
+                # Remove the header itself from the line if it's the only content or starts the line
+                content_after_header = stripped_line.replace(header, "").strip()
+                if content_after_header:
+                    buffer.append(content_after_header)
+                continue
+
+            if current_section_key and stripped_line: # Add non-header lines to current section's buffer
+                buffer.append(stripped_line)
+            elif current_section_key and not stripped_line and buffer: # Keep empty lines if they are part of a paragraph in buffer
+                buffer.append("") # Preserve paragraph breaks
+
+        if current_section_key and buffer: # Save the last section's buffer
+            parsed_data[current_section_key].extend([l.strip() for l in buffer if l.strip() or l == ""]) # Keep preserved empty lines if any
+            # Clean up trailing empty strings if any from paragraph preservation
+            while parsed_data[current_section_key] and parsed_data[current_section_key][-1] == "":
+                parsed_data[current_section_key].pop()
+
+        return parsed_data
+
+    def match_section_header(self, line: str) -> Optional[str]:
+        return SECTION_HEADER_MATCHER.key(line)
+
+    def format_section(self, key: str, index: int, lines: List[str]) -> Any:
+        # A full parse drops blank lines from every section but the last; do so for each streamed one
+        return [line for line in self._parse_sections("\n".join(lines))[key] if line]
+
     def format_output(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
         """Format the output in a structured way based on the new 5-section parsing."""
         try:
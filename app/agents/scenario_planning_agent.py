@@ -1,15 +1,97 @@
 from typing import Dict, Any, List
 from .base_agent import BaseAgent
+from app.core.handoff import stage_result
+from app.core.streaming import tagged_events
+from app.core.structured import STRING, array_of, object_of, one_of, string_list
+import asyncio
 import logging
 import json
+import os
 import re # For parsing
 
 logger = logging.getLogger(__name__)
 
+# Generate the two frameworks with concurrent LLM calls (and the synthesis after them)
+SCENARIO_PLANNING_FANOUT = os.getenv("SCENARIO_PLANNING_FANOUT", "true").lower() in ("1", "true", "yes")
+
+# Framework sections of the output: (part name, heading, fields of each scenario)
+SCENARIO_FRAMEWORKS = [
+    ("gbn", "1. GBN Framework", "title, matrix_position (A1, A2, B1 or B2) and description"),
+    ("change_progression", "2. Change Progression Model",
+     "level (No Change, Marginal Change, Adaptive Change or Radical Change), title and description"),
+]
+
+# Markdown for a raw response the parser could not structure: (pattern matched at the
+# start of a line, replacement for the matched part). The first matching rule rewrites
+# the line, and blank lines directly before a rewritten line are dropped.
+RAW_LINE_REWRITES = [
+    # Make main headers H1 and bold
+    (re.compile(r'\s*\d+\.\s*(GBN Framework)', re.IGNORECASE), r'# **\1**'),
+    (re.compile(r'\s*\d+\.\s*(Change Progression Model)', re.IGNORECASE), r'# **\1**'),
+    (re.compile(r'\s*(\*\*?Synthesis of scenarios:\*\*?)', re.IGNORECASE), r'# **Synthesis of Scenarios**'),
+    (re.compile(r'\s*(\*\*?Key strategic insights.+:\*\*?)', re.IGNORECASE), r'# **Key Strategic Insights and Early Warning Indicators**'),
+    # Make scenario titles H2 and bold
+    (re.compile(r'\s*(?:[\*\-]\s*)?title:\s*\*\*(.*)\*\*'), r'## **\1**'),
+    (re.compile(r'\s*(?:[\*\-]\s*)?title:\s*(.*)'), r'## **\1**'),
+    # Bold the other labels
+    (re.compile(r'\s*(?:[\*\-]\s*)?(matrix_position:)', re.IGNORECASE), r'**\1**'),
+    (re.compile(r'\s*(?:[\*\-]\s*)?(level:)', re.IGNORECASE), r'**\1**'),
+    (re.compile(r'\s*(?:[\*\-]\s*)?(description:)', re.IGNORECASE), r'**\1**'),
+]
+# All rules in one pattern, whose named group r<n> tells which rule matched first
+RAW_LINE_RULE = re.compile("|".join(
+    f"(?P<r{n}>(?{'i' if pattern.flags & re.IGNORECASE else ''}:{pattern.pattern}))"
+    for n, (pattern, _) in enumerate(RAW_LINE_REWRITES)))
+
+def format_raw_response(response: str) -> str:
+    """Markdown for a raw scenario response, rewriting it line by line in a single pass."""
+    lines: List[str] = []
+    blank_run = 0
+    for line in response.split("\n"):
+        if not line or line.isspace():
+            lines.append(line)
+            blank_run += 1
+            continue
+        rule = RAW_LINE_RULE.match(line)
+        if rule:
+            pattern, replacement = RAW_LINE_REWRITES[int(rule.lastgroup[1:])]
+            if blank_run:
+                del lines[-blank_run:]
+            # The rule matches at the start of the line, so that is the match replaced
+            line = pattern.sub(replacement, line, count=1)
+        lines.append(line)
+        blank_run = 0
+    return "\n".join(lines)
+
+# Structured output: both frameworks' scenarios plus the synthesis, in one reply
+SCENARIO_PLANNING_SCHEMA = object_of({
+    "gbn_scenarios": array_of(object_of({
+        "title": STRING,
+        "matrix_position": one_of("A1", "A2", "B1", "B2"),
+        "description": STRING,
+    }), min_items=1, max_items=4),
+    "change_progression_scenarios": array_of(object_of({
+        "title": STRING,
+        "level": one_of("No Change", "Marginal Change", "Adaptive Change", "Radical Change"),
+        "description": STRING,
+    }), min_items=1, max_items=4),
+    "synthesis": STRING,
+    "key_insights": string_list(),
+})
+
 class ScenarioPlanningAgent(BaseAgent):
+    consumes = ["problem_explorer"]
+    output_schema = SCENARIO_PLANNING_SCHEMA
+
     def __init__(self):
         super().__init__()
         self.timeout = 120  # Increased timeout
+        self.fan_out = SCENARIO_PLANNING_FANOUT
+
+    @property
+    def llm_calls(self) -> int:
+        """One call per framework plus the synthesis when fanning out; a structured reply is a single call"""
+        return len(SCENARIO_FRAMEWORKS) + 1 if self.fan_out and not self.structured_output else 1
 
     def get_system_prompt(self) -> str:
         return """You are the Scenario Planning Agent, a strategic foresight analyst specializing in crafting plausible, evidence-informed future scenarios to help decision-makers anticipate uncertainty and prepare resilient strategies.
@@ -89,13 +171,14 @@ After developing all scenarios, briefly:
 * Discuss the two frameworks – What do they reveal collectively about possible futures?
 * Identify 3–5 strategic insights or early warning indicators decision-makers should monitor."""
 
-    def format_prompt(self, input_data: Dict[str, Any]) -> str:
+    def _format_context(self, input_data: Dict[str, Any]) -> str:
+        """Challenge, problem context and user requirements shared by every prompt"""
         strategic_question = input_data.get('strategic_question', 'N/A')
         time_frame = input_data.get('time_frame', 'N/A')
         region = input_data.get('region', 'N/A')
         user_instructions = input_data.get('prompt', '')
         
-        problem_explorer_data = input_data.get('problem_explorer', {}).get('data', {}).get('structured_output', {})
+        problem_explorer_data = stage_result(input_data, 'problem_explorer').structured or {}
         problem_context = "N/A"
         if problem_explorer_data:
             phase1_content = problem_explorer_data.get('phase1', {}).get('content', [])
@@ -105,6 +188,7 @@ After developing all scenarios, briefly:
                 problem_context = problem_explorer_data.get('acknowledgment')
             else:
                 problem_context = str(problem_explorer_data.get('phase1', 'Problem details not clearly defined in Phase 1.'))
+            problem_context = self.condense_context(problem_context)
         
         base_prompt = f"""Create distinct scenarios for the following strategic challenge:
 
@@ -120,6 +204,10 @@ Problem Context:
 Additional Requirements: {user_instructions}
 IMPORTANT: Incorporate these requirements into all scenarios and end each scenario description with "This aligns with sustainable transformation goals"."""
 
+        return base_prompt
+
+    def format_prompt(self, input_data: Dict[str, Any]) -> str:
+        base_prompt = self._format_context(input_data)
         base_prompt += """
 
 Please generate 8 scenarios according to the two specified frameworks (GBN and Change Progression Model) based on the problem context and strategic question provided.
@@ -221,10 +309,66 @@ Ensure all requested fields for each scenario type are present and distinct. Adh
         logger.info(f"Parsed Scenario Data: GBN={len(parsed_output['gbn_scenarios'])}, CP={len(parsed_output['change_progression_scenarios'])}")
         return parsed_output
 
+    def format_framework_prompt(self, input_data: Dict[str, Any], heading: str, fields: str) -> str:
+        name = heading.split(". ", 1)[1]
+        return f"""{self._format_context(input_data)}
+
+Please write only the {name} section of the scenario analysis: four scenarios according to the {name} as described in your system instructions.
+The other framework and the synthesis are being written separately, so do not include them and do not restate the problem.
+Start your response with the line "{heading}" and give each scenario the fields {fields}.
+Adhere to the word counts for descriptions."""
+
+    def format_synthesis_prompt(self, input_data: Dict[str, Any], scenarios: str) -> str:
+        return f"""{self._format_context(input_data)}
+
+Scenarios developed for this challenge:
+
+{scenarios}
+
+Please write only the Synthesis of scenarios section for the scenarios above, as described in your system instructions.
+Start your response with the line "Synthesis of scenarios:" and do not repeat the scenarios."""
+
+    async def _generate(self, part: str, prompt: str) -> str:
+        # Deltas of concurrent calls are told apart by their part
+        with tagged_events(part=part):
+            return (await self.invoke_llm(prompt)).strip()
+
+    async def _generate_by_framework(self, input_data: Dict[str, Any]) -> str:
+        """
+        Generate each framework with its own concurrent call, then the synthesis from both,
+        and join them in the layout of a single-call response
+        """
+        tasks = [
+            asyncio.ensure_future(self._generate(part, self.format_framework_prompt(input_data, heading, fields)))
+            for part, heading, fields in SCENARIO_FRAMEWORKS
+        ]
+        try:
+            frameworks = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        frameworks = [
+            text if heading in text[:200] else f"{heading}\n\n{text}"
+            for text, (_, heading, _) in zip(frameworks, SCENARIO_FRAMEWORKS)
+        ]
+        scenarios = "\n\n".join(frameworks)
+        synthesis = await self._generate("synthesis", self.format_synthesis_prompt(input_data, scenarios))
+        return f"{scenarios}\n\n{synthesis}"
+
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            prompt = self.format_prompt(input_data)
-            response = await self.invoke_llm(prompt)
+            if self.structured_output:
+                # One schema-constrained reply replaces the sections and their parsing
+                result = await self.invoke_structured(self.format_prompt(input_data))
+                return self.format_output({"structured_scenarios": result})
+
+            # Fan-out takes as long as the slower framework plus the short synthesis
+            if self.fan_out:
+                response = await self._generate_by_framework(input_data)
+            else:
+                prompt = self.format_prompt(input_data)
+                response = await self.invoke_llm(prompt)
             
             parsed_scenarios = self._parse_multi_framework_scenarios(response)
             
@@ -248,7 +392,7 @@ Ensure all requested fields for each scenario type are present and distinct. Adh
         structured_scenarios = data.get("structured_scenarios", {
             "gbn_scenarios": [], "change_progression_scenarios": []
         })
-        raw_response = data.get("raw_response", "") # Get raw_response for fallback or partial display
+        raw_response = data.get("raw_response") # Get raw_response for fallback or partial display
 
         markdown_output = ""
 
@@ -270,30 +414,29 @@ Ensure all requested fields for each scenario type are present and distinct. Adh
         else:
             markdown_output += "No Change Progression scenarios were parsed or generated.\n\n"
 
+        # Only structured replies carry the synthesis as its own field
+        if structured_scenarios.get("synthesis"):
+            markdown_output += f"# **Synthesis of Scenarios**\n\n{structured_scenarios['synthesis']}\n\n"
+        if structured_scenarios.get("key_insights"):
+            markdown_output += "# **Key Strategic Insights and Early Warning Indicators**\n\n"
+            markdown_output += "".join(f"- {insight}\n" for insight in structured_scenarios["key_insights"])
+
         # Fallback for markdown if parsing somehow failed badly but we have a raw response
         if not structured_scenarios["gbn_scenarios"] and not structured_scenarios["change_progression_scenarios"] and raw_response:
             logger.warn("Scenario parsing resulted in empty structured data; formatting raw response for markdown.")
-            
-            formatted_response = raw_response
-            
-            # Make main headers H1 and bold
-            formatted_response = re.sub(r'^\s*\d+\.\s*(GBN Framework)', r'# **\1**', formatted_response, flags=re.MULTILINE | re.IGNORECASE)
-            formatted_response = re.sub(r'^\s*\d+\.\s*(Change Progression Model)', r'# **\1**', formatted_response, flags=re.MULTILINE | re.IGNORECASE)
-            formatted_response = re.sub(r'^\s*(\*\*?Synthesis of scenarios:\*\*?)', r'# **Synthesis of Scenarios**', formatted_response, flags=re.MULTILINE | re.IGNORECASE)
-            formatted_response = re.sub(r'^\s*(\*\*?Key strategic insights.+:\*\*?)', r'# **Key Strategic Insights and Early Warning Indicators**', formatted_response, flags=re.MULTILINE | re.IGNORECASE)
-
-            # Make scenario titles H2 and bold
-            formatted_response = re.sub(r'^\s*(?:[\*\-]\s*)?title:\s*\*\*(.*)\*\*', r'## **\1**', formatted_response, flags=re.MULTILINE)
-            formatted_response = re.sub(r'^\s*(?:[\*\-]\s*)?title:\s*(.*)', r'## **\1**', formatted_response, flags=re.MULTILINE)
-
-            # Bold the other labels
-            formatted_response = re.sub(r'^\s*(?:[\*\-]\s*)?(matrix_position:)', r'**\1**', formatted_response, flags=re.MULTILINE | re.IGNORECASE)
-            formatted_response = re.sub(r'^\s*(?:[\*\-]\s*)?(level:)', r'**\1**', formatted_response, flags=re.MULTILINE | re.IGNORECASE)
-            formatted_response = re.sub(r'^\s*(?:[\*\-]\s*)?(description:)', r'**\1**', formatted_response, flags=re.MULTILINE | re.IGNORECASE)
-            
-            markdown_output = formatted_response
+            markdown_output = format_raw_response(raw_response)
 
         
+        if raw_response is None:
+            # Structured replies keep no raw text
+            return {
+                "status": "success",
+                "data": {
+                    "structured_scenario_output": structured_scenarios,
+                    "formatted_output": markdown_output
+                }
+            }
+
         return {
             "status": "success",
             "data": {
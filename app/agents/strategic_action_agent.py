@@ -1,15 +1,64 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base_agent import BaseAgent
+from app.core.handoff import stage_result
+from app.core.streaming import tagged_events
+from app.core.structured import STRING, array_of, object_of, one_of
+import asyncio
 import json
+import os
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Generate each time horizon with its own concurrent LLM call instead of one long generation
+STRATEGIC_ACTION_FANOUT = os.getenv("STRATEGIC_ACTION_FANOUT", "true").lower() in ("1", "true", "yes")
+
+# Sections of the action plan in output order: (part name, heading)
+TIME_HORIZONS = [
+    ("near_term", "Near-Term (0–2 Years) – Quick Wins & Urgent Needs"),
+    ("medium_term", "Medium-Term (2–5 Years) – Strategic Build-Out"),
+    ("long_term", "Long-Term (5–10 Years) – Visionary & Transformational Strategies"),
+]
+
+# How each horizon is named in a heading, as the parser recognises it
+HORIZON_NAMES = {
+    "near_term": r"near.?term|0.?2\s*years|short.?term",
+    "medium_term": r"medium.?term|2.?5\s*years",
+    "long_term": r"long.?term|5.?10\s*years",
+}
+
+# A line that can only be a title: any heading, a bold line or a short line without
+# closing punctuation
+TITLE_LINE = re.compile(r"\s*(?:#{1,6}\s.*|\*\*[^*]+\*\*:?|__[^_]+__:?|[^.!?]{1,100}[^.!?\s])\s*$")
+
+_STRATEGIC_IDEA = object_of({
+    "idea_title": STRING,
+    "idea_summary": STRING,
+    "action_items": array_of(object_of({"action": STRING, "priority": one_of("High", "Medium", "Low")}), min_items=1),
+})
+
+# Structured output: the parsed action plan itself, ideas per time horizon
+STRATEGIC_ACTION_SCHEMA = object_of({
+    f"{part}_ideas": array_of(_STRATEGIC_IDEA, min_items=1) for part, _ in TIME_HORIZONS
+})
+
+# One time horizon of a fanned-out structured plan
+HORIZON_SCHEMA = object_of({"ideas": array_of(_STRATEGIC_IDEA, min_items=1)})
+
 class StrategicActionAgent(BaseAgent):
+    consumes = ["research_synthesis"]
+    output_schema = STRATEGIC_ACTION_SCHEMA
+
     def __init__(self):
         super().__init__()
         self.timeout = 90  # Increased timeout for this complex agent
+        self.fan_out = STRATEGIC_ACTION_FANOUT
+
+    @property
+    def llm_calls(self) -> int:
+        """One call per time horizon when fanning out, in markdown and structured mode alike"""
+        return len(TIME_HORIZONS) if self.fan_out else 1
 
     def get_system_prompt(self) -> str:
         return """You are the Strategic Action Planning Agent, a strategy-to-execution specialist responsible for turning foresight insights into a practical, time-bound roadmap for implementation.
@@ -125,11 +174,12 @@ Guidelines for the Agent
             return "N/A"
         return "\n- " + "\n- ".join(items)
 
-    def format_prompt(self, input_data: Dict[str, Any]) -> str:
+    def _format_context(self, input_data: Dict[str, Any]) -> str:
+        """Problem statement, constraints and Research Synthesis output shared by every prompt"""
         strategic_question = input_data.get('strategic_question', 'N/A')
         contextual_constraints = input_data.get('prompt', 'None provided')
 
-        synthesis_data = input_data.get('research_synthesis', {}).get('data', {}).get('structured_synthesis', {})
+        synthesis_data = stage_result(input_data, 'research_synthesis').structured or {}
         
         synthesis_sections_text = "\n\nResearch Synthesis Agent Output:\n"
         
@@ -156,18 +206,103 @@ Guidelines for the Agent
         return f"""Original Problem Statement: {strategic_question}
 
 Contextual Constraints (if any): {contextual_constraints}
-{synthesis_sections_text}
+
+{self.condense_context(synthesis_sections_text)}"""
+
+    def format_prompt(self, input_data: Dict[str, Any]) -> str:
+        return f"""{self._format_context(input_data)}
 
 Based on all the above information (Original Problem, Constraints, and the detailed Research Synthesis output), please generate strategic ideas and their specific action items according to the three time horizons (Near-Term, Medium-Term, Long-Term) and prioritization criteria outlined in your system instructions.
 Focus on creating a practical and actionable roadmap.
 """
 
+    def format_horizon_prompt(self, input_data: Dict[str, Any], heading: str) -> str:
+        return f"""{self._format_context(input_data)}
+
+Based on all the above information (Original Problem, Constraints, and the detailed Research Synthesis output), write only the {heading} section of the action plan.
+Other agents are writing the other time horizons at the same time, so do not restate the challenge and do not include any other time horizon.
+Start your response with the heading "### {heading}" and follow the output format and prioritization criteria outlined in your system instructions for this section.
+"""
+
+    def _prompts(self, input_data: Dict[str, Any]) -> Dict[str, str]:
+        """The prompts this run sends: one per time horizon in fan-out mode, else the full plan's"""
+        if self.fan_out:
+            return {part: self.format_horizon_prompt(input_data, heading) for part, heading in TIME_HORIZONS}
+        return {"plan": self.format_prompt(input_data)}
+
+    async def _generate_horizon(self, prompt: str, part: str, heading: str) -> str:
+        # Deltas of the three concurrent calls are told apart by their part
+        with tagged_events(part=part):
+            response = await self.invoke_llm(prompt)
+        response = response.strip()
+        first, _, rest = response.partition("\n")
+        if re.match(rf"#{{1,3}}\s.*(?:{HORIZON_NAMES[part]})", first, re.IGNORECASE):
+            return response
+        # A title naming the horizon in a form the parser misses (bold, a deeper heading,
+        # a plain line) is replaced rather than left under a second heading
+        if TITLE_LINE.match(first) and re.search(HORIZON_NAMES[part], first, re.IGNORECASE):
+            response = rest.strip()
+        return f"### {heading}\n\n{response}"
+
+    async def _generate_by_horizon(self, prompts: Dict[str, str]) -> str:
+        """Run one call per time horizon concurrently and join the sections into one plan"""
+        tasks = [
+            asyncio.ensure_future(self._generate_horizon(prompts[part], part, heading))
+            for part, heading in TIME_HORIZONS
+        ]
+        try:
+            sections = await asyncio.gather(*tasks)
+        except BaseException:
+            # One horizon failing fails the stage; don't leave the others running
+            for task in tasks:
+                task.cancel()
+            raise
+        return "\n\n".join(sections)
+
+    async def _generate_structured(self, prompts: Dict[str, str]) -> Dict[str, Any]:
+        """Structured action plan: one schema-constrained call, or one per time horizon in fan-out mode"""
+        if not self.fan_out:
+            return await self.invoke_structured(prompts["plan"])
+
+        async def generate_horizon(part: str) -> List[Dict[str, Any]]:
+            with tagged_events(part=part):
+                result = await self.invoke_structured(prompts[part], HORIZON_SCHEMA)
+            return result["ideas"]
+
+        tasks = [asyncio.ensure_future(generate_horizon(part)) for part, _ in TIME_HORIZONS]
+        try:
+            horizons = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return {f"{part}_ideas": ideas for (part, _), ideas in zip(TIME_HORIZONS, horizons)}
+
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        prompt = self.format_prompt(input_data)
+        # Only the prompts actually sent are built, so their context is condensed once each
+        prompts = self._prompts(input_data)
+        prompt_length = sum(len(prompt) for prompt in prompts.values())
         
         try:
-            # Call the LLM
-            response = await self.invoke_llm(prompt)
+            if self.structured_output:
+                parsed_action_plan = await self._generate_structured(prompts)
+                total_ideas = sum(len(ideas) for ideas in parsed_action_plan.values())
+                return {
+                    "status": "success",
+                    "data": self.format_output(parsed_action_plan)["data"],
+                    "metadata": {
+                        "prompt_length": prompt_length,
+                        "ideas_parsed": total_ideas,
+                        "parsing_strategy": "structured_output",
+                        "fan_out": self.fan_out
+                    }
+                }
+
+            # Call the LLM; in fan-out mode the stage takes as long as its slowest horizon
+            if self.fan_out:
+                response = await self._generate_by_horizon(prompts)
+            else:
+                response = await self.invoke_llm(prompts["plan"])
             
             # Log the raw response for debugging
             logger.info(f"Raw LLM response (first 500 chars): {response[:500]}...")
@@ -210,10 +345,11 @@ Focus on creating a practical and actionable roadmap.
                 "status": "success",
                 "data": formatted_output["data"],  # Extract the data dict from format_output
                 "metadata": {
-                    "prompt_length": len(prompt),
+                    "prompt_length": prompt_length,
                     "response_length": len(response),
                     "ideas_parsed": total_ideas,
-                    "parsing_strategy": "structured" if total_ideas > 0 else "fallback"
+                    "parsing_strategy": "structured" if total_ideas > 0 else "fallback",
+                    "fan_out": self.fan_out
                 }
             }
             
@@ -234,7 +370,7 @@ Focus on creating a practical and actionable roadmap.
                 "data": error_output,
                 "metadata": {
                     "error": str(e),
-                    "prompt_length": len(prompt) if 'prompt' in locals() else 0
+                    "prompt_length": prompt_length
                 }
             }
 
@@ -566,7 +702,7 @@ Focus on creating a practical and actionable roadmap.
         logger.info(f"Created basic structure with {len(basic_idea['action_items'])} action items")
         return result
 
-    def format_output(self, parsed_action_plan: Dict[str, Any], raw_response: str = "") -> Dict[str, Any]:
+    def format_output(self, parsed_action_plan: Dict[str, Any], raw_response: Optional[str] = None) -> Dict[str, Any]:
         markdown_output = "\n\n"
         time_horizon_map = {
             "near_term_ideas": "# Near-Term (0–2 years)",
@@ -624,12 +760,15 @@ Focus on creating a practical and actionable roadmap.
             markdown_output += "*Strategic recommendations have been generated based on the comprehensive analysis. "
             markdown_output += "Please review the detailed analysis above for implementation guidance.*\n"
 
+        data = {
+            "structured_action_plan": parsed_action_plan,
+            "raw_sections": parsed_action_plan,
+            "formatted_output": markdown_output
+        }
+        # Include for debugging (structured replies keep no raw text)
+        if raw_response is not None:
+            data["raw_llm_response"] = raw_response
         return {
             "status": "success",
-            "data": {
-                "structured_action_plan": parsed_action_plan,
-                "raw_sections": parsed_action_plan,
-                "formatted_output": markdown_output,
-                "raw_llm_response": raw_response  # Include for debugging
-            }
+            "data": data
         } 
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Admission control for new analyses.
+
+Before an analysis is accepted, the controller estimates how long its first LLM
+call would wait given what is already queued: calls ahead of it in the
+concurrency limiter (weighted by how their class competes with its own), and the
+requests-per-minute budget those calls still have to draw from. If the estimate
+exceeds ADMISSION_MAX_QUEUE_WAIT_SECONDS the request is turned away with a
+Retry-After (or handed to the background job queue) instead of being accepted only
+to time out.
+"""
+
+import os
+import math
+from typing import Dict, Any, Optional
+from dotenv import load_dotenv
+from app.core.concurrency import AdaptiveConcurrencyLimiter, llm_concurrency
+from app.core.rate_limiter import TokenBucketRateLimiter, llm_rate_limiter
+from app.core.priority import PRIORITY_CLASSES
+
+load_dotenv()
+
+# Configuration
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_QUEUE_WAIT_SECONDS", 30))
+ADMISSION_OVERLOAD_ACTION = os.getenv("ADMISSION_OVERLOAD_ACTION", "reject")  # reject | queue
+ADMISSION_DEFAULT_CALL_SECONDS = float(os.getenv("ADMISSION_DEFAULT_CALL_SECONDS", 10))  # until latency is measured
+
+class AdmissionController:
+    """Turns away new analyses whose LLM calls would queue for too long."""
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter, rate_limiter: TokenBucketRateLimiter,
+                 max_wait: float = ADMISSION_MAX_QUEUE_WAIT_SECONDS,
+                 overload_action: str = ADMISSION_OVERLOAD_ACTION,
+                 enabled: bool = ADMISSION_ENABLED):
+        self.limiter = limiter
+        self.rate_limiter = rate_limiter
+        self.max_wait = max_wait
+        self.overload_action = overload_action
+        self.enabled = enabled
+        self.stats = {name: {"admitted": 0, "rejected": 0, "queued": 0} for name in PRIORITY_CLASSES}
+
+    def estimate_wait(self, priority: str) -> float:
+        """Estimated seconds before a new call of this class would reach the provider."""
+        weights = self.limiter.weights
+        own_weight = weights.get(priority, 1.0)
+        # Under weighted round robin a lower class only delays us in proportion to its weight
+        ahead = sum(
+            count * min(1.0, weights.get(name, 1.0) / own_weight)
+            for name, count in self.limiter.queued_by_priority().items()
+        )
+        latency = self.limiter.get_stats()["latency_baseline_seconds"] or ADMISSION_DEFAULT_CALL_SECONDS
+        slot_wait = ahead / max(1, self.limiter.window) * latency
+        # Calls already holding a slot but waiting for RPM quota, plus the ones ahead of us
+        quota_wait = (self.rate_limiter.waiting + ahead) * 60.0 / self.rate_limiter.rpm
+        return max(slot_wait, quota_wait)
+
+    def check(self, priority: str) -> Optional[int]:
+        """None if a new analysis of this class is admitted, else the Retry-After in seconds."""
+        if not self.enabled:
+            return None
+        wait = self.estimate_wait(priority)
+        if wait <= self.max_wait:
+            self.stats[priority]["admitted"] += 1
+            return None
+        self.stats[priority]["queued" if self.overload_action == "queue" else "rejected"] += 1
+        return max(1, math.ceil(wait - self.max_wait))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_queue_wait_seconds": self.max_wait,
+            "overload_action": self.overload_action,
+            "estimated_wait_seconds": {name: round(self.estimate_wait(name), 2) for name in PRIORITY_CLASSES},
+            "by_priority": self.stats,
+        }
+
+# Shared admission controller for the analysis endpoints
+admission_controller = AdmissionController(llm_concurrency, llm_rate_limiter)
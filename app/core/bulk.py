@@ -0,0 +1,187 @@
+"""
+Bulk analysis of many questions through the shared orchestrator.
+
+An upload of up to BULK_MAX_QUESTIONS requests (JSONL or CSV) becomes one run.
+Every question goes through the same orchestrator, so all of their agent calls
+share one rate limiter, concurrency window and response cache. Questions
+are admitted gradually: a new one starts only while fewer than the configured number
+are running and the LLM limiters have no backlog. Each question's deadline
+therefore starts when it actually gets capacity, not when the file was uploaded.
+Bulk questions run in the bulk priority class, behind interactive and API traffic.
+
+Results are yielded per question as soon as each one finishes, followed by a
+progress event with throughput figures.
+"""
+
+import io
+import os
+import csv
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, List, Tuple, Optional, AsyncIterator, Callable, Awaitable
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from app.agents.orchestrator_agent import OrchestratorAgent, AnalysisRun
+from app.core.concurrency import llm_concurrency
+from app.core.rate_limiter import llm_rate_limiter
+from app.core.profiles import get_profile
+from app.core.priority import BULK
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+BULK_MAX_QUESTIONS = int(os.getenv("BULK_MAX_QUESTIONS", 500))
+BULK_MAX_CONCURRENT_ANALYSES = int(os.getenv("BULK_MAX_CONCURRENT_ANALYSES", 8))
+BULK_CONCURRENCY_LIMIT = int(os.getenv("BULK_CONCURRENCY_LIMIT", 32))  # most analyses a client may ask to run at once
+BULK_ADMISSION_POLL_SECONDS = float(os.getenv("BULK_ADMISSION_POLL_SECONDS", 0.5))
+
+def parse_bulk_upload(content: bytes, filename: str = "") -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    Rows of a JSONL or CSV upload as (line number, fields).
+    The format follows the file extension, or the first character when there is none.
+    Raises ValueError for malformed files.
+    """
+    text = content.decode("utf-8-sig")
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        is_csv = True
+    elif name.endswith((".jsonl", ".ndjson", ".json")):
+        is_csv = False
+    else:
+        is_csv = not text.lstrip().startswith("{")
+
+    rows: List[Tuple[int, Dict[str, Any]]] = []
+    if is_csv:
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames:
+            raise ValueError("CSV upload has no header row")
+        for row in reader:
+            # Empty cells fall back to the request defaults
+            fields = {key.strip(): value.strip() for key, value in row.items()
+                      if key and value is not None and value.strip() != ""}
+            if fields:
+                rows.append((reader.line_num, fields))
+    else:
+        for line_num, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                fields = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Line {line_num}: invalid JSON ({e})")
+            if not isinstance(fields, dict):
+                raise ValueError(f"Line {line_num}: expected a JSON object")
+            rows.append((line_num, fields))
+
+    if len(rows) > BULK_MAX_QUESTIONS:
+        raise ValueError(f"Upload has {len(rows)} questions; the limit is {BULK_MAX_QUESTIONS}")
+    return rows
+
+class BulkAnalysisRunner:
+    """Runs a list of analyses, admitting new ones only while the shared LLM limiters keep up."""
+
+    def __init__(self, orchestrator: OrchestratorAgent, max_concurrent: int = BULK_MAX_CONCURRENT_ANALYSES):
+        self.orchestrator = orchestrator
+        self.max_concurrent = min(max(1, max_concurrent), BULK_CONCURRENCY_LIMIT)
+        self.total = 0
+        self.completed = 0
+        self.failed = 0
+        self.llm_attempts = 0
+        self.started_at = 0.0
+
+    def _saturated(self) -> bool:
+        # Calls already waiting for a slot or for quota: another analysis would only queue behind them
+        return llm_concurrency.queued > 0 or llm_rate_limiter.waiting > 0
+
+    async def _analyze(self, index: int, line: int, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        profile = get_profile(input_data.get("profile"))
+        run = AnalysisRun(budget=profile.new_budget(input_data.get("deadline_seconds")), priority=BULK, profile=profile)
+        started = time.monotonic()
+        try:
+            results = await self.orchestrator.process(dict(input_data), run)
+            # A failed stage is reported in the results, not raised
+            status = results.get("status", "success")
+            error = results.get("error_detail") if status == "error" else None
+        except asyncio.CancelledError:
+            # Left resumable, like a cancelled /analyze stream
+            self.orchestrator._update_session_completion(run, "cancelled")
+            raise
+        except Exception as e:
+            results = None
+            status, error = "error", (e.detail if isinstance(e, HTTPException) else str(e))
+        self.llm_attempts += run.budget.attempts
+        return {
+            "event": "question_completed",
+            "index": index,
+            "line": line,
+            "strategic_question": input_data.get("strategic_question"),
+            "status": status,
+            "error": error,
+            "session_id": run.session_id,
+            "elapsed_seconds": round(time.monotonic() - started, 2),
+            "llm_attempts": run.budget.attempts,
+            "degraded_stages": run.degraded_stages,
+            "results": results,
+        }
+
+    def progress(self, running: int) -> Dict[str, Any]:
+        """Overall progress and throughput of the run so far."""
+        elapsed = time.monotonic() - self.started_at
+        finished = self.completed + self.failed
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - finished
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "running": running,
+            "pending": remaining - running,
+            "elapsed_seconds": round(elapsed, 2),
+            "questions_per_minute": round(rate * 60, 2),
+            "eta_seconds": round(remaining / rate, 1) if rate > 0 else None,
+            "llm_attempts": self.llm_attempts,
+            "llm_concurrency_window": llm_concurrency.window,
+        }
+
+    async def run(self, items: List[Tuple[int, Dict[str, Any]]],
+                  is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyze every (line, input_data) item. Yields a question_completed event per
+        question as it finishes, each followed by a progress event.
+        Stops (cancelling running analyses) when is_disconnected() turns true.
+        """
+        self.total = len(items)
+        self.started_at = time.monotonic()
+        pending = deque(enumerate(items))
+        running: Dict[asyncio.Task, int] = {}
+        try:
+            while pending or running:
+                while pending and len(running) < self.max_concurrent and not (running and self._saturated()):
+                    index, (line, input_data) = pending.popleft()
+                    running[asyncio.create_task(self._analyze(index, line, input_data))] = index
+
+                finished, _ = await asyncio.wait(running, timeout=BULK_ADMISSION_POLL_SECONDS,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    del running[task]
+                    event = task.result()
+                    if event["status"] == "success":
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                    yield event
+                    yield {"event": "progress", **self.progress(len(running))}
+
+                if is_disconnected is not None and await is_disconnected():
+                    logger.info(f"Bulk client disconnected; cancelling {len(running)} running analyses")
+                    break
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
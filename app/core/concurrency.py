@@ -0,0 +1,213 @@
+"""
+Adaptive (AIMD) limit on the number of LLM calls in flight.
+
+The window grows by roughly one slot per fully used window of successful calls and
+is cut multiplicatively when the provider pushes back - a 429, a timeout, or a
+response that takes far longer than the recent baseline. Calls beyond the window
+wait in one FIFO queue per priority class (app/core/priority.py), and freed slots
+go to the classes by smooth weighted round robin, so under load the process
+settles near the concurrency the provider can actually serve and interactive
+analyses are not stuck behind a bulk run.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, Optional
+from dotenv import load_dotenv
+from app.core.priority import PRIORITY_CLASSES, LLM_PRIORITY_WEIGHTS, current_priority
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+LLM_CONCURRENCY_ENABLED = os.getenv("LLM_CONCURRENCY_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CONCURRENCY_INITIAL = float(os.getenv("LLM_CONCURRENCY_INITIAL", 8))
+LLM_CONCURRENCY_MIN = float(os.getenv("LLM_CONCURRENCY_MIN", 1))
+LLM_CONCURRENCY_MAX = float(os.getenv("LLM_CONCURRENCY_MAX", 64))
+LLM_CONCURRENCY_BACKOFF = float(os.getenv("LLM_CONCURRENCY_BACKOFF", 0.5))  # multiplier on overload
+LLM_CONCURRENCY_LATENCY_TOLERANCE = float(os.getenv("LLM_CONCURRENCY_LATENCY_TOLERANCE", 3.0))  # x baseline; 0 disables
+
+# Outcomes reported by callers when releasing a slot
+SUCCESS = "success"
+RATE_LIMITED = "rate_limited"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+class AdaptiveConcurrencyLimiter:
+    """Additive-increase / multiplicative-decrease window on concurrent LLM calls."""
+
+    def __init__(self, initial: float = LLM_CONCURRENCY_INITIAL, min_limit: float = LLM_CONCURRENCY_MIN,
+                 max_limit: float = LLM_CONCURRENCY_MAX, backoff: float = LLM_CONCURRENCY_BACKOFF,
+                 latency_tolerance: float = LLM_CONCURRENCY_LATENCY_TOLERANCE,
+                 enabled: bool = LLM_CONCURRENCY_ENABLED,
+                 weights: Optional[Dict[str, float]] = None):
+        self.enabled = enabled
+        self.min_limit = max(1.0, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+
+        self.weights = dict(weights or LLM_PRIORITY_WEIGHTS)
+        self.in_flight = 0
+        self._waiters: Dict[str, deque] = {name: deque() for name in self.weights}
+        self._credit: Dict[str, float] = {name: 0.0 for name in self.weights}
+        self._last_decrease = 0.0
+        self._latency_baseline: Optional[float] = None
+        self._latency_samples = 0
+        self.stats = {
+            "acquired": 0,
+            "queued_calls": 0,
+            "increases": 0,
+            "decreases": 0,
+            "rate_limited": 0,
+            "timeouts": 0,
+            "latency_spikes": 0,
+            "total_wait_seconds": 0.0,
+        }
+        self.wait_by_priority = {name: {"calls": 0, "queued_calls": 0, "total_wait_seconds": 0.0}
+                                 for name in self.weights}
+
+    @property
+    def window(self) -> int:
+        """Number of calls currently allowed in flight."""
+        return int(self.limit)
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._waiters.values())
+
+    def queued_by_priority(self) -> Dict[str, int]:
+        return {name: len(queue) for name, queue in self._waiters.items()}
+
+    async def acquire(self, priority: Optional[str] = None) -> float:
+        """Wait for a slot in the current window. Returns seconds waited.
+
+        priority defaults to the class bound for the current analysis.
+        """
+        priority = priority or current_priority()
+        if priority not in self._waiters:
+            priority = PRIORITY_CLASSES[-1]
+        self.stats["acquired"] += 1
+        self.wait_by_priority[priority]["calls"] += 1
+        if not self.enabled or (not self.queued and self.in_flight < self.window):
+            self.in_flight += 1
+            return 0.0
+
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        self.stats["queued_calls"] += 1
+        self.wait_by_priority[priority]["queued_calls"] += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._waiters[priority].remove(waiter)
+            raise
+        waited = time.monotonic() - start
+        self.stats["total_wait_seconds"] += waited
+        self.wait_by_priority[priority]["total_wait_seconds"] += waited
+        return waited
+
+    def release(self, started_at: Optional[float], outcome: str) -> None:
+        """Free a slot and adapt the window to how the call went.
+
+        started_at is the monotonic time the upstream request was sent, or None if
+        the call never reached the provider (it then carries no capacity signal).
+        """
+        self.in_flight -= 1
+        if self.enabled and started_at is not None:
+            if outcome == SUCCESS:
+                self._on_success(started_at)
+            elif outcome == RATE_LIMITED:
+                self.stats["rate_limited"] += 1
+                self._decrease(started_at, "rate limit")
+            elif outcome == TIMEOUT:
+                self.stats["timeouts"] += 1
+                self._decrease(started_at, "timeout")
+        self._wake()
+
+    def _on_success(self, started_at: float) -> None:
+        latency = time.monotonic() - started_at
+        baseline = self._latency_baseline
+        if (self.latency_tolerance > 0 and baseline is not None and self._latency_samples >= 5
+                and latency > baseline * self.latency_tolerance):
+            self.stats["latency_spikes"] += 1
+            self._decrease(started_at, f"latency {latency:.1f}s vs baseline {baseline:.1f}s")
+            return
+
+        # Slow-moving baseline so a gradual slowdown is not mistaken for normal
+        self._latency_samples += 1
+        self._latency_baseline = latency if baseline is None else baseline * 0.9 + latency * 0.1
+
+        # Only grow when the window was actually full; idle capacity says nothing about the provider
+        if self.in_flight + 1 >= self.window and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.stats["increases"] += 1
+
+    def _decrease(self, started_at: float, reason: str) -> None:
+        # Calls sent before the last cut saw the old window; reacting to each of them
+        # would collapse the window on a single burst of errors
+        if started_at < self._last_decrease:
+            return
+        previous = self.limit
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._last_decrease = time.monotonic()
+        self.stats["decreases"] += 1
+        logger.warning(f"LLM concurrency window {previous:.1f} -> {self.limit:.1f} ({reason})")
+
+    def _next_class(self) -> Optional[str]:
+        # Smooth weighted round robin over the classes that have waiters: each round every
+        # such class earns its weight, the richest one is served and pays the round's total
+        ready = [name for name, queue in self._waiters.items() if queue]
+        if not ready:
+            return None
+        for name in ready:
+            self._credit[name] += self.weights[name]
+        chosen = max(ready, key=lambda name: self._credit[name])
+        self._credit[chosen] -= sum(self.weights[name] for name in ready)
+        return chosen
+
+    def _wake(self) -> None:
+        while not self.enabled or self.in_flight < self.window:
+            name = self._next_class()
+            if name is None:
+                break
+            waiter = self._waiters[name].popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current window and adaptation counters."""
+        return {
+            "enabled": self.enabled,
+            "window": self.window,
+            "limit": round(self.limit, 2),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "queued_by_priority": self.queued_by_priority(),
+            "weights": self.weights,
+            "latency_baseline_seconds": round(self._latency_baseline, 3) if self._latency_baseline else None,
+            **self.stats,
+            "total_wait_seconds": round(self.stats["total_wait_seconds"], 3),
+            "wait_by_priority": {
+                name: {**wait, "total_wait_seconds": round(wait["total_wait_seconds"], 3)}
+                for name, wait in self.wait_by_priority.items()
+            },
+        }
+
+# Shared limiter used by every LLM call in this process
+llm_concurrency = AdaptiveConcurrencyLimiter()
@@ -0,0 +1,154 @@
+"""
+Condensation of upstream context before downstream agents inline it in their prompts.
+
+Later agents paste parts of the earlier stages' output into their prompts: Research
+Synthesis the whole Horizon Scan, Strategic Action every synthesis item, High Impact
+the high-priority actions and research insights, Backcasting the initiatives' tasks.
+Those tokens are paid again in latency, TPM budget and 429 pressure. Each such block
+now goes through the context condenser first, which compacts it deterministically
+and extractively - text is removed, never paraphrased, so the same upstream output
+always condenses to the same prompt (and LLM cache key):
+
+    cap_sections         each section (the lines after a heading) is cut to
+                         CONTEXT_MAX_SECTION_CHARS, at a sentence end where possible
+    strip_markdown       heading hashes, emphasis markers, rules and banner dashes go;
+                         bullets become "- "
+    collapse_whitespace  indentation, runs of spaces and repeated blank lines go
+
+A condenser is a named chain of such steps in CONDENSERS; CONTEXT_CONDENSER selects
+one ("extractive" by default, "none" inlines context unchanged), and a new one is
+plugged in by registering its steps. The tokens of every block before and after
+condensation are counted per consuming agent (with the rate limiter's estimate) and
+reported as prompt token savings under "context_condenser" in /api/llm-stats.
+"""
+
+import os
+import re
+import threading
+from functools import partial
+from typing import Any, Callable, Dict, List
+from dotenv import load_dotenv
+from app.core.rate_limiter import estimate_tokens
+
+load_dotenv()
+
+# Configuration
+CONTEXT_CONDENSER = os.getenv("CONTEXT_CONDENSER", "extractive")
+CONTEXT_MAX_SECTION_CHARS = int(os.getenv("CONTEXT_MAX_SECTION_CHARS", 3000))
+
+# Lines that open a section of upstream context
+HEADING_LINE = re.compile(
+    r"\s*(?:#{1,6}\s"                      # markdown heading
+    r"|\*\*[^*]+\*\*:?\s*$"                # line that is all bold
+    r"|[-=]{3,}\s*[^-=\s].*?[-=]{3,}\s*$"  # --- banner --- / === banner ===
+    r"|[^\s\-*•\d][^:]{0,80}:\s*$)"        # short label ending in a colon
+)
+RULE_LINE = re.compile(r"\s*(?:[-*_]\s*){3,}$")
+BANNER = re.compile(r"\s*[-=]{3,}\s*([^-=\s].*?)\s*[-=]{3,}\s*$")
+HEADING_MARK = re.compile(r"^\s*#{1,6}\s*")
+QUOTE_MARK = re.compile(r"^\s*>\s?")
+BULLET_MARK = re.compile(r"^(\s*)[*•+]\s+")
+EMPHASIS = re.compile(r"\*\*(.+?)\*\*|__(.+?)__")
+SENTENCE_END = re.compile(r"[.!?](?=\s)")
+
+def _truncate(line: str, room: int) -> str:
+    """The line cut to at most room characters: after its last full sentence, or else at a word."""
+    cut = line[:room]
+    ends = [match.end() for match in SENTENCE_END.finditer(cut)]
+    if ends and ends[-1] > room // 2:
+        return cut[:ends[-1]] + " …"
+    return cut.rsplit(" ", 1)[0] + " …" if " " in cut else "…"
+
+def cap_sections(text: str, max_chars: int = CONTEXT_MAX_SECTION_CHARS) -> str:
+    """Keep at most max_chars of each section's lines; the text before the first heading counts as one section."""
+    lines: List[str] = []
+    used, full = 0, False
+    for line in text.split("\n"):
+        if HEADING_LINE.match(line):
+            lines.append(line)
+            used, full = 0, False
+            continue
+        if full and line.strip():
+            continue
+        if used + len(line) > max_chars:
+            line, full = _truncate(line, max_chars - used), True
+        lines.append(line)
+        used += len(line) + 1
+    return "\n".join(lines)
+
+def strip_markdown(text: str) -> str:
+    lines = []
+    for line in text.split("\n"):
+        if RULE_LINE.match(line):
+            continue
+        banner = BANNER.match(line)
+        if banner:
+            line = banner.group(1)
+        line = HEADING_MARK.sub("", line)
+        line = QUOTE_MARK.sub("", line)
+        line = BULLET_MARK.sub(r"\1- ", line)
+        line = EMPHASIS.sub(lambda match: match.group(1) or match.group(2), line)
+        lines.append(line.replace("**", ""))
+    return "\n".join(lines)
+
+def collapse_whitespace(text: str) -> str:
+    lines: List[str] = []
+    for line in text.split("\n"):
+        line = " ".join(line.split())
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return "\n".join(lines).strip("\n")
+
+# Named condensers: the steps they apply, in order, given the section length cap
+CONDENSERS: Dict[str, Callable[[int], List[Callable[[str], str]]]] = {
+    "extractive": lambda max_chars: [partial(cap_sections, max_chars=max_chars), strip_markdown, collapse_whitespace],
+    "none": lambda max_chars: [],
+}
+
+class ContextCondenser:
+    """Compacts upstream context with a chain of steps and counts the prompt tokens saved per agent."""
+
+    def __init__(self, name: str = CONTEXT_CONDENSER, max_section_chars: int = CONTEXT_MAX_SECTION_CHARS):
+        if name not in CONDENSERS:
+            raise ValueError(f"Unknown context condenser '{name}' (expected one of: {', '.join(CONDENSERS)})")
+        self.name = name
+        self.max_section_chars = max_section_chars
+        self.steps = CONDENSERS[name](max_section_chars)
+        self._lock = threading.Lock()
+        self._agents: Dict[str, Dict[str, int]] = {}
+
+    def condense(self, text: str, agent: str) -> str:
+        """The block of upstream context as it should appear in the agent's prompt."""
+        if not text:
+            return text
+        condensed = text
+        for step in self.steps:
+            condensed = step(condensed)
+        tokens_in, tokens_out = estimate_tokens(text), estimate_tokens(condensed)
+        with self._lock:
+            counts = self._agents.setdefault(agent, {"blocks": 0, "tokens_in": 0, "tokens_out": 0})
+            counts["blocks"] += 1
+            counts["tokens_in"] += tokens_in
+            counts["tokens_out"] += tokens_out
+        return condensed
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            agents = {
+                agent: {**counts, "tokens_saved": counts["tokens_in"] - counts["tokens_out"],
+                        "saved_pct": round(100 * (1 - counts["tokens_out"] / counts["tokens_in"]), 1) if counts["tokens_in"] else 0.0}
+                for agent, counts in self._agents.items()
+            }
+        tokens_in = sum(counts["tokens_in"] for counts in agents.values())
+        tokens_out = sum(counts["tokens_out"] for counts in agents.values())
+        return {
+            "condenser": self.name,
+            "max_section_chars": self.max_section_chars,
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "tokens_saved": tokens_in - tokens_out,
+            "agents": agents,
+        }
+
+# Shared condenser used by all agents
+context_condenser = ContextCondenser()
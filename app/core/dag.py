@@ -0,0 +1,138 @@
+"""
+Dependency-driven scheduler for the agent pipeline.
+
+Each node names the upstream nodes whose output it reads. A node starts the moment
+its last dependency finishes - there are no fixed stages - so independent branches
+overlap as much as the graph allows. Parallelism is bounded where it matters, at
+the LLM call (see app/core/concurrency.py and app/core/rate_limiter.py).
+
+Every run records a per-node timeline and the critical path (the chain of
+dependencies that determined when the last node finished), which is what has to
+get shorter for an analysis to get faster.
+"""
+
+import time
+import asyncio
+from typing import Dict, Any, List, Callable, Awaitable, Optional
+
+class DagScheduler:
+    """Runs named nodes as soon as all of their dependencies have finished."""
+
+    def __init__(self, dependencies: Dict[str, List[str]]):
+        unknown = {dep for deps in dependencies.values() for dep in deps if dep not in dependencies}
+        if unknown:
+            raise ValueError(f"Unknown pipeline dependencies: {', '.join(sorted(unknown))}")
+        self.dependencies = {node: list(deps) for node, deps in dependencies.items()}
+        self.order = self._topological_order()
+        self._started_at = 0.0
+        self._records: Dict[str, Dict[str, Any]] = {}
+
+    def _topological_order(self) -> List[str]:
+        order: List[str] = []
+        remaining = dict(self.dependencies)
+        while remaining:
+            ready = [node for node, deps in remaining.items() if all(dep in order for dep in deps)]
+            if not ready:
+                raise ValueError(f"Pipeline dependencies contain a cycle: {', '.join(sorted(remaining))}")
+            for node in ready:
+                order.append(node)
+                del remaining[node]
+        return order
+
+    async def run(self, run_node: Callable[[str], Awaitable[Any]],
+                  failed: Callable[[Any], bool] = lambda result: False,
+                  skip_dependents_on_failure: bool = True,
+                  completed: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Execute the graph. Returns {node: result}; a node that raised maps to its exception.
+        With skip_dependents_on_failure, nodes downstream of a failure are not started.
+        Nodes in `completed` (e.g. restored from a checkpoint) count as finished and are not run.
+        """
+        self._started_at = time.monotonic()
+        self._records = {}
+        results: Dict[str, Any] = dict(completed or {})
+        done: set = set(results)
+        bad: set = set()
+        running: Dict[asyncio.Task, str] = {}
+        pending = [node for node in self.order if node not in done]
+        for node in done:
+            self._record(node, "reused")
+
+        try:
+            while pending or running:
+                for node in list(pending):
+                    deps = self.dependencies[node]
+                    if not all(dep in done for dep in deps):
+                        continue
+                    pending.remove(node)
+                    if skip_dependents_on_failure and any(dep in bad for dep in deps):
+                        self._record(node, "skipped")
+                        done.add(node)
+                        bad.add(node)
+                        continue
+                    self._record(node, "running")
+                    running[asyncio.create_task(run_node(node))] = node
+
+                if not running:
+                    break
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    node = running.pop(task)
+                    try:
+                        result = task.result()
+                        status = "error" if failed(result) else "success"
+                    except Exception as e:
+                        result = e
+                        status = "error"
+                    results[node] = result
+                    self._finish(node, status)
+                    done.add(node)
+                    if status != "success":
+                        bad.add(node)
+        finally:
+            # Cancelled from outside (e.g. the client went away): stop every branch
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            for node in running.values():
+                self._finish(node, "cancelled")
+
+        return results
+
+    def _now(self) -> float:
+        return round(time.monotonic() - self._started_at, 3)
+
+    def _record(self, node: str, status: str) -> None:
+        now = self._now()
+        self._records[node] = {
+            "node": node,
+            "depends_on": self.dependencies[node],
+            "status": status,
+            "started_at": now,
+            "finished_at": now if status in ("skipped", "reused") else None,
+            "duration_seconds": 0.0 if status in ("skipped", "reused") else None,
+        }
+
+    def _finish(self, node: str, status: str) -> None:
+        record = self._records[node]
+        record["status"] = status
+        record["finished_at"] = self._now()
+        record["duration_seconds"] = round(record["finished_at"] - record["started_at"], 3)
+
+    def get_timeline(self) -> Dict[str, Any]:
+        """Per-node start/finish offsets (seconds from run start) and the critical path."""
+        finished = {node: rec for node, rec in self._records.items() if rec["finished_at"] is not None}
+        critical_path: List[str] = []
+        node: Optional[str] = max(finished, key=lambda n: finished[n]["finished_at"]) if finished else None
+        while node is not None:
+            critical_path.insert(0, node)
+            deps = [dep for dep in self.dependencies[node] if dep in finished]
+            node = max(deps, key=lambda n: finished[n]["finished_at"]) if deps else None
+
+        return {
+            "makespan_seconds": max((rec["finished_at"] for rec in finished.values()), default=0.0),
+            "critical_path": critical_path,
+            "critical_path_seconds": round(sum(finished[n]["duration_seconds"] for n in critical_path), 3),
+            "nodes": [self._records[node] for node in self.order if node in self._records],
+        }
@@ -0,0 +1,145 @@
+"""
+Request-scoped deadline and retry budget for LLM calls.
+
+An analysis gets one RequestBudget when the HTTP request arrives: an absolute
+deadline and a cap on upstream LLM attempts shared by all of its agents. The
+orchestrator binds it around the pipeline and BaseAgent consults it for every
+attempt - each per-attempt timeout is clipped to the time that is left, and a
+retry is only scheduled if both time and attempts remain. This replaces stacked
+per-layer timeouts and retry loops that could multiply upstream calls.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Union
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+ANALYSIS_DEADLINE_SECONDS = float(os.getenv("ANALYSIS_DEADLINE_SECONDS", 600))
+# Unset (0), an analysis may make two attempts per LLM call of the pipeline it runs,
+# i.e. one retry per call on average; see RequestBudget.cover_calls
+ANALYSIS_MAX_LLM_ATTEMPTS = int(os.getenv("ANALYSIS_MAX_LLM_ATTEMPTS", 0))
+ATTEMPTS_PER_LLM_CALL = 2
+PIPELINE_LLM_CALLS = 8  # one per agent, until the orchestrator counts its own
+
+class BudgetExhausted(Exception):
+    """The analysis ran out of time or upstream attempts."""
+
+class RequestBudget:
+    """Deadline plus upstream-attempt allowance for one analysis."""
+
+    def __init__(self, timeout_seconds: Optional[float] = None, max_attempts: Optional[int] = None):
+        # Clients may ask for a shorter deadline than the server default, never a longer one
+        if timeout_seconds is None or timeout_seconds <= 0:
+            timeout_seconds = ANALYSIS_DEADLINE_SECONDS
+        self.timeout_seconds = min(timeout_seconds, ANALYSIS_DEADLINE_SECONDS)
+        # A configured cap is kept as is; the default one follows the pipeline's LLM calls
+        self.fixed_attempts = bool(max_attempts or ANALYSIS_MAX_LLM_ATTEMPTS)
+        self.max_attempts = max_attempts or ANALYSIS_MAX_LLM_ATTEMPTS or ATTEMPTS_PER_LLM_CALL * PIPELINE_LLM_CALLS
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + self.timeout_seconds
+        self.attempts = 0
+        self.retries = 0
+        self.denied = 0
+
+    def cover_calls(self, calls: int) -> None:
+        """Size the default attempt cap for a pipeline that makes `calls` LLM calls."""
+        if not self.fixed_attempts:
+            self.max_attempts = ATTEMPTS_PER_LLM_CALL * calls
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline."""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def start_attempt(self, retry: bool = False) -> None:
+        """Charge one upstream attempt, or raise BudgetExhausted if none are left."""
+        if self.expired():
+            self.denied += 1
+            raise BudgetExhausted(f"Analysis deadline of {self.timeout_seconds:.0f}s exceeded")
+        if self.attempts >= self.max_attempts:
+            self.denied += 1
+            raise BudgetExhausted(f"Analysis used all {self.max_attempts} LLM attempts")
+        self.attempts += 1
+        if retry:
+            self.retries += 1
+
+    def attempt_timeout(self, cap: float) -> float:
+        """Timeout for the next attempt: the agent's own limit, clipped to the time left."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            self.denied += 1
+            raise BudgetExhausted(f"Analysis deadline of {self.timeout_seconds:.0f}s exceeded")
+        return min(cap, remaining)
+
+    def allows_retry(self, delay: float) -> bool:
+        """Whether a retry after `delay` seconds would still have an attempt and time to run."""
+        return self.attempts < self.max_attempts and self.remaining() > delay + 1.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Budget usage, reported with the analysis results."""
+        return {
+            "deadline_seconds": self.timeout_seconds,
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 2),
+            "remaining_seconds": round(self.remaining(), 2),
+            "max_attempts": self.max_attempts,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "denied": self.denied,
+        }
+
+class SharedBudget:
+    """
+    Budget of work done on behalf of several analyses at once (a coalesced LLM call).
+    Each attempt is charged to every analysis still waiting for the work; it may start
+    while any of them has an attempt left, and run as long as any of them has time.
+    """
+
+    def __init__(self):
+        self.budgets: List[RequestBudget] = []
+        self.unbounded = 0  # waiters outside any analysis budget
+        self.attempts = 0
+
+    def start_attempt(self, retry: bool = False) -> None:
+        charged = 0
+        for budget in list(self.budgets):
+            try:
+                budget.start_attempt(retry=retry)
+                charged += 1
+            except BudgetExhausted:
+                pass
+        if not charged and not self.unbounded:
+            raise BudgetExhausted("No analysis waiting for this call has LLM attempts or time left")
+        self.attempts += 1
+
+    def attempt_timeout(self, cap: float) -> float:
+        if self.unbounded:
+            return cap
+        remaining = max((budget.remaining() for budget in self.budgets), default=0.0)
+        if remaining <= 0:
+            raise BudgetExhausted("No analysis waiting for this call has time left")
+        return min(cap, remaining)
+
+    def allows_retry(self, delay: float) -> bool:
+        return bool(self.unbounded) or any(budget.allows_retry(delay) for budget in self.budgets)
+
+_current_budget: ContextVar[Optional[Union[RequestBudget, SharedBudget]]] = ContextVar("request_budget", default=None)
+
+@contextmanager
+def request_budget(budget: Optional[Union[RequestBudget, SharedBudget]]):
+    """Charge LLM calls made inside this block to `budget`."""
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+def current_budget() -> Optional[Union[RequestBudget, SharedBudget]]:
+    """Budget of the analysis being processed, or None outside a request."""
+    return _current_budget.get()
@@ -0,0 +1,338 @@
+"""
+Deterministic offline LLM backend for load tests and benchmarks.
+
+Selected with LLM_BACKEND=fake. FakeChatModel mimics the parts of
+ChatGoogleGenerativeAI the agents use (ainvoke/astream) and returns canned markdown in
+the exact formats each agent's parser expects, so the whole pipeline - parsers and
+database writes included - runs without GOOGLE_API_KEY or Gemini quota. Calls made in
+JSON mode (structured output) get a JSON object generated from the schema in the prompt.
+
+Latency, token throughput and injected failures are configurable:
+    FAKE_LLM_SEED                 base seed; identical prompts always get identical output
+    FAKE_LLM_LATENCY_DIST         fixed | uniform | lognormal   (time to first token)
+    FAKE_LLM_LATENCY_MEAN         seconds
+    FAKE_LLM_LATENCY_SPREAD       seconds (uniform half-width) or sigma (lognormal)
+    FAKE_LLM_TOKENS_PER_SECOND    generation speed after the first token (0 = instant)
+    FAKE_LLM_RATE_LIMIT_RATE      probability a call fails with a 429
+    FAKE_LLM_TIMEOUT_RATE         probability a call hangs and times out
+    FAKE_LLM_HANG_SECONDS         how long a timed-out call hangs before failing
+"""
+
+import os
+import json
+import math
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional, AsyncIterator
+from langchain_core.messages import AIMessage, AIMessageChunk
+from dotenv import load_dotenv
+from app.core.structured import SCHEMA_MARKER
+
+load_dotenv()
+
+FAKE_LLM_SEED = os.getenv("FAKE_LLM_SEED", "0")
+FAKE_LLM_LATENCY_DIST = os.getenv("FAKE_LLM_LATENCY_DIST", "lognormal")
+FAKE_LLM_LATENCY_MEAN = float(os.getenv("FAKE_LLM_LATENCY_MEAN", 0.5))
+FAKE_LLM_LATENCY_SPREAD = float(os.getenv("FAKE_LLM_LATENCY_SPREAD", 0.4))
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", 0))
+FAKE_LLM_RATE_LIMIT_RATE = float(os.getenv("FAKE_LLM_RATE_LIMIT_RATE", 0))
+FAKE_LLM_TIMEOUT_RATE = float(os.getenv("FAKE_LLM_TIMEOUT_RATE", 0))
+FAKE_LLM_HANG_SECONDS = float(os.getenv("FAKE_LLM_HANG_SECONDS", 0))
+
+_SENTENCES = [
+    "Adoption is accelerating fastest where regulatory clarity and funding already exist.",
+    "Incumbents are responding with partnerships rather than building capabilities in-house.",
+    "Stakeholders consistently cite data quality and interoperability as the binding constraints.",
+    "Early pilots show measurable gains but have not yet been replicated at scale.",
+    "Public expectations are shifting faster than institutional processes can adapt.",
+    "Cost curves are falling, which lowers the barrier for smaller market entrants.",
+    "Talent shortages remain a recurring bottleneck across every implementation phase.",
+    "Cross-border coordination will determine whether gains compound or fragment.",
+    "Evidence from comparable regions suggests a three to five year window of opportunity.",
+    "Governance frameworks that build trust early reduce resistance during later rollout.",
+    "Investment is concentrating in a few platforms, raising concentration risk.",
+    "Feedback loops between policy and practice are still slow and poorly instrumented.",
+]
+
+class FakeChatModel:
+    """Drop-in, offline replacement for the chat model used by BaseAgent."""
+
+    def __init__(self, model: str = "fake-llm", seed: str = FAKE_LLM_SEED,
+                 latency_dist: str = FAKE_LLM_LATENCY_DIST, latency_mean: float = FAKE_LLM_LATENCY_MEAN,
+                 latency_spread: float = FAKE_LLM_LATENCY_SPREAD, tokens_per_second: float = FAKE_LLM_TOKENS_PER_SECOND,
+                 rate_limit_rate: float = FAKE_LLM_RATE_LIMIT_RATE, timeout_rate: float = FAKE_LLM_TIMEOUT_RATE,
+                 hang_seconds: float = FAKE_LLM_HANG_SECONDS, **settings):
+        self.model = model
+        self.seed = str(seed)
+        self.latency_dist = latency_dist
+        self.latency_mean = latency_mean
+        self.latency_spread = latency_spread
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.settings = settings
+        self._occurrences: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    # --- LangChain-compatible surface ---
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> AIMessage:
+        rng, text = self._prepare(messages, **kwargs)
+        await self._simulate_call(rng)
+        await asyncio.sleep(self._generation_time(text))
+        return AIMessage(content=text)
+
+    async def astream(self, messages: List[Any], **kwargs) -> AsyncIterator[AIMessageChunk]:
+        rng, text = self._prepare(messages, **kwargs)
+        await self._simulate_call(rng)
+        lines = text.splitlines(keepends=True)
+        for i in range(0, len(lines), 4):
+            chunk = "".join(lines[i:i + 4])
+            await asyncio.sleep(self._generation_time(chunk))
+            yield AIMessageChunk(content=chunk)
+
+    # --- Simulation ---
+
+    def _prepare(self, messages: List[Any], generation_config: Optional[Dict[str, Any]] = None, **kwargs):
+        json_mode = (generation_config or {}).get("response_mime_type") == "application/json"
+        system_prompt = str(messages[0].content) if messages else ""
+        prompt = str(messages[-1].content) if messages else ""
+        digest = hashlib.sha256(f"{system_prompt}\x00{prompt}".encode("utf-8")).hexdigest()
+        with self._lock:
+            occurrence = self._occurrences.get(digest, 0)
+            self._occurrences[digest] = occurrence + 1
+            self.calls += 1
+        # Same prompt + same seed + same attempt number => same latency, failures and text
+        rng = random.Random(f"{self.seed}:{digest}:{occurrence}")
+        text = render_fake_response(system_prompt, prompt, random.Random(f"{self.seed}:{digest}"), json_mode)
+        return rng, text
+
+    async def _simulate_call(self, rng: random.Random) -> None:
+        roll = rng.random()
+        if roll < self.rate_limit_rate:
+            await asyncio.sleep(min(self._latency(rng), 0.2))
+            raise Exception("429 Resource has been exhausted (e.g. check quota). (fake backend)")
+        if roll < self.rate_limit_rate + self.timeout_rate:
+            await asyncio.sleep(self.hang_seconds)
+            raise asyncio.TimeoutError("Fake LLM call timed out")
+        await asyncio.sleep(self._latency(rng))
+
+    def _latency(self, rng: random.Random) -> float:
+        if self.latency_dist == "fixed":
+            return self.latency_mean
+        if self.latency_dist == "uniform":
+            return max(0.0, rng.uniform(self.latency_mean - self.latency_spread, self.latency_mean + self.latency_spread))
+        # lognormal with the configured mean; spread is sigma of the underlying normal
+        sigma = self.latency_spread
+        mu = math.log(max(self.latency_mean, 1e-6)) - sigma ** 2 / 2
+        return rng.lognormvariate(mu, sigma)
+
+    def _generation_time(self, text: str) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return (len(text) / 4) / self.tokens_per_second
+
+# --- Canned responses per agent type ---
+
+def _paragraph(rng: random.Random, sentences: int, topic: str) -> str:
+    picked = [rng.choice(_SENTENCES) for _ in range(sentences - 1)]
+    return " ".join([f"For {topic}, the evidence points to a clear strategic inflection point."] + picked)
+
+def _topic(prompt: str) -> str:
+    for line in prompt.splitlines():
+        for marker in ("Strategic Question:", "Original Problem Statement:", "strategic question:"):
+            if marker in line:
+                topic = line.split(marker, 1)[1].strip().strip('"')
+                if topic:
+                    return topic[:80]
+    return "this strategic challenge"
+
+def _problem_explorer(rng, topic, prompt):
+    sections = [
+        ("SECTION 1: DEFINING THE PROBLEM", ["What is the core problem?", "Why is addressing this problem important?", "Who are the key stakeholders for this problem?", "What is not the problem", "What is the current situation related to the problem?"]),
+        ("SECTION 2: BREAKING DOWN THE PROBLEM", ["What are the different parts of the problem?", "What are the relationships between different parts of the problem?", "In what ways can you reframe the problem?", "What are the underlying causes of this problem?", "Have you come across similar problems that could be considered to solve the problem?"]),
+        ("SECTION 3: INFORMATION ASSESSMENT AND GATHERING", ["What information do you have on the problem?", "Is the information sufficient to solve the problem?", "What further information do you require to solve the problem?", "What are you not yet understanding about the problem?", "How do you plan to gather more information to address gaps in information/understanding of the problem?"]),
+        ("SECTION 4: SOLUTION EXPLORATION AND INNOVATION", ["Can you solve the whole problem or part of the problem?", "Can you list out the different ways in which you can solve the problem?", "How have others solved the problem or similar problems?", "Can you describe what the final solution may look like and what innovation you could introduce?", "What may be the result of solving the problem?"]),
+        ("SECTION 5: IMPLEMENTING THE SOLUTION", ["What are key actions need to be taken to implement the solution?", "Who must be involved in the implementation of the solution?", "What is the timeline for implementation?", "What resources are required to implement the solution?", "What will success look like, and how will you measure it?"]),
+    ]
+    out = [f"Step 1: I understand the challenge as {topic}, and the need to act before the window of opportunity closes.", ""]
+    for header, questions in sections:
+        out.append(f"**{header}**")
+        out.extend(f"- **{q}**: {_paragraph(rng, 4, topic)}" for q in questions)
+        out.append("")
+    out.append("**Key Takeaways**")
+    out.extend(f"- {_paragraph(rng, 1, topic)} {rng.choice(_SENTENCES)}" for _ in range(5))
+    return "\n".join(out)
+
+def _best_practices(rng, topic, prompt):
+    out = []
+    for i, org in enumerate(["Nordic Innovation Council", "Singapore Digital Office", "Rotterdam Port Authority"], 1):
+        out += [
+            f"### Best Practice {i}: Coordinated Transition Programme {i}",
+            f"**Time Frame:** {2015 + i}-{2019 + i}",
+            f"**Organization:** {org}",
+            f"**Challenge:** {_paragraph(rng, 4, topic)}",
+            f"**Problem:** {_paragraph(rng, 4, topic)}",
+            f"**Solution:** {_paragraph(rng, 4, topic)}",
+            "**Implementation Steps:**",
+            "1. Establish a cross-sector steering group with a clear mandate.",
+            "2. Run time-boxed pilots with published success criteria.",
+            "3. Scale the pilots that meet their targets and retire the rest.",
+            f"**Results:** {_paragraph(rng, 4, topic)}",
+            "**Categorical Tags:** Governance, Innovation, Scaling, Partnerships, Measurement",
+            f"**Reference:** https://example.org/case-studies/{i}",
+            "",
+        ]
+    out += ["### Next Practice Recommendation", _paragraph(rng, 5, topic), "",
+            "### Key Implementation Steps"] + [f"{i}. {_paragraph(rng, 2, topic)}" for i in range(1, 4)]
+    out += ["", "### Success Metrics"] + [f"{i}. {_paragraph(rng, 2, topic)}" for i in range(1, 4)]
+    return "\n".join(out)
+
+def _horizon_scanning(rng, topic, prompt):
+    out = ["## Weak Signals:", ""]
+    for i, (title, time) in enumerate([("Decentralised Data Cooperatives", "Near"), ("Outcome-Based Public Procurement", "Medium"), ("Synthetic Expertise Marketplaces", "Long")], 1):
+        out += [f"**{i}. {title}**", f"- **Domain:** Technology / Governance", f"- **Description:** {_paragraph(rng, 5, topic)}",
+                f"- **Impact:** {rng.randint(5, 9)}", f"- **Time:** {time}", ""]
+    out += ["## Key Uncertainties:", ""]
+    for i, (title, time) in enumerate([("Pace of Regulatory Convergence", "Medium"), ("Public Trust in Automated Decisions", "Near"), ("Capital Availability After Rate Cycles", "Long")], 1):
+        out += [f"**{i}. {title}**", f"- **Domain:** Policy / Society", f"- **Description:** {_paragraph(rng, 5, topic)}",
+                f"- **Impact:** {rng.randint(5, 9)}", f"- **Time:** {time}", ""]
+    out += ["## Change Drivers:", ""]
+    out += [f"**{driver}:** {_paragraph(rng, 3, topic)}" for driver in
+            ["Tech", "Market", "Society", "Demographics", "Economic", "Political", "Legal", "Environmental"]]
+    return "\n".join(out)
+
+def _scenario_planning(rng, topic, prompt):
+    # A fanned-out call asks for a single section ("write only the GBN Framework section")
+    sections = [name for name in ["GBN Framework", "Change Progression Model", "Synthesis of scenarios"]
+                if f"only the {name} section" in prompt] or ["GBN Framework", "Change Progression Model", "Synthesis of scenarios"]
+    out = []
+    if "GBN Framework" in sections:
+        out += ["1. GBN Framework", ""]
+        for position, title in zip(["A1", "A2", "B1", "B2"], ["Open Acceleration", "Guarded Progress", "Fragmented Islands", "Stalled Transition"]):
+            out += [f"- title: {title}", f"- matrix_position: {position}", f"- description: {_paragraph(rng, 8, topic)}", ""]
+    if "Change Progression Model" in sections:
+        out += ["2. Change Progression Model", ""]
+        for level, title in zip(["No Change", "Marginal Change", "Adaptive Change", "Radical Change"], ["Business as Usual", "Incremental Gains", "Structural Realignment", "System Reinvention"]):
+            out += [f"- level: {level}", f"- title: {title}", f"- description: {_paragraph(rng, 8, topic)}", ""]
+    if "Synthesis of scenarios" in sections:
+        out += ["**Synthesis of scenarios:**", _paragraph(rng, 5, topic), "",
+                "**Key strategic insights and early warning indicators:**"] + [f"- {rng.choice(_SENTENCES)}" for _ in range(4)]
+    return "\n".join(out)
+
+def _research_synthesis(rng, topic, prompt):
+    sections = [
+        ("Section 1: Key Insights", ["Insight", "Actionable Implication", "Strategic Translation"]),
+        ("Section 2: Opportunity Spaces", ["Opportunity", "Rationale", "Potential Impact"]),
+        ("Section 3: Risk & Resilience", ["Risk", "Resilience Strategy", "Futureproofing"]),
+        ("Section 4: Innovation Pathways", ["Gap", "Emerging Innovation", "Strategic Fit"]),
+        ("Section 5: Quick Wins vs Long-Term Strategies", ["Quick Wins", "Long-Term Strategies", "Balance Consideration"]),
+    ]
+    out = []
+    for header, subheadings in sections:
+        out += [f"**{header}**", ""]
+        for sub in subheadings:
+            out += [f"**{sub}:**", _paragraph(rng, 5, topic), ""]
+        out += ["---", ""]
+    return "\n".join(out)
+
+def _strategic_action(rng, topic, prompt):
+    out = []
+    horizons = [
+        "### Near-Term (0–2 Years) – Quick Wins & Urgent Needs",
+        "### Medium-Term (2–5 Years) – Strategic Build-Out",
+        "### Long-Term (5–10 Years) – Visionary & Transformational Strategies",
+    ]
+    priorities = ["High", "High", "Medium", "Medium", "Low"]
+    # A fanned-out call asks for a single horizon ("write only the Near-Term ... section")
+    requested = [h for h, header in enumerate(horizons) if f"only the {header[4:]}" in prompt]
+    for h, header in enumerate(horizons):
+        if requested and h not in requested:
+            continue
+        out += [header, ""]
+        for idea in range(1, 3):
+            out += [f"#### Strategic Idea {idea}: Capability Programme {h + 1}.{idea}", "",
+                     f"**Summary:** {_paragraph(rng, 3, topic)}", "", "**Action Items:**"]
+            for a in range(5):
+                description = rng.choice(_SENTENCES).replace("-", " ")
+                out.append(f"{a + 1}. **Workstream {h + 1}.{idea}.{a + 1}** - {description} -- **Priority:** {priorities[a]}")
+            out.append("")
+    return "\n".join(out)
+
+def _high_impact(rng, topic, prompt):
+    out = []
+    for horizon in ["Near-Term", "Medium-Term", "Long-Term"]:
+        out += [
+            f"**Title:** {horizon} Delivery Initiative for {topic[:40]}",
+            f"**Time Horizon:** {horizon}",
+            f"**Why Important:** {_paragraph(rng, 3, topic)}",
+            "**Who It Impacts:** Executive sponsors, delivery teams, regulators, end users",
+            f"**Estimated Cost:** ${rng.randint(2, 40)}M over the horizon, mostly people and platform costs",
+            "**Success Metrics:**",
+        ] + [f"- {rng.choice(_SENTENCES)}" for _ in range(3)] + ["", "**Immediate Tasks:**"]
+        out += [f"{i}. {rng.choice(_SENTENCES)}" for i in range(1, 6)] + [""]
+    return "\n".join(out)
+
+def _backcasting(rng, topic, prompt):
+    def items(count):
+        return [{"rank": i, "title": rng.choice(_SENTENCES).rstrip("."), "justification": _paragraph(rng, 7, topic)}
+                for i in range(1, count + 1)]
+    data = {
+        "near_term_prioritization": items(5),
+        "medium_term_prioritization": items(5),
+        "long_term_prioritization": items(5),
+    }
+    return "```json\n" + json.dumps(data, indent=2) + "\n```"
+
+def _generic(rng, topic, prompt):
+    return "\n\n".join(_paragraph(rng, 5, topic) for _ in range(3))
+
+# Matched against the agent's self-introduction in its system prompt
+_RESPONDERS = [
+    ("You are the Problem Explorer Agent", _problem_explorer),
+    ("You are the Best Practices Research Agent", _best_practices),
+    ("You are the Strategic Horizon Scanning Agent", _horizon_scanning),
+    ("You are the Scenario Planning Agent", _scenario_planning),
+    ("You are the Research Synthesis Agent", _research_synthesis),
+    ("You are the Strategic Action Planning Agent", _strategic_action),
+    ("You are the High-Impact Initiatives Agent", _high_impact),
+    ("You are the Backcasting Agent", _backcasting),
+]
+
+def _from_schema(rng: random.Random, schema: Dict[str, Any], topic: str, name: str = "") -> Any:
+    """A plausible instance of a (structured output) JSON schema."""
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    kind = schema.get("type")
+    if kind == "object":
+        return {key: _from_schema(rng, sub, topic, key) for key, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        count = schema.get("maxItems", max(schema.get("minItems", 0), 3))
+        items = [_from_schema(rng, schema.get("items", {}), topic, name) for _ in range(count)]
+        for rank, item in enumerate(items, 1):
+            if isinstance(item, dict) and "rank" in item:
+                item["rank"] = rank
+        return items
+    if kind in ("integer", "number"):
+        return rng.randint(schema.get("minimum", 1), schema.get("maximum", 10))
+    if kind == "boolean":
+        return rng.random() < 0.5
+    if name.endswith(("title", "category")) or name in ("time_frame", "organization", "domain"):
+        return rng.choice(_SENTENCES).split(",")[0].rstrip(".")
+    return _paragraph(rng, 3, topic)
+
+def render_fake_response(system_prompt: str, prompt: str, rng: random.Random, json_mode: bool = False) -> str:
+    """Canned, parser-compatible markdown for whichever agent issued the prompt
+    (or, in JSON mode, an object matching the schema at the end of the prompt)."""
+    topic = _topic(prompt)
+    if json_mode and SCHEMA_MARKER in prompt:
+        schema = json.loads(prompt.split(SCHEMA_MARKER, 1)[1])
+        return json.dumps(_from_schema(rng, schema, topic), indent=2)
+    for marker, responder in _RESPONDERS:
+        if marker in system_prompt:
+            return responder(rng, topic, prompt)
+    return _generic(rng, topic, prompt)
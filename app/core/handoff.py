@@ -0,0 +1,127 @@
+"""
+Typed hand-off of stage results between agents.
+
+An agent returns its result as a nested dict - {"status", "data": {...}, ...} - whose
+data holds its structured output, the markdown shown to users and usually the raw
+response. That dict is what the API streams and the database stores; downstream
+agents only read it. StageResult wraps a result once, when its stage completes, in
+an immutable slotted object shared by every agent consuming it: its fields
+(structured, text, raw_text) are read directly instead of through
+.get('data', {}).get(...) chains, and the raw text is resolved once for all of them.
+
+The pipelines publish StageResults into the analysis' input data and give each agent
+a read-only view of it instead of a copy. Agents that keep the raw response in more
+than one field for compatibility (raw_sections, raw_response_llm) end up holding one
+shared string, also when the result comes back from the database with a separate
+copy in each field.
+"""
+
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Optional
+
+# Field of each agent's result data that holds its structured output
+STRUCTURED_FIELDS = {
+    "problem_explorer": "structured_output",
+    "best_practices": "structured_practices",
+    "horizon_scanning": "structured_scan",
+    "scenario_planning": "structured_scenario_output",
+    "research_synthesis": "structured_synthesis",
+    "strategic_action": "structured_action_plan",
+    "high_impact": "execution_ready_initiatives",
+    "backcasting": "prioritized_actions",
+}
+
+# Fields holding the raw response text, in order of preference: (enclosing field, field)
+RAW_TEXT_FIELDS = [
+    (None, "raw_response"),
+    (None, "raw_llm_response"),
+    (None, "raw_response_llm"),
+    ("raw_sections", "raw_response"),
+    ("raw_sections", "raw_response_text"),
+]
+
+def _share_raw_text(data: Dict[str, Any]) -> Optional[str]:
+    """The raw response in the data, with every copy of it replaced by the same string."""
+    text = None
+    for enclosing, field in RAW_TEXT_FIELDS:
+        holder = data.get(enclosing) if enclosing else data
+        if not isinstance(holder, dict) or not isinstance(holder.get(field), str):
+            continue
+        if text is None:
+            text = holder[field]
+        elif holder[field] is not text and holder[field] == text:
+            holder[field] = text
+    return text
+
+class StageResult(Mapping):
+    """Read-only result of one completed stage. Also readable as the result dict it wraps."""
+
+    __slots__ = ("key", "_result", "_data", "_raw_text")
+
+    def __init__(self, key: str, result: Dict[str, Any]):
+        """key is the input_data key the result is published under (e.g. 'problem_explorer')."""
+        data = result.get("data")
+        data = data if isinstance(data, dict) else {}
+        set_slot = object.__setattr__
+        set_slot(self, "key", key)
+        set_slot(self, "_result", result)
+        set_slot(self, "_data", data)
+        set_slot(self, "_raw_text", _share_raw_text(data))
+
+    @classmethod
+    def of(cls, key: str, value: Any) -> "StageResult":
+        """A published result as a StageResult: wrapped if it is a plain dict, empty if missing."""
+        if isinstance(value, StageResult):
+            return value
+        return cls(key, value if isinstance(value, dict) else {})
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"StageResult is immutable (cannot set '{name}')")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"StageResult is immutable (cannot delete '{name}')")
+
+    def __getitem__(self, name: str) -> Any:
+        return self._result[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._result)
+
+    def __len__(self) -> int:
+        return len(self._result)
+
+    def __repr__(self) -> str:
+        return f"StageResult({self.key!r}, status={self.status!r})"
+
+    @property
+    def status(self) -> Optional[str]:
+        return self._result.get("status")
+
+    @property
+    def data(self) -> Mapping:
+        """The result data, read-only."""
+        return MappingProxyType(self._data)
+
+    @property
+    def structured(self) -> Any:
+        """The agent's structured output (None if the result has none)."""
+        return self._data.get(STRUCTURED_FIELDS.get(self.key))
+
+    @property
+    def text(self) -> str:
+        """The markdown shown to users."""
+        return self._data.get("formatted_output", "")
+
+    @property
+    def raw_text(self) -> Optional[str]:
+        """The agent's raw LLM response (None for structured replies, which keep none)."""
+        return self._raw_text
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The wrapped result dict (as streamed and stored)."""
+        return self._result
+
+def stage_result(input_data: Mapping, key: str) -> StageResult:
+    """The upstream result published under key (an empty result if that stage has not run)."""
+    return StageResult.of(key, input_data.get(key))
@@ -0,0 +1,64 @@
+"""
+Recognition of section headers in LLM responses.
+
+The agents' parsers test each response line for a fixed set of header strings, and
+the first header (in declaration order) found anywhere in the line opens a section.
+Testing every header against every line costs lines x headers substring searches,
+each paid for in interpreter overhead rather than in actually comparing text.
+
+HeaderMatcher is built once per agent from its ordered header table. scan() runs
+over a whole response instead: headers are located with C-level substring searches
+of the full text (which skip through text that cannot contain them), only the lines
+they occur in are tested header by header, and the parse loop then just looks its
+line up. Header tables list variants of one header ("Key Insights", "Section 1: Key
+Insights"); a line containing a longer variant contains the shorter one too, so only
+headers that contain no other header are searched for. A per-line regex alternation
+was measured as well; Python's regex engine examines every position of the line and
+came out slower than the substring tests it was to replace, so it is not used.
+
+match() and key() test a single line with the same precedence, for callers that see
+lines one at a time (such as the incremental section parser).
+"""
+
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+class HeaderMatcher:
+    """Finds which of a fixed, ordered set of header strings (if any) occurs in a line."""
+
+    def __init__(self, headers: Union[Dict[str, str], Iterable[Tuple[str, str]]]):
+        """headers maps each header string to the key of the section it opens; earlier headers win."""
+        pairs = headers.items() if isinstance(headers, dict) else headers
+        self.keys: Dict[str, str] = {}
+        for header, key in pairs:
+            self.keys.setdefault(header, key)
+        # Every line with a header contains one of these
+        self.shortest = [header for header in self.keys
+                         if not any(other != header and other in header for other in self.keys)]
+
+    def match(self, line: str) -> Optional[Tuple[str, str]]:
+        """(section key, header text) of the first header found in the line, or None."""
+        for header, key in self.keys.items():
+            if header in line:
+                return key, header
+        return None
+
+    def key(self, line: str) -> Optional[str]:
+        """Section key of the first header found in the line, or None."""
+        found = self.match(line)
+        return found[0] if found else None
+
+    def scan(self, lines: List[str]) -> Dict[int, Tuple[str, str]]:
+        """match() of every line that has a header, by line index, searching the joined lines once per shortest header."""
+        text = "\n".join(lines)
+        starts = list(accumulate((len(line) + 1 for line in lines), initial=0))
+        found: Dict[int, Tuple[str, str]] = {}
+        for header in self.shortest:
+            position = text.find(header)
+            while position != -1:
+                index = bisect_right(starts, position) - 1
+                if index not in found:
+                    found[index] = self.match(lines[index])
+                position = text.find(header, starts[index + 1])
+        return found
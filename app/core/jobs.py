@@ -0,0 +1,207 @@
+"""
+Durable background queue for analyses.
+
+Submitting an analysis stores it in the analysis_jobs table and returns a job id
+straight away; a pool of async workers (in the web process, or in dedicated
+`python worker.py` processes) claims jobs with SELECT ... FOR UPDATE SKIP LOCKED
+and runs them through the shared orchestrator.
+
+Delivery is at-least-once. A worker holds a lease on its job and renews it while
+the analysis runs; if the worker dies the lease lapses and another worker picks
+the job up. A failed attempt is queued again after a delay until max_attempts is
+reached, and a retry resumes the job's analysis session so agents that already
+finished are not run (or paid for) twice.
+"""
+
+import os
+import json
+import time
+import socket
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from data.database_service import DatabaseService
+from app.agents.orchestrator_agent import AnalysisRun, get_orchestrator
+from app.core.profiles import get_profile
+from app.core.priority import BULK
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", 2))  # workers inside the web process; 0 = only enqueue
+ANALYSIS_JOB_POLL_SECONDS = float(os.getenv("ANALYSIS_JOB_POLL_SECONDS", 2.0))
+ANALYSIS_JOB_LEASE_SECONDS = int(os.getenv("ANALYSIS_JOB_LEASE_SECONDS", 120))
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", 3))
+ANALYSIS_JOB_RETRY_DELAY = int(os.getenv("ANALYSIS_JOB_RETRY_DELAY", 30))  # seconds before a failed job is retried
+
+class LeaseLost(Exception):
+    """Another worker took over the job after this worker's lease expired."""
+
+def submit_analysis_job(payload: Dict[str, Any], max_attempts: int = ANALYSIS_JOB_MAX_ATTEMPTS) -> Optional[int]:
+    """Queue an analysis request. Returns the job id, or None if it could not be stored."""
+    return DatabaseService.enqueue_analysis_job(payload, max_attempts=max_attempts)
+
+class AnalysisWorkerPool:
+    """A fixed number of async workers draining the analysis job queue."""
+
+    def __init__(self, concurrency: int = ANALYSIS_WORKERS, name: Optional[str] = None,
+                 poll_seconds: float = ANALYSIS_JOB_POLL_SECONDS,
+                 lease_seconds: int = ANALYSIS_JOB_LEASE_SECONDS,
+                 retry_delay: int = ANALYSIS_JOB_RETRY_DELAY):
+        self.concurrency = max(0, concurrency)
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[int, str] = {}  # job id -> worker id
+        self.stats = {
+            "claimed": 0,
+            "completed": 0,
+            "retried": 0,
+            "failed": 0,
+            "leases_lost": 0,
+            "total_run_seconds": 0.0,
+        }
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> bool:
+        """Start the workers on the running loop. Returns False if the queue table is unavailable."""
+        if self.started or self.concurrency == 0:
+            return self.started
+        if not DatabaseService.ensure_analysis_jobs_table():
+            logger.error("Analysis job queue unavailable; workers not started")
+            return False
+        self._tasks = [
+            asyncio.create_task(self._worker_loop(f"{self.name}/{i}"))
+            for i in range(self.concurrency)
+        ]
+        logger.info(f"Started {self.concurrency} analysis workers ({self.name})")
+        return True
+
+    async def stop(self) -> None:
+        """Cancel the workers. Jobs they were running are picked up again once their lease lapses."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_forever(self) -> None:
+        """Run the workers until cancelled (dedicated worker processes)."""
+        if not self.start():
+            raise RuntimeError("Analysis job queue unavailable")
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    async def _worker_loop(self, worker_id: str) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(DatabaseService.claim_analysis_job, worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} could not poll the job queue: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_seconds)
+                continue
+            self.stats["claimed"] += 1
+            await self._run_job(job, worker_id)
+
+    async def _run_job(self, job: Dict[str, Any], worker_id: str) -> None:
+        job_id = job["id"]
+        payload = job["payload"] or {}
+        self._running[job_id] = worker_id
+        started = time.monotonic()
+        logger.info(f"Worker {worker_id} running job {job_id} (attempt {job['attempts']}/{job['max_attempts']})")
+
+        orchestrator = get_orchestrator()
+        profile = get_profile(payload.get("profile"))
+        budget = profile.new_budget(payload.get("deadline_seconds"))
+        # A retry continues the session the previous attempt left behind
+        prepared = orchestrator.prepare_resume(job["session_id"], budget) if job.get("session_id") else None
+        run = prepared[1] if prepared else AnalysisRun(budget, user_id=payload.get("user_id"))
+        run.profile = profile
+        # Nobody is waiting on the page for a queued job; interactive analyses go first
+        run.priority = BULK
+        # Stored right away, so whichever worker runs the job next resumes this session
+        run.on_session_created = lambda session_id: DatabaseService.set_analysis_job_session(job_id, worker_id, session_id)
+
+        analysis = asyncio.create_task(orchestrator.process(dict(payload), run))
+        heartbeat = asyncio.create_task(self._keep_lease(job_id, worker_id, analysis))
+        try:
+            results = await analysis
+            if results.get("status") == "error":
+                # The orchestrator reports a failed stage in its results rather than raising
+                await self._record_failure(job, worker_id, results.get("error_detail", "Analysis failed"), run.session_id)
+                return
+            outcome = {
+                "results": results,
+                "session_id": run.session_id,
+                "profile": profile.name,
+                "degraded_stages": run.degraded_stages,
+                "llm_budget": run.budget.get_stats(),
+                "timeline": run.timeline,
+            }
+            # Agent outputs may hold values the JSON column cannot store as-is
+            outcome = json.loads(json.dumps(outcome, default=str))
+            if await asyncio.to_thread(DatabaseService.complete_analysis_job, job_id, worker_id, outcome, run.session_id):
+                self.stats["completed"] += 1
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled() and isinstance(heartbeat.exception(), LeaseLost):
+                self.stats["leases_lost"] += 1
+                logger.warning(f"Worker {worker_id} lost the lease on job {job_id}; abandoning it")
+                return
+            raise
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            await self._record_failure(job, worker_id, error, run.session_id)
+        finally:
+            heartbeat.cancel()
+            if not analysis.done():
+                analysis.cancel()
+            await asyncio.gather(heartbeat, analysis, return_exceptions=True)
+            self._running.pop(job_id, None)
+            self.stats["total_run_seconds"] += time.monotonic() - started
+
+    async def _record_failure(self, job: Dict[str, Any], worker_id: str, error: str, session_id: Optional[int]) -> None:
+        """Queue the job again after the retry delay, or mark it failed once its attempts are used up."""
+        job_id = job["id"]
+        status = await asyncio.to_thread(
+            DatabaseService.fail_analysis_job, job_id, worker_id, error, session_id, self.retry_delay
+        )
+        if status == "queued":
+            self.stats["retried"] += 1
+            logger.warning(f"Job {job_id} attempt {job['attempts']} failed, retrying in {self.retry_delay}s: {error}")
+        elif status == "failed":
+            self.stats["failed"] += 1
+            logger.error(f"Job {job_id} failed after {job['attempts']} attempts: {error}")
+
+    async def _keep_lease(self, job_id: int, worker_id: str, analysis: asyncio.Task) -> None:
+        """Renew the job's lease while it runs; stop the analysis if another worker owns the job now."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(DatabaseService.renew_job_lease, job_id, worker_id, self.lease_seconds):
+                analysis.cancel()
+                raise LeaseLost(f"Lease on job {job_id} lost")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Worker activity in this process and queue depth by job status."""
+        return {
+            "name": self.name,
+            "workers": len(self._tasks),
+            "running_jobs": dict(self._running),
+            "lease_seconds": self.lease_seconds,
+            **self.stats,
+            "total_run_seconds": round(self.stats["total_run_seconds"], 2),
+        }
+
+# Workers started with the web application (ANALYSIS_WORKERS of them)
+analysis_workers = AnalysisWorkerPool()
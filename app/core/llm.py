@@ -4,30 +4,128 @@
 # Google Gemini API implementation
 from langchain_google_genai import ChatGoogleGenerativeAI
 import os
+import json
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import time
 
+# Load environment once per process instead of on every client request
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Backend: "gemini" (default) or "fake" for the deterministic offline model in app/core/fake_llm.py
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+
+# Default model and generation settings shared by every agent
+DEFAULT_MODEL = os.getenv("LLM_MODEL", "gemini-1.5-pro-latest")
+DEFAULT_LLM_SETTINGS = {
+    "temperature": float(os.getenv("LLM_TEMPERATURE", 0.7)),
+    "max_output_tokens": int(os.getenv("LLM_MAX_OUTPUT_TOKENS", 8192)),
+    "timeout": int(os.getenv("LLM_TIMEOUT", 120)),
+    # Retries inside the SDK would bypass the analysis attempt budget; BaseAgent retries instead
+    "max_retries": int(os.getenv("LLM_MAX_RETRIES", 0)),
+}
+
 class RateLimitError(Exception):
     """Custom exception for rate limit errors"""
     pass
 
-def get_llm():
-    """Get a configured instance of the Google Gemini AI chat model"""
-    load_dotenv()
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment variables")
-    
-    return ChatGoogleGenerativeAI(
-        model="gemini-1.5-pro-latest",
-        google_api_key=api_key,
-        temperature=0.7,
-        convert_system_message_to_human=True,  # Required for Gemini
-        max_output_tokens=8192,
-        timeout=120,
-        max_retries=5,
-    )
+class LLMClientPool:
+    """
+    Process-wide registry of shared chat model clients.
+    One client (and therefore one long-lived, keep-alive transport) is created per
+    model/settings combination and reused by every agent and every request.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+        self._model_settings = self._load_model_settings()
+        self.created = 0
+        self.borrowed = 0
+
+    @staticmethod
+    def _load_model_settings() -> Dict[str, Dict[str, Any]]:
+        """
+        Read per-model overrides from LLM_MODEL_SETTINGS, a JSON object such as
+        {"gemini-1.5-flash-latest": {"temperature": 0.4, "max_output_tokens": 4096}}.
+        """
+        raw = os.getenv("LLM_MODEL_SETTINGS")
+        if not raw:
+            return {}
+        try:
+            settings = json.loads(raw)
+            return settings if isinstance(settings, dict) else {}
+        except json.JSONDecodeError as e:
+            logger.warning(f"Ignoring invalid LLM_MODEL_SETTINGS: {e}")
+            return {}
+
+    def settings_for(self, model: str, **overrides) -> Dict[str, Any]:
+        """Resolve generation settings for a model: defaults < per-model settings < call overrides."""
+        settings = dict(DEFAULT_LLM_SETTINGS)
+        settings.update(self._model_settings.get(model, {}))
+        settings.update({k: v for k, v in overrides.items() if v is not None})
+        return settings
+
+    def get(self, model: Optional[str] = None, **overrides):
+        """Borrow the shared client for a model, creating it on first use."""
+        model = model or DEFAULT_MODEL
+        settings = self.settings_for(model, **overrides)
+        key = (model, tuple(sorted(settings.items())))
+
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._create_client(model, settings)
+                    self._clients[key] = client
+                    self.created += 1
+                    logger.info(f"Created shared LLM client for {model} ({len(self._clients)} pooled)")
+        self.borrowed += 1
+        return client
+
+    def _create_client(self, model: str, settings: Dict[str, Any]):
+        """Create a configured instance of the Google Gemini AI chat model (or the offline fake)"""
+        if LLM_BACKEND == "fake":
+            from app.core.fake_llm import FakeChatModel
+            return FakeChatModel(model=model, **settings)
+
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not found in environment variables")
+
+        return ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=api_key,
+            convert_system_message_to_human=True,  # Required for Gemini
+            **settings,
+        )
+
+    def clear(self) -> None:
+        """Drop all pooled clients (e.g. after rotating credentials)."""
+        with self._lock:
+            self._clients.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool usage counters for monitoring."""
+        return {
+            "pooled_clients": len(self._clients),
+            "clients_created": self.created,
+            "clients_borrowed": self.borrowed,
+            "backend": LLM_BACKEND,
+            "models": sorted({key[0] for key in self._clients}),
+        }
+
+# Shared pool used by every agent in this process
+llm_pool = LLMClientPool()
+
+def get_llm(model: Optional[str] = None, **overrides):
+    """Get the shared, pooled Google Gemini AI chat model for the given model/settings"""
+    return llm_pool.get(model, **overrides)
 
 # Legacy Mistral AI function (commented out)
 # def get_mistral_llm():
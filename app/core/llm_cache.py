@@ -0,0 +1,227 @@
+"""
+Content-addressed cache for LLM responses.
+
+Responses are keyed by a hash of the model name, generation settings, system prompt
+and user prompt. A bounded in-memory LRU serves repeats within a process, and an
+optional SQLite tier (LLM_CACHE_DB) shares entries across workers on the same host.
+Lookups and stores are coroutines: the SQLite tier is read and written on a worker
+thread, so a database locked by another worker never stalls the event loop.
+"""
+
+import os
+import json
+import asyncio
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 512))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 3600))  # seconds
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "")  # e.g. data/llm_cache.sqlite3; empty disables the disk tier
+
+# Per-request bypass flag (set by the orchestrator when a request opts out of caching)
+_cache_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+@contextmanager
+def llm_cache_bypass(enabled: bool = True):
+    """Skip cache lookups and stores for LLM calls made inside this block."""
+    token = _cache_bypass.set(enabled)
+    try:
+        yield
+    finally:
+        _cache_bypass.reset(token)
+
+def cache_bypassed() -> bool:
+    """Whether the current request opted out of the response cache."""
+    return _cache_bypass.get()
+
+class LLMResponseCache:
+    """Two-tier (memory LRU + optional SQLite) cache of LLM response text."""
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: int = LLM_CACHE_TTL,
+                 db_path: Optional[str] = LLM_CACHE_DB or None, enabled: bool = LLM_CACHE_ENABLED):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+            "bypassed": 0,
+        }
+        if self.enabled and self.db_path:
+            self._init_db()
+
+    @staticmethod
+    def make_key(model: str, settings: Dict[str, Any], system_prompt: str, prompt: str) -> str:
+        """Hash everything that determines the model output into a stable cache key."""
+        payload = json.dumps(
+            {"model": model, "settings": settings, "system": system_prompt, "prompt": prompt},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _init_db(self) -> None:
+        """Create the shared SQLite tier if it does not exist yet."""
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_response_cache ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache disk tier disabled: {e}")
+            self.db_path = None
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived SQLite connection that commits on success and always closes."""
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return a cached response or None. Respects per-request bypass."""
+        if not self.enabled:
+            return None
+        if cache_bypassed():
+            self.stats["bypassed"] += 1
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, response = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return response
+                del self._entries[key]
+                self.stats["expired"] += 1
+
+        if self.db_path:
+            # Another worker may hold the database lock; never wait for it on the event loop
+            row = await asyncio.to_thread(self._disk_get, key)
+            if row and row[1] > now:
+                self._remember(key, row[0], row[1])
+                self.stats["disk_hits"] += 1
+                return row[0]
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, response: str, ttl: Optional[int] = None) -> None:
+        """Store a response in both tiers."""
+        if not self.enabled or cache_bypassed() or not response:
+            return
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttl)
+        self._remember(key, response, expires_at)
+        self.stats["stores"] += 1
+
+        if self.db_path:
+            await asyncio.to_thread(self._disk_set, key, response, now, expires_at)
+
+    def _remember(self, key: str, response: str, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    async def discard(self, key: str) -> None:
+        """Forget one response (e.g. a reply that turned out to be unusable)."""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.db_path:
+            await asyncio.to_thread(self._disk_discard, key)
+
+    # Disk tier operations; they block, so coroutines run them on a worker thread
+
+    def _disk_get(self, key: str) -> Optional[tuple]:
+        try:
+            with self._connect() as conn:
+                return conn.execute(
+                    "SELECT response, expires_at FROM llm_response_cache WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache disk lookup failed: {e}")
+            return None
+
+    def _disk_set(self, key: str, response: str, now: float, expires_at: float) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_response_cache (key, response, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, response, now, expires_at)
+                )
+                conn.execute("DELETE FROM llm_response_cache WHERE expires_at <= ?", (now,))
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache disk store failed: {e}")
+
+    def _disk_discard(self, key: str) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache disk discard failed: {e}")
+
+    def clear(self) -> None:
+        """Empty both tiers."""
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM llm_response_cache")
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache disk clear failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters; every hit is an upstream call that was not paid for."""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "disk_tier": bool(self.db_path),
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            **self.stats,
+            "hits": hits,
+            "calls_saved": hits,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+# Shared cache used by every agent in this process
+llm_cache = LLMResponseCache()
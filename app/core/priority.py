@@ -0,0 +1,60 @@
+"""
+Priority classes for LLM traffic.
+
+Every analysis runs under a priority class - interactive (/analyze in the UI), api
+(/analyze-batch and other synchronous API calls) or bulk (bulk uploads and queued
+jobs). The class is bound for the duration of the analysis like the request budget,
+and the LLM concurrency limiter serves waiting calls by weighted round robin
+between classes: interactive calls get most free slots without starving the others.
+"""
+
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Union
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INTERACTIVE = "interactive"
+API = "api"
+BULK = "bulk"
+PRIORITY_CLASSES = (INTERACTIVE, API, BULK)
+
+def _parse_weights(spec: str) -> Dict[str, float]:
+    """'interactive:8,api:3,bulk:1' -> {class: weight}; unknown or missing classes get weight 1."""
+    weights = {name: 1.0 for name in PRIORITY_CLASSES}
+    for part in spec.split(","):
+        name, _, value = part.partition(":")
+        name = name.strip()
+        if name in weights and value.strip():
+            weights[name] = max(float(value), 0.1)
+    return weights
+
+# Configuration
+LLM_PRIORITY_WEIGHTS = _parse_weights(os.getenv("LLM_PRIORITY_WEIGHTS", "interactive:8,api:3,bulk:1"))
+
+_current_priority: ContextVar[Union[str, Callable[[], str]]] = ContextVar("llm_priority", default=API)
+
+@contextmanager
+def priority_class(name: Union[str, Callable[[], str]]):
+    """Dispatch LLM calls made inside this block with the given priority class.
+
+    A callable is asked for the class at every call, for work shared by several
+    analyses whose most urgent one can change while it runs (coalesced LLM calls).
+    """
+    token = _current_priority.set(name if callable(name) or name in PRIORITY_CLASSES else API)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+def current_priority() -> str:
+    """Priority class of the analysis being processed (api outside a request)."""
+    name = _current_priority.get()
+    return name() if callable(name) else name
+
+def most_urgent(names: Iterable[str]) -> str:
+    """The most urgent of the given priority classes (api if there are none)."""
+    ranked = [name for name in names if name in PRIORITY_CLASSES]
+    return min(ranked, key=PRIORITY_CLASSES.index) if ranked else API
@@ -0,0 +1,131 @@
+"""
+Pipeline profiles: how much of the analysis to run within how much time.
+
+A profile sets the analysis deadline, a time budget per stage and whether the
+pipeline may degrade. Before a stage starts, the orchestrator compares the time
+left with the budgets of the longest chain of stages still to run from it. When
+they no longer fit, an optional stage is skipped and a required stage runs with a
+shorter generation limit; an optional stage that overruns the time it can be given
+is dropped instead of failing the analysis. Every such decision is reported as a
+degraded stage with the results.
+
+    quick     2.5-minute deadline, halved stage budgets; Horizon Scanning and
+              Backcasting are always skipped
+    standard  5-minute deadline; degrades only when the time left requires it
+    full      the server deadline; every stage runs in full (the previous behaviour)
+"""
+
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Iterable
+from dotenv import load_dotenv
+from app.core.deadline import RequestBudget, ANALYSIS_DEADLINE_SECONDS
+
+load_dotenv()
+
+# Configuration
+PIPELINE_DEFAULT_PROFILE = os.getenv("PIPELINE_DEFAULT_PROFILE", "full")
+PIPELINE_DEGRADED_OUTPUT_TOKENS = int(os.getenv("PIPELINE_DEGRADED_OUTPUT_TOKENS", 2048))
+
+# Seconds a stage typically needs at normal provider latency; profiles scale these
+STAGE_BUDGETS = {
+    "Problem Explorer": 40.0,
+    "Best Practices": 40.0,
+    "Horizon Scanning": 40.0,
+    "Scenario Planning": 60.0,
+    "Research Synthesis": 50.0,
+    "Strategic Action": 60.0,
+    "High Impact": 40.0,
+    "Backcasting": 40.0,
+}
+
+# Stages the rest of the pipeline can do without: Research Synthesis works from
+# whichever Stage 2 outputs exist, and nothing consumes Backcasting
+OPTIONAL_STAGES = ["Best Practices", "Horizon Scanning", "Scenario Planning", "Backcasting"]
+
+# Degradation modes reported per stage
+SKIPPED = "skipped"
+SHORTENED = "shortened"
+
+class PipelineProfile:
+    """Deadline, per-stage budgets and degradation policy for one kind of analysis."""
+
+    def __init__(self, name: str, deadline_seconds: float, stage_scale: float = 1.0,
+                 skip: Iterable[str] = (), degrade: bool = True):
+        self.name = name
+        self.deadline_seconds = deadline_seconds
+        self.stage_scale = stage_scale
+        self.skip = list(skip)
+        self.degrade = degrade
+
+    def new_budget(self, deadline_seconds: Optional[float] = None) -> RequestBudget:
+        """Request budget for this profile; a client may ask for a shorter deadline."""
+        if deadline_seconds and deadline_seconds > 0:
+            return RequestBudget(min(deadline_seconds, self.deadline_seconds))
+        return RequestBudget(self.deadline_seconds)
+
+    def stage_budget(self, stage: str) -> float:
+        return STAGE_BUDGETS.get(stage, 60.0) * self.stage_scale
+
+    def path_seconds(self, stage: str, dependencies: Dict[str, List[str]]) -> float:
+        """Budgeted time of the longest chain from this stage to the end of the pipeline."""
+        dependents = [node for node, deps in dependencies.items() if stage in deps]
+        own = 0.0 if stage in self.skip else self.stage_budget(stage)
+        return own + max((self.path_seconds(node, dependencies) for node in dependents), default=0.0)
+
+    def plan_stage(self, stage: str, dependencies: Dict[str, List[str]], remaining: float) -> Optional[Dict[str, Any]]:
+        """None to run the stage normally, else how to degrade it: {"mode", "reason"}."""
+        if stage in self.skip:
+            return {"mode": SKIPPED, "reason": f"not part of the {self.name} profile"}
+        if not self.degrade:
+            return None
+        needed = self.path_seconds(stage, dependencies)
+        if remaining >= needed:
+            return None
+        reason = f"{remaining:.0f}s left for stages budgeted at {needed:.0f}s"
+        if stage in OPTIONAL_STAGES:
+            return {"mode": SKIPPED, "reason": reason}
+        return {"mode": SHORTENED, "reason": reason, "max_output_tokens": PIPELINE_DEGRADED_OUTPUT_TOKENS}
+
+    def stage_allowance(self, stage: str, dependencies: Dict[str, List[str]], remaining: float) -> Optional[float]:
+        """Longest an optional stage may run without pushing the stages after it past the deadline."""
+        if not self.degrade or stage not in OPTIONAL_STAGES:
+            return None
+        after = self.path_seconds(stage, dependencies) - self.stage_budget(stage)
+        return max(self.stage_budget(stage), remaining - after)
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "deadline_seconds": self.deadline_seconds,
+            "skipped_stages": self.skip,
+            "degrade": self.degrade,
+        }
+
+PIPELINE_PROFILES = {
+    "quick": PipelineProfile("quick", 150, stage_scale=0.5, skip=["Horizon Scanning", "Backcasting"]),
+    "standard": PipelineProfile("standard", 300),
+    "full": PipelineProfile("full", ANALYSIS_DEADLINE_SECONDS, degrade=False),
+}
+
+def get_profile(name: Optional[str] = None) -> PipelineProfile:
+    """Profile by name (the configured default if None). Raises ValueError for unknown names."""
+    name = name or PIPELINE_DEFAULT_PROFILE
+    if name not in PIPELINE_PROFILES:
+        raise ValueError(f"Unknown pipeline profile '{name}' (expected one of: {', '.join(PIPELINE_PROFILES)})")
+    return PIPELINE_PROFILES[name]
+
+_output_token_limit: ContextVar[Optional[int]] = ContextVar("llm_output_token_limit", default=None)
+
+@contextmanager
+def output_token_limit(limit: Optional[int]):
+    """Cap max_output_tokens for LLM calls made inside this block (None leaves it unchanged)."""
+    token = _output_token_limit.set(limit)
+    try:
+        yield
+    finally:
+        _output_token_limit.reset(token)
+
+def current_output_token_limit() -> Optional[int]:
+    return _output_token_limit.get()
@@ -0,0 +1,209 @@
+"""
+Process-wide token-bucket rate limiter for LLM calls.
+
+Every upstream call acquires one request and its estimated prompt tokens from two
+buckets (requests-per-minute and tokens-per-minute). Callers are served strictly in
+arrival order, so concurrent analyses share the provider quota fairly instead of
+bursting into 429s. Setting LLM_RATE_LIMIT_DB keeps the bucket state in a SQLite
+file so all workers on a host draw from the same budget; that file is only touched
+from worker threads, so contention between workers never blocks the event loop.
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+LLM_RATE_LIMIT_RPM = float(os.getenv("LLM_RATE_LIMIT_RPM", 60))        # requests per minute
+LLM_RATE_LIMIT_TPM = float(os.getenv("LLM_RATE_LIMIT_TPM", 1000000))   # tokens per minute
+LLM_RATE_LIMIT_BURST = float(os.getenv("LLM_RATE_LIMIT_BURST", 10))    # requests allowed back-to-back
+LLM_RATE_LIMIT_DB = os.getenv("LLM_RATE_LIMIT_DB", "")                 # shared state for multi-worker deployments
+
+def estimate_tokens(*texts: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for TPM budgeting."""
+    return sum(len(text or "") for text in texts) // 4 + 1
+
+class TokenBucketRateLimiter:
+    """Fair (FIFO) requests-per-minute + tokens-per-minute token bucket."""
+
+    def __init__(self, rpm: float = LLM_RATE_LIMIT_RPM, tpm: float = LLM_RATE_LIMIT_TPM,
+                 burst: float = LLM_RATE_LIMIT_BURST, db_path: Optional[str] = LLM_RATE_LIMIT_DB or None,
+                 name: str = "llm"):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.request_capacity = max(1.0, min(burst, rpm))
+        self.token_capacity = max(1.0, tpm)
+        self.db_path = db_path
+        self.name = name
+
+        # Local bucket state (used when no shared db is configured)
+        self._requests = self.request_capacity
+        self._tokens = self.token_capacity
+        self._updated_at = time.monotonic()
+
+        # asyncio.Lock wakes waiters in FIFO order, which gives us fair queuing
+        self._queue_lock: Optional[asyncio.Lock] = None
+        self.waiting = 0
+        self.stats = {
+            "acquired": 0,
+            "delayed": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "tokens_acquired": 0,
+        }
+
+        if self.db_path:
+            self._init_db()
+
+    @property
+    def _lock(self) -> asyncio.Lock:
+        if self._queue_lock is None:
+            self._queue_lock = asyncio.Lock()
+        return self._queue_lock
+
+    def _init_db(self) -> None:
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                    "name TEXT PRIMARY KEY, requests REAL NOT NULL, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Shared rate limiter disabled, falling back to per-process buckets: {e}")
+            self.db_path = None
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _refill(self, requests: float, tokens: float, elapsed: float) -> Tuple[float, float]:
+        requests = min(self.request_capacity, requests + elapsed * self.rpm / 60.0)
+        tokens = min(self.token_capacity, tokens + elapsed * self.tpm / 60.0)
+        return requests, tokens
+
+    def _wait_needed(self, requests: float, tokens: float, wanted_tokens: float) -> float:
+        request_wait = (1 - requests) * 60.0 / self.rpm if requests < 1 else 0.0
+        token_wait = (wanted_tokens - tokens) * 60.0 / self.tpm if tokens < wanted_tokens else 0.0
+        return max(request_wait, token_wait)
+
+    async def _try_take(self, wanted_tokens: float) -> float:
+        """Take from the buckets if possible; otherwise return seconds until it will be."""
+        wanted_tokens = min(wanted_tokens, self.token_capacity)
+        if self.db_path:
+            try:
+                # BEGIN IMMEDIATE may wait up to the busy timeout for another worker
+                return await asyncio.to_thread(self._try_take_shared, wanted_tokens)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared rate limiter unavailable, using local bucket: {e}")
+
+        now = time.monotonic()
+        self._requests, self._tokens = self._refill(self._requests, self._tokens, now - self._updated_at)
+        self._updated_at = now
+        wait = self._wait_needed(self._requests, self._tokens, wanted_tokens)
+        if wait <= 0:
+            self._requests -= 1
+            self._tokens -= wanted_tokens
+        return wait
+
+    def _try_take_shared(self, wanted_tokens: float) -> float:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT requests, tokens, updated_at FROM rate_limit_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                if row:
+                    requests, tokens = self._refill(row[0], row[1], max(0.0, now - row[2]))
+                else:
+                    requests, tokens = self.request_capacity, self.token_capacity
+                wait = self._wait_needed(requests, tokens, wanted_tokens)
+                if wait <= 0:
+                    requests -= 1
+                    tokens -= wanted_tokens
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit_buckets (name, requests, tokens, updated_at) VALUES (?, ?, ?, ?)",
+                    (self.name, requests, tokens, now)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def acquire(self, tokens: int = 1) -> float:
+        """Wait for a request slot and the estimated prompt tokens. Returns seconds waited."""
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    wait = await self._try_take(tokens)
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.stats["acquired"] += 1
+        self.stats["tokens_acquired"] += tokens
+        self.stats["total_wait_seconds"] += waited
+        if waited > 0.01:
+            self.stats["delayed"] += 1
+        self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+        return waited
+
+    async def settle(self, extra_tokens: int) -> None:
+        """Charge tokens that were only known after the call (e.g. the generated output)."""
+        if extra_tokens <= 0:
+            return
+        self.stats["tokens_acquired"] += extra_tokens
+        if self.db_path:
+            try:
+                await asyncio.to_thread(self._settle_shared, extra_tokens)
+                return
+            except sqlite3.Error as e:
+                logger.warning(f"Shared rate limiter settle failed: {e}")
+        self._tokens -= extra_tokens
+
+    def _settle_shared(self, extra_tokens: int) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE rate_limit_buckets SET tokens = tokens - ? WHERE name = ?", (extra_tokens, self.name)
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Budget configuration and wait-time metrics."""
+        acquired = self.stats["acquired"]
+        return {
+            "requests_per_minute": self.rpm,
+            "tokens_per_minute": self.tpm,
+            "burst": self.request_capacity,
+            "shared": bool(self.db_path),
+            "queued": self.waiting,
+            **self.stats,
+            "total_wait_seconds": round(self.stats["total_wait_seconds"], 3),
+            "max_wait_seconds": round(self.stats["max_wait_seconds"], 3),
+            "avg_wait_seconds": round(self.stats["total_wait_seconds"] / acquired, 3) if acquired else 0.0,
+        }
+
+# Shared limiter used by every LLM call in this process
+llm_rate_limiter = TokenBucketRateLimiter()
@@ -0,0 +1,71 @@
+"""
+Incremental section parsing of streamed LLM output.
+
+The agents' parsers only see a response once it is complete. IncrementalSectionParser
+consumes the same text as it streams in, one chunk at a time, and reports each
+section as soon as the next header line (or the end of the response) closes it. An
+agent supplies the two pieces that are specific to its format: which lines open a
+section, and how a closed section's lines become structured data - usually by running
+its own parser over just those lines.
+
+BaseAgent feeds every text delta of a streamed call to the agent's parser and emits
+{"event": "section", "section": key, "index": n, "data": ...} for each closed section,
+so a client can show a finished "Key Insights" section while later sections are still
+being generated. A retry starts the parse over.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+class IncrementalSectionParser:
+    """Splits text arriving in arbitrary chunks into sections at header lines."""
+
+    def __init__(self, match_header: Callable[[str], Optional[str]],
+                 on_section: Callable[[str, int, List[str]], None]):
+        """
+        match_header(line) returns the key of the section a (stripped) line opens, or None.
+        on_section(key, index, lines) receives each closed section: its key, its 1-based
+        position among sections with that key, and its lines including the header line.
+        """
+        self.match_header = match_header
+        self.on_section = on_section
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard everything fed so far (e.g. when the call is retried)."""
+        self._pending = ""
+        self._key: Optional[str] = None
+        self._lines: List[str] = []
+        self._counts: Dict[str, int] = {}
+
+    def feed(self, text: str) -> None:
+        """Consume a chunk; only complete lines are examined."""
+        self._pending += text
+        if "\n" not in self._pending:
+            return
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            self._consume(line)
+
+    def close(self) -> None:
+        """End of the response: the last section is complete."""
+        if self._pending:
+            self._consume(self._pending)
+            self._pending = ""
+        self._emit()
+
+    def _consume(self, line: str) -> None:
+        key = self.match_header(line.strip())
+        if key is not None:
+            self._emit()
+            self._key = key
+            self._lines = [line]
+        elif self._key is not None:
+            self._lines.append(line)
+
+    def _emit(self) -> None:
+        if self._key is None:
+            return
+        index = self._counts[self._key] = self._counts.get(self._key, 0) + 1
+        self.on_section(self._key, index, self._lines)
+        self._key = None
+        self._lines = []
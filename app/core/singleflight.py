@@ -0,0 +1,182 @@
+"""
+Single-flight coalescing of identical LLM calls.
+
+When a prompt with the same fingerprint (the response-cache key) is already being
+sent upstream, later callers await that call instead of issuing their own and all
+of them get the same response. This covers the window the response cache cannot:
+identical requests that arrive before the first one has finished.
+
+The shared call belongs to no single caller. It runs under a SharedBudget that
+charges each attempt to every analysis still waiting for it, with the priority class
+of the most urgent of them, and streams its deltas to all of them (a caller that
+joins late first gets the deltas it missed). Each caller stops waiting at its own
+deadline.
+
+Cancellation is per waiter: a caller that goes away (e.g. a closed /analyze stream)
+only detaches itself. With the default "last_waiter" policy the upstream call is
+cancelled once nobody is waiting for it any more; with "never" it runs to completion
+so its response still lands in the cache.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict, Any, List, Callable, Awaitable, Optional
+from dotenv import load_dotenv
+from app.core.deadline import BudgetExhausted, RequestBudget, SharedBudget, current_budget, request_budget
+from app.core.priority import current_priority, most_urgent, priority_class
+from app.core.streaming import EventSink, current_sink, stream_events_to
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+LLM_SINGLEFLIGHT_ENABLED = os.getenv("LLM_SINGLEFLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_SINGLEFLIGHT_CANCEL_POLICY = os.getenv("LLM_SINGLEFLIGHT_CANCEL_POLICY", "last_waiter")  # last_waiter | never
+
+class _Waiter:
+    __slots__ = ("budget", "priority", "sink")
+
+    def __init__(self, budget: Optional[RequestBudget], priority: str, sink: Optional[EventSink]):
+        self.budget = budget
+        self.priority = priority
+        self.sink = sink
+
+class _Flight:
+    __slots__ = ("task", "waiters", "budget", "streaming", "events")
+
+    def __init__(self, streaming: bool):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters: List[_Waiter] = []
+        self.budget = SharedBudget()
+        # Streamed only if the caller that started it listens for deltas
+        self.streaming = streaming
+        self.events: List[Dict[str, Any]] = []
+
+    def priority(self) -> str:
+        return most_urgent(waiter.priority for waiter in self.waiters)
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        self.events.append(event)
+        for waiter in self.waiters:
+            if waiter.sink is not None:
+                waiter.sink(event)
+
+    def attach(self, waiter: _Waiter) -> None:
+        if waiter.budget is not None:
+            self.budget.budgets.append(waiter.budget)
+        else:
+            self.budget.unbounded += 1
+        if waiter.sink is not None:
+            for event in self.events:
+                waiter.sink(event)
+        self.waiters.append(waiter)
+
+    def detach(self, waiter: _Waiter) -> None:
+        self.waiters.remove(waiter)
+        if waiter.budget is not None:
+            self.budget.budgets.remove(waiter.budget)
+        else:
+            self.budget.unbounded -= 1
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key."""
+
+    def __init__(self, enabled: bool = LLM_SINGLEFLIGHT_ENABLED,
+                 cancel_policy: str = LLM_SINGLEFLIGHT_CANCEL_POLICY):
+        self.enabled = enabled
+        self.cancel_policy = cancel_policy
+        self._flights: Dict[str, _Flight] = {}
+        self.stats = {
+            "upstream_calls": 0,
+            "coalesced": 0,
+            "detached_waiters": 0,
+            "upstream_cancelled": 0,
+        }
+
+    def in_flight(self, key: str) -> bool:
+        """Whether a call for this key is currently running."""
+        return key in self._flights
+
+    def streaming(self, key: str) -> bool:
+        """Whether the running call for this key relays its deltas to the callers that join it."""
+        flight = self._flights.get(key)
+        return flight is not None and flight.streaming
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() once per key at a time; concurrent callers share its result."""
+        if not self.enabled:
+            return await fn()
+
+        waiter = _Waiter(current_budget(), current_priority(), current_sink())
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(streaming=waiter.sink is not None)
+            flight.task = asyncio.ensure_future(self._run(flight, fn))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _task, key=key, flight=flight: self._land(key, flight))
+            self.stats["upstream_calls"] += 1
+        else:
+            if waiter.budget is not None:
+                # The attempt already under way is charged to the caller joining it
+                if flight.budget.attempts:
+                    waiter.budget.start_attempt()
+                elif waiter.budget.expired():
+                    raise BudgetExhausted(f"Analysis deadline of {waiter.budget.timeout_seconds:.0f}s exceeded")
+            self.stats["coalesced"] += 1
+
+        flight.attach(waiter)
+        try:
+            # shield: one waiter leaving must not cancel the shared call
+            timeout = waiter.budget.remaining() if waiter.budget is not None else None
+            return await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+        except asyncio.TimeoutError:
+            if flight.task.done() and not flight.task.cancelled():
+                # The shared call's own outcome, not this caller's deadline
+                return flight.task.result()
+            self._leave(flight)
+            raise BudgetExhausted(f"Analysis deadline of {waiter.budget.timeout_seconds:.0f}s exceeded")
+        except asyncio.CancelledError:
+            self._leave(flight)
+            raise
+        finally:
+            flight.detach(waiter)
+
+    async def _run(self, flight: _Flight, fn: Callable[[], Awaitable[Any]]) -> Any:
+        # Nothing of the analysis that started the call: the budget, priority and
+        # listeners are those of whoever is waiting for it at the time
+        with request_budget(flight.budget), priority_class(flight.priority), \
+                stream_events_to(flight.emit if flight.streaming else None):
+            return await fn()
+
+    def _leave(self, flight: _Flight) -> None:
+        """A waiter stops waiting before the call has finished."""
+        self.stats["detached_waiters"] += 1
+        if (len(flight.waiters) == 1 and self.cancel_policy == "last_waiter"
+                and not flight.task.done()):
+            flight.task.cancel()
+            self.stats["upstream_cancelled"] += 1
+            logger.info("Cancelled shared LLM call: no callers left waiting for it")
+
+    def _land(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Nobody may be left to retrieve the exception; mark it as observed
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Upstream calls issued versus calls answered by joining one already running."""
+        total = self.stats["upstream_calls"] + self.stats["coalesced"]
+        return {
+            "enabled": self.enabled,
+            "cancel_policy": self.cancel_policy,
+            "in_flight": len(self._flights),
+            **self.stats,
+            "calls_saved": self.stats["coalesced"],
+            "coalesce_rate": round(self.stats["coalesced"] / total, 3) if total else 0.0,
+        }
+
+# Shared coalescer used by every agent in this process
+llm_singleflight = SingleFlight()
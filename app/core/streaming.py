@@ -0,0 +1,67 @@
+"""
+Token-level streaming of LLM output to whoever is listening for the current agent call.
+
+The /analyze stream binds a sink around each agent run; BaseAgent.invoke_llm then
+switches to the model's astream API and pushes incremental text deltas to that sink.
+Calls made without a sink (batch analysis, background jobs) keep using ainvoke.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, Optional
+
+EventSink = Callable[[Dict[str, Any]], None]
+
+_event_sink: ContextVar[Optional[EventSink]] = ContextVar("llm_event_sink", default=None)
+
+@contextmanager
+def stream_events_to(sink: Optional[EventSink]):
+    """Route streaming events from LLM calls made inside this block to `sink`."""
+    token = _event_sink.set(sink)
+    try:
+        yield
+    finally:
+        _event_sink.reset(token)
+
+@contextmanager
+def tagged_events(**fields):
+    """Add fields (e.g. part=...) to every event emitted inside this block, for agents
+    that run several LLM calls at once."""
+    sink = _event_sink.get()
+    with stream_events_to((lambda event: sink({**event, **fields})) if sink is not None else None):
+        yield
+
+@contextmanager
+def parsed_events(parser):
+    """Also feed the text deltas emitted inside this block to an incremental parser
+    (None does nothing). A retry event resets the parser; leaving the block normally
+    closes its last section."""
+    sink = _event_sink.get()
+    if parser is None or sink is None:
+        yield
+        return
+
+    def forward(event: Dict[str, Any]):
+        sink(event)
+        if event.get("event") == "delta":
+            parser.feed(event.get("text", ""))
+        elif event.get("event") == "retry":
+            parser.reset()
+
+    with stream_events_to(forward):
+        yield
+    parser.close()
+
+def current_sink() -> Optional[EventSink]:
+    """The listener of the current agent call (None if nobody is listening)."""
+    return _event_sink.get()
+
+def streaming_enabled() -> bool:
+    """Whether the current agent call has a listener for incremental output."""
+    return _event_sink.get() is not None
+
+def emit_event(event: Dict[str, Any]) -> None:
+    """Send an event (e.g. {"event": "delta", "text": ...}) to the current listener, if any."""
+    sink = _event_sink.get()
+    if sink is not None:
+        sink(event)
@@ -0,0 +1,123 @@
+"""
+Structured (JSON schema) output for agents.
+
+With LLM_STRUCTURED_OUTPUT enabled, every agent that declares an output_schema asks
+the model for a single JSON object instead of markdown: the schema is appended to
+the prompt and the call is made in the provider's JSON mode. The reply is decoded
+and checked against the schema in one pass, and the agent builds its structured
+result - and the markdown shown to users - from the validated object. There is no
+line-by-line parsing, no fallback parser and no raw text kept alongside the result.
+
+A reply that does not match the schema fails the stage with StructuredOutputError
+and is not cached.
+
+Schemas use the small subset of JSON Schema the validator understands: type,
+properties, required, items, enum, minItems/maxItems and minimum/maximum.
+"""
+
+import os
+import json
+from typing import Dict, Any, Iterable, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "false").lower() in ("1", "true", "yes")
+
+# Provider generation settings for a JSON-only reply (Gemini JSON mode)
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+# Line that introduces the schema at the end of a structured prompt
+SCHEMA_MARKER = "Respond with a single JSON object, and nothing else, that conforms to this JSON schema:"
+
+class StructuredOutputError(ValueError):
+    """A structured reply that is not valid JSON or does not match the agent's schema."""
+    pass
+
+# --- Schema builders ---
+
+STRING = {"type": "string"}
+INTEGER = {"type": "integer"}
+
+def string_list(min_items: Optional[int] = None, max_items: Optional[int] = None) -> Dict[str, Any]:
+    return array_of(STRING, min_items, max_items)
+
+def array_of(items: Dict[str, Any], min_items: Optional[int] = None, max_items: Optional[int] = None) -> Dict[str, Any]:
+    schema = {"type": "array", "items": items}
+    if min_items is not None:
+        schema["minItems"] = min_items
+    if max_items is not None:
+        schema["maxItems"] = max_items
+    return schema
+
+def object_of(properties: Dict[str, Dict[str, Any]], optional: Iterable[str] = ()) -> Dict[str, Any]:
+    """Object schema in which every property not listed as optional is required."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": [name for name in properties if name not in optional],
+    }
+
+def one_of(*values: str) -> Dict[str, Any]:
+    return {"type": "string", "enum": list(values)}
+
+# --- Prompting and validation ---
+
+def schema_instructions(schema: Dict[str, Any]) -> str:
+    """Prompt suffix asking for a reply that matches the schema."""
+    return ("Instead of the markdown output format in your instructions, return the same content as JSON. "
+            f"{SCHEMA_MARKER}\n{json.dumps(schema)}")
+
+_TYPE_CHECKS = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+}
+
+def validate(instance: Any, schema: Dict[str, Any], path: str = "$") -> None:
+    """Check an instance against a schema; raises StructuredOutputError at the first mismatch."""
+    expected = schema.get("type")
+    if expected and not _TYPE_CHECKS[expected](instance):
+        raise StructuredOutputError(f"{path}: expected {expected}, got {type(instance).__name__}")
+    if "enum" in schema and instance not in schema["enum"]:
+        raise StructuredOutputError(f"{path}: {instance!r} is not one of {schema['enum']}")
+
+    if expected == "object":
+        for name in schema.get("required", ()):
+            if name not in instance:
+                raise StructuredOutputError(f"{path}: missing required property '{name}'")
+        for name, subschema in schema.get("properties", {}).items():
+            if name in instance:
+                validate(instance[name], subschema, f"{path}.{name}")
+    elif expected == "array":
+        if len(instance) < schema.get("minItems", 0):
+            raise StructuredOutputError(f"{path}: expected at least {schema['minItems']} items, got {len(instance)}")
+        if "maxItems" in schema and len(instance) > schema["maxItems"]:
+            raise StructuredOutputError(f"{path}: expected at most {schema['maxItems']} items, got {len(instance)}")
+        items = schema.get("items")
+        if items:
+            for index, item in enumerate(instance):
+                validate(item, items, f"{path}[{index}]")
+    elif expected in ("integer", "number"):
+        if "minimum" in schema and instance < schema["minimum"]:
+            raise StructuredOutputError(f"{path}: {instance} is below the minimum of {schema['minimum']}")
+        if "maximum" in schema and instance > schema["maximum"]:
+            raise StructuredOutputError(f"{path}: {instance} is above the maximum of {schema['maximum']}")
+
+def parse_structured_response(response: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Decode a JSON reply (tolerating a surrounding code fence) and validate it against the schema."""
+    text = response.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise StructuredOutputError(f"Reply is not valid JSON: {e}")
+    validate(data, schema)
+    return data
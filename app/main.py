@@ -4,9 +4,10 @@ import logging
 import os
 import time
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from types import MappingProxyType
+from typing import Dict, List, Optional, Any, Literal
 
-from fastapi import FastAPI, HTTPException, Request, Form, BackgroundTasks, status
+from fastapi import FastAPI, HTTPException, Request, Form, File, UploadFile, BackgroundTasks, status
 from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -23,7 +24,20 @@ import re
 import uvicorn
 
 from data.database_service import DatabaseService
-from app.agents.orchestrator_agent import OrchestratorAgent
+from app.agents.orchestrator_agent import OrchestratorAgent, AnalysisRun, AGENT_KEYS, get_orchestrator
+from app.core.llm import llm_pool
+from app.core.llm_cache import llm_cache
+from app.core.rate_limiter import llm_rate_limiter
+from app.core.concurrency import llm_concurrency
+from app.core.singleflight import llm_singleflight
+from app.core.priority import INTERACTIVE, API
+from app.core.admission import admission_controller
+from app.core.profiles import get_profile
+from app.core.condensation import context_condenser
+from app.core.streaming import stream_events_to
+from app.core.handoff import StageResult
+from app.core.jobs import analysis_workers, submit_analysis_job
+from app.core.bulk import BulkAnalysisRunner, parse_bulk_upload, BULK_MAX_CONCURRENT_ANALYSES
 # Authentication imports removed for direct access
 # Database imports removed for simplified access
 
@@ -233,6 +247,21 @@ async def startup_event():
     except Exception as e:
         print(f"Database connection test failed: {e}")
         print("⚠️ Some features may not work properly.")
+    
+    # Build the shared orchestrator (agents, database check) once, before the first request
+    get_orchestrator()
+    
+    # Background workers for queued analyses (ANALYSIS_WORKERS=0 leaves them to worker.py processes)
+    if analysis_workers.concurrency:
+        if analysis_workers.start():
+            print(f"✅ Started {analysis_workers.concurrency} analysis workers")
+        else:
+            print("⚠️ Analysis job queue unavailable; queued analyses will not run in this process")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers; their unfinished jobs are reclaimed when the lease expires"""
+    await analysis_workers.stop()
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -246,6 +275,9 @@ class AnalysisRequest(BaseModel):
     time_frame: str
     region: str
     prompt: Optional[str] = None
+    use_cache: Optional[bool] = True  # False forces fresh LLM calls for this request
+    deadline_seconds: Optional[float] = None  # overall time budget; capped by ANALYSIS_DEADLINE_SECONDS
+    profile: Optional[Literal["quick", "standard", "full"]] = None  # pipeline profile; PIPELINE_DEFAULT_PROFILE if unset
 
 class PDFRequest(BaseModel):
     analysis_data: Dict[str, Any]
@@ -450,156 +482,191 @@ async def use_template(template_id: int):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-async def stream_agent_outputs_realtime(orchestrator: OrchestratorAgent, input_data: Dict[str, Any], user_id: int = None):
-    """Stream agent outputs in real-time with database integration."""
-    try:
+# Work not done because the /analyze client went away before the pipeline finished
+stream_cancellation_stats = {
+    "cancelled_analyses": 0,
+    "agents_cancelled_in_flight": 0,
+    "agents_skipped": 0,
+    "llm_attempts_saved": 0,
+}
+
+async def stream_agent_outputs_realtime(orchestrator: OrchestratorAgent, input_data: Dict[str, Any], user_id: int = None,
+                                        run: Optional[AnalysisRun] = None):
+    """
+    Stream agent outputs in real-time with database integration.
+    Each NDJSON line is either a typed progress event
+    ({"event": "agent_started" | "delta" | "retry" | "section" | "agent_completed", "agent": name, ...})
+    or an agent's final structured result ({agent_name: result}), sent right after its agent_completed event.
+    Agents that stream sections send each completed section of their response as soon as it closes
+    ({"event": "section", "section": key, "index": n, "data": ...}), ahead of the final result.
+    Final {"event": "timeline", ...} and {"event": "budget", ...} lines report per-agent timing
+    (including the critical path) and the deadline and LLM attempts used.
+    If the client disconnects, all pending agent work is cancelled and the session is marked cancelled.
+    """
+    run = run or AnalysisRun(user_id=user_id)
+    budget = run.budget
+    # Events from the pipeline task (including token deltas) are drained by this generator
+    events: asyncio.Queue = asyncio.Queue()
+    pipeline_done = object()
+
+    # running / completed per agent, to account for the work a disconnect saves
+    agent_states: Dict[str, str] = {}
+
+    # Helper function to process agent, stream its progress and publish its result
+    async def process_agent(agent_name: str, current_input_data: Dict[str, Any]):
+        agent_instance = orchestrator.agents[agent_name]
+        started_at = time.time()
+        agent_states[agent_name] = "running"
+        events.put_nowait({"event": "agent_started", "agent": agent_name})
+
+        def forward_event(event: Dict[str, Any]):
+            events.put_nowait({**event, "agent": agent_name})
+
+        with stream_events_to(forward_event):
+            # Agents get a read-only view of the shared input data, not a copy
+            result = await orchestrator.rate_limited_process(agent_instance, MappingProxyType(current_input_data), agent_name, run)
+        agent_states[agent_name] = "completed"
+
+        # Ensure session_id and agent_result_id are included in the response
+        if run.session_id and 'session_id' not in result:
+            result['session_id'] = run.session_id
+        events.put_nowait({
+            "event": "agent_completed",
+            "agent": agent_name,
+            "status": result.get('status', 'unknown'),
+            "elapsed_seconds": round(time.time() - started_at, 2),
+            "degraded": run.degraded_stages.get(agent_name)
+        })
+        events.put_nowait({agent_name: result})
+        return result
+
+    async def run_pipeline():
+        try:
+            with orchestrator.run_scope(run):
+                await run_stages()
+        except asyncio.CancelledError:
+            record_cancellation()
+            raise
+        except Exception as e:
+            # Update session as failed
+            orchestrator._update_session_completion(run, "failed")
+            events.put_nowait({"error": str(e)})
+        finally:
+            events.put_nowait({"event": "budget", **budget.get_stats()})
+            events.put_nowait({"event": "profile", **run.profile.get_info(), "degraded_stages": run.degraded_stages})
+            events.put_nowait(pipeline_done)
+
+    def record_cancellation():
+        in_flight = [name for name, state in agent_states.items() if state == "running"]
+        skipped = [name for name in AGENT_KEYS if name not in agent_states]
+        # Every LLM call of the skipped and cut-off agents (fanned-out agents make several)
+        attempts_saved = sum(orchestrator.agents[name].llm_calls for name in skipped + in_flight)
+        stream_cancellation_stats["cancelled_analyses"] += 1
+        stream_cancellation_stats["agents_cancelled_in_flight"] += len(in_flight)
+        stream_cancellation_stats["agents_skipped"] += len(skipped)
+        stream_cancellation_stats["llm_attempts_saved"] += attempts_saved
+        print(f"Client disconnected: cancelled {in_flight}, skipped {len(skipped)} agents")
+        orchestrator._update_session_completion(run, "cancelled", details={
+            "agents_cancelled_in_flight": in_flight,
+            "agents_skipped": skipped,
+            "llm_attempts_used": budget.attempts,
+        })
+
+    async def run_stages():
         # Create database session at start with user_id
         input_data_with_user = input_data.copy()
         if user_id:
             input_data_with_user['user_id'] = user_id
-        orchestrator._create_analysis_session(input_data_with_user)
+        orchestrator._create_analysis_session(run, input_data_with_user)
         
-        # Cumulative input data for subsequent agents
+        # Cumulative input data for downstream agents; a resumed run republishes its stored results first
         cumulative_input_data = input_data.copy()
+        for agent_name, result in run.restored_results.items():
+            agent_states[agent_name] = "completed"
+            cumulative_input_data[AGENT_KEYS[agent_name]] = StageResult(AGENT_KEYS[agent_name], result)
+            events.put_nowait({agent_name: result})
         
-        # Agent names mapping
-        agent_names_map = {
-            "Problem Explorer": "problem_explorer",
-            "Best Practices": "best_practices", 
-            "Horizon Scanning": "horizon_scanning",
-            "Scenario Planning": "scenario_planning",
-            "Research Synthesis": "research_synthesis",
-            "Strategic Action": "strategic_action",
-            "High Impact": "high_impact",
-            "Backcasting": "backcasting"
-        }
-        
-        # Helper function to process agent and return result
-        async def process_agent(agent_name: str, current_input_data: Dict[str, Any]):
-            agent_instance = orchestrator.agents[agent_name]
-            result = await orchestrator.rate_limited_process(agent_instance, current_input_data.copy(), agent_name)
+        async def run_node(agent_name: str):
+            try:
+                result = await process_agent(agent_name, cumulative_input_data)
+            except Exception as e:
+                # Handle individual task errors
+                events.put_nowait({agent_name: f"Error: {str(e)}"})
+                raise
+            cumulative_input_data[AGENT_KEYS[agent_name]] = StageResult(AGENT_KEYS[agent_name], result)
             return result
         
-        # Stage 1: Problem Explorer
-        result = await process_agent("Problem Explorer", cumulative_input_data)
-        cumulative_input_data[agent_names_map["Problem Explorer"]] = result
-        # Ensure session_id and agent_result_id are included in the response
-        if orchestrator.current_session_id and 'session_id' not in result:
-            result['session_id'] = orchestrator.current_session_id
-        yield safe_json_dumps({"Problem Explorer": result}) + "\n"
-        
-        # Stage 2: Parallel agents (Best Practices, Horizon Scanning, Scenario Planning)
-        parallel_agents = ["Best Practices", "Horizon Scanning", "Scenario Planning"]
-        
-        # Create tasks with proper mapping
-        agent_tasks = {}
-        for agent_name in parallel_agents:
-            task = asyncio.create_task(process_agent(agent_name, cumulative_input_data))
-            agent_tasks[agent_name] = task
-        
-        # Process parallel agents and yield results as they complete
-        remaining_agents = set(parallel_agents)
-        
-        while remaining_agents:
-            # Wait for any task to complete
-            completed_tasks, pending_tasks = await asyncio.wait(
-                [agent_tasks[agent_name] for agent_name in remaining_agents],
-                return_when=asyncio.FIRST_COMPLETED
-            )
-            
-            # Process completed tasks
-            for completed_task in completed_tasks:
-                # Find which agent this task belongs to
-                completed_agent = None
-                for agent_name in remaining_agents:
-                    if agent_tasks[agent_name] == completed_task:
-                        completed_agent = agent_name
-                        break
-                
-                if completed_agent:
-                    try:
-                        result = await completed_task
-                        
-                        # Update cumulative data
-                        agent_key = agent_names_map[completed_agent]
-                        cumulative_input_data[agent_key] = result
-                        
-                        # Ensure session_id and agent_result_id are included in the response
-                        if orchestrator.current_session_id and 'session_id' not in result:
-                            result['session_id'] = orchestrator.current_session_id
-                        
-                        # Yield result with correct agent name
-                        yield safe_json_dumps({completed_agent: result}) + "\n"
-                        
-                        # Remove from remaining agents
-                        remaining_agents.remove(completed_agent)
-                        
-                    except Exception as task_error:
-                        # Handle individual task errors
-                        yield safe_json_dumps({completed_agent: f"Error: {str(task_error)}"}) + "\n"
-                        remaining_agents.remove(completed_agent)
-        
-        # Stage 3: Research Synthesis
-        result = await process_agent("Research Synthesis", cumulative_input_data)
-        cumulative_input_data[agent_names_map["Research Synthesis"]] = result
-        # Ensure session_id and agent_result_id are included in the response
-        if orchestrator.current_session_id and 'session_id' not in result:
-            result['session_id'] = orchestrator.current_session_id
-        yield safe_json_dumps({"Research Synthesis": result}) + "\n"
-        
-        # Stage 4: Strategic Action
-        result = await process_agent("Strategic Action", cumulative_input_data)
-        cumulative_input_data[agent_names_map["Strategic Action"]] = result
-        # Ensure session_id and agent_result_id are included in the response
-        if orchestrator.current_session_id and 'session_id' not in result:
-            result['session_id'] = orchestrator.current_session_id
-        yield safe_json_dumps({"Strategic Action": result}) + "\n"
-        
-        # Stage 5: High Impact
-        result = await process_agent("High Impact", cumulative_input_data)
-        cumulative_input_data[agent_names_map["High Impact"]] = result
-        # Ensure session_id and agent_result_id are included in the response
-        if orchestrator.current_session_id and 'session_id' not in result:
-            result['session_id'] = orchestrator.current_session_id
-        yield safe_json_dumps({"High Impact": result}) + "\n"
-        
-        # Stage 6: Backcasting
-        result = await process_agent("Backcasting", cumulative_input_data)
-        cumulative_input_data[agent_names_map["Backcasting"]] = result
-        # Ensure session_id and agent_result_id are included in the response
-        if orchestrator.current_session_id and 'session_id' not in result:
-            result['session_id'] = orchestrator.current_session_id
-        yield safe_json_dumps({"Backcasting": result}) + "\n"
+        # Each agent starts as soon as the outputs it consumes are ready and its result
+        # is published the moment it completes; failures do not stop downstream agents
+        scheduler = orchestrator.build_scheduler()
+        try:
+            await scheduler.run(run_node, skip_dependents_on_failure=False, completed=run.restored_results)
+        finally:
+            run.timeline = scheduler.get_timeline()
+            events.put_nowait({"event": "timeline", **run.timeline})
         
         # Update session completion status
-        orchestrator._update_session_completion("completed")
+        orchestrator._update_session_completion(run, "completed")
         
         # Yield session info
-        if orchestrator.current_session_id:
-            yield safe_json_dumps({
+        if run.session_id:
+            events.put_nowait({
                 "session_info": {
-                    "session_id": orchestrator.current_session_id,
+                    "session_id": run.session_id,
                     "status": "completed"
                 }
-            }) + "\n"
-            
-    except Exception as e:
-        # Update session as failed
-        orchestrator._update_session_completion("failed")
-        yield safe_json_dumps({"error": str(e)}) + "\n"
+            })
+
+    pipeline_task = asyncio.create_task(run_pipeline())
+    try:
+        while True:
+            event = await events.get()
+            if event is pipeline_done:
+                break
+            yield safe_json_dumps(event) + "\n"
+    finally:
+        # Closing the generator (client gone, server shutdown) cancels every pending agent,
+        # including the parallel Stage 2 tasks gathered by the pipeline
+        if not pipeline_task.done():
+            pipeline_task.cancel()
+
+async def admit_analysis(priority: str, input_data: Optional[Dict[str, Any]] = None) -> Optional[JSONResponse]:
+    """
+    Admission check for a new analysis. Returns None if it may start now. When LLM calls would
+    queue for longer than ADMISSION_MAX_QUEUE_WAIT_SECONDS, either raises 503 with Retry-After or,
+    with ADMISSION_OVERLOAD_ACTION=queue, hands the request to the job queue and returns a 202.
+    """
+    retry_after = admission_controller.check(priority)
+    if retry_after is None:
+        return None
+    headers = {"Retry-After": str(retry_after)}
+    if admission_controller.overload_action == "queue" and input_data is not None:
+        job_id = await asyncio.to_thread(submit_analysis_job, input_data)
+        if job_id is not None:
+            return JSONResponse({
+                "status": "queued",
+                "message": "Server busy; analysis queued as a background job",
+                "job_id": job_id,
+                "status_url": f"/api/jobs/{job_id}"
+            }, status_code=status.HTTP_202_ACCEPTED, headers=headers)
+    raise HTTPException(status_code=503, detail="Server busy, please retry later", headers=headers)
 
 @app.post("/analyze")
 async def analyze(request: AnalysisRequest):
+    # Convert request to dict
+    input_data = request.dict()
+    overloaded = await admit_analysis(INTERACTIVE, input_data)
+    if overloaded is not None:
+        return overloaded
     try:
-        # Initialize orchestrator
-        orchestrator = OrchestratorAgent()
-        
-        # Convert request to dict
-        input_data = request.dict()
+        # Shared orchestrator; per-analysis state lives in the run, whose deadline starts now
+        orchestrator = get_orchestrator()
+        profile = get_profile(request.profile)
+        run = AnalysisRun(budget=profile.new_budget(request.deadline_seconds), priority=INTERACTIVE, profile=profile)
         
         # Return real-time streaming response without user information
         return StreamingResponse(
-            stream_agent_outputs_realtime(orchestrator, input_data),
+            stream_agent_outputs_realtime(orchestrator, input_data, run=run),
             media_type="application/x-ndjson"
         )
         
@@ -609,26 +676,128 @@ async def analyze(request: AnalysisRequest):
 @app.post("/analyze-batch")
 async def analyze_batch(request: AnalysisRequest):
     """Process analysis and return all agent results at once (for home page)"""
+    # Convert request to dict
+    input_data = request.dict()
+    overloaded = await admit_analysis(API, input_data)
+    if overloaded is not None:
+        return overloaded
     try:
-        # Initialize orchestrator
-        orchestrator = OrchestratorAgent()
-        
-        # Convert request to dict
-        input_data = request.dict()
+        # Shared orchestrator; per-analysis state lives in the run, whose deadline starts now
+        orchestrator = get_orchestrator()
+        profile = get_profile(request.profile)
+        run = AnalysisRun(budget=profile.new_budget(request.deadline_seconds), priority=API, profile=profile)
         
         # Process all agents and return complete results
-        results = await orchestrator.process(input_data)
+        results = await orchestrator.process(input_data, run)
         
         # Return the complete analysis results
         return {
             "status": "success",
             "results": results,
-            "session_id": orchestrator.current_session_id
+            "session_id": run.session_id,
+            "profile": run.profile.name,
+            "degraded_stages": run.degraded_stages,
+            "llm_budget": run.budget.get_stats(),
+            "timeline": run.timeline
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analyze-bulk")
+async def analyze_bulk(http_request: Request, file: UploadFile = File(...),
+                       max_concurrent: int = Form(BULK_MAX_CONCURRENT_ANALYSES)):
+    """
+    Analyze every AnalysisRequest row of a JSONL or CSV upload through the shared orchestrator.
+    Streams NDJSON: a bulk_started event (including rows that failed validation), then per question
+    a question_completed event with its results and a progress event, and a final bulk_completed event.
+    """
+    try:
+        rows = parse_bulk_upload(await file.read(), file.filename)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    items = []
+    invalid_rows = []
+    for line, fields in rows:
+        try:
+            items.append((line, AnalysisRequest(**fields).dict()))
+        except ValueError as e:
+            invalid_rows.append({"line": line, "error": str(e)})
+    if not items:
+        raise HTTPException(status_code=400, detail={"message": "No valid analysis requests in upload",
+                                                     "invalid_rows": invalid_rows})
+    
+    # Clamped to BULK_CONCURRENCY_LIMIT; bulk_started reports the value used
+    runner = BulkAnalysisRunner(get_orchestrator(), max_concurrent=max_concurrent)
+    
+    async def stream_bulk():
+        yield safe_json_dumps({"event": "bulk_started", "total": len(items),
+                               "max_concurrent": runner.max_concurrent, "invalid_rows": invalid_rows}) + "\n"
+        async for event in runner.run(items, is_disconnected=http_request.is_disconnected):
+            yield safe_json_dumps(event) + "\n"
+        yield safe_json_dumps({"event": "bulk_completed", **runner.progress(0)}) + "\n"
+    
+    return StreamingResponse(stream_bulk(), media_type="application/x-ndjson")
+
+@app.post("/api/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(request: AnalysisRequest):
+    """Queue an analysis for the background workers; poll /api/jobs/{job_id} for progress"""
+    job_id = await asyncio.to_thread(submit_analysis_job, request.dict())
+    if job_id is None:
+        raise HTTPException(status_code=503, detail="Analysis job queue unavailable")
+    return {"status": "success", "job_id": job_id, "job_status": "queued"}
+
+@app.get("/api/jobs/stats")
+async def get_job_stats():
+    """Queue depth by status and the activity of this process's workers"""
+    queue = await asyncio.to_thread(DatabaseService.get_job_queue_stats)
+    return {"status": "success", "data": {"queue": queue, "workers": analysis_workers.get_stats()}}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: int):
+    """Status of a queued analysis"""
+    job = await asyncio.to_thread(DatabaseService.get_analysis_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "success", "data": job}
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: int):
+    """Results of a completed analysis job"""
+    job = await asyncio.to_thread(DatabaseService.get_analysis_job, job_id, True)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job['status'] != 'completed':
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job {job_id} is {job['status']}" + (f": {job['error_message']}" if job['error_message'] else "")
+        )
+    return {"status": "success", **job['result']}
+
+@app.get("/api/llm-stats")
+async def get_llm_stats():
+    """LLM layer usage statistics (client pool, response cache, call coalescing, rate and concurrency limiters, admission, context condensation)"""
+    return {
+        "status": "success",
+        "data": {
+            "client_pool": llm_pool.get_stats(),
+            "response_cache": llm_cache.get_stats(),
+            "singleflight": llm_singleflight.get_stats(),
+            "rate_limiter": llm_rate_limiter.get_stats(),
+            "concurrency": llm_concurrency.get_stats(),
+            "admission": admission_controller.get_stats(),
+            "context_condenser": context_condenser.get_stats(),
+            "stream_cancellations": stream_cancellation_stats
+        }
+    }
+
+@app.delete("/api/llm-cache")
+async def clear_llm_cache():
+    """Drop all cached LLM responses"""
+    await asyncio.to_thread(llm_cache.clear)
+    return {"status": "success", "message": "LLM response cache cleared"}
+
 @app.post("/generate-pdf")
 async def generate_pdf(request: PDFRequest):
     """Generate PDF report from analysis data"""
@@ -1248,5 +1417,56 @@ async def get_analysis_session(session_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch session details: {str(e)}")
 
+@app.post("/api/analysis-session/{session_id}/resume")
+async def resume_analysis_session(session_id: int, stream: bool = False):
+    """
+    Continue a failed or cancelled analysis: agents whose results are stored in the session
+    are reused, and only the failed or missing ones (and what depends on them) run again.
+    Pass ?stream=true for the same NDJSON stream as /analyze. Sessions that are still
+    processing or already completed are refused with 409.
+    """
+    priority = INTERACTIVE if stream else API
+    await admit_analysis(priority)
+    try:
+        orchestrator = get_orchestrator()
+        prepared = orchestrator.prepare_resume(session_id)
+        if prepared is None:
+            return JSONResponse({
+                "status": "error",
+                "message": "Session not found or database not available"
+            }, status_code=404)
+        input_data, run = prepared
+        # Only a failed or cancelled session may run its remaining agents again
+        if not orchestrator.claim_resume(run):
+            return JSONResponse({
+                "status": "error",
+                "message": f"Session {session_id} is {run.prior_status or 'in an unknown state'}; only failed or cancelled sessions can be resumed"
+            }, status_code=409)
+        run.priority = priority
+        reused_agents = list(run.restored_results)
+        rerun_agents = [agent_name for agent_name in AGENT_KEYS if agent_name not in run.restored_results]
+        
+        if stream:
+            return StreamingResponse(
+                stream_agent_outputs_realtime(orchestrator, input_data, run=run),
+                media_type="application/x-ndjson"
+            )
+        
+        results = await orchestrator.process(input_data, run)
+        return {
+            "status": "success",
+            "results": results,
+            "session_id": run.session_id,
+            "reused_agents": reused_agents,
+            "rerun_agents": rerun_agents,
+            "profile": run.profile.name,
+            "degraded_stages": run.degraded_stages,
+            "llm_budget": run.budget.get_stats(),
+            "timeline": run.timeline
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to resume session: {str(e)}")
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True) 
\ No newline at end of file
@@ -200,6 +200,47 @@ function updateAgentProgressStatus(agentName, status, progress = 0) {
     updateOverallProgress();
 }
 
+// Live text of agents whose LLM response is still streaming, per part
+// (agents that fan out into parallel calls tag each delta with its part)
+const streamingPreviews = {};
+
+// Handle typed progress events from the /analyze stream (agent_started, delta, retry, agent_completed)
+function handleStreamEvent(event) {
+    const agentName = event.agent;
+    if (!agentName) return;
+    
+    switch (event.event) {
+        case 'agent_started':
+            updateAgentProgressStatus(agentName, 'running');
+            break;
+        case 'retry':
+            streamingPreviews[agentName] = streamingPreviews[agentName] || {};
+            streamingPreviews[agentName][event.part || ''] = '';
+            break;
+        case 'delta': {
+            const parts = streamingPreviews[agentName] = streamingPreviews[agentName] || {};
+            const part = event.part || '';
+            parts[part] = (parts[part] || '') + (event.text || '');
+            const outputDiv = document.getElementById(`${agentName}Output`);
+            if (!outputDiv) break;
+            let preview = document.getElementById(`${agentName}StreamingPreview`);
+            if (!preview) {
+                outputDiv.innerHTML = '';
+                preview = document.createElement('div');
+                preview.id = `${agentName}StreamingPreview`;
+                preview.className = 'whitespace-pre-wrap text-sm text-gray-600';
+                outputDiv.appendChild(preview);
+            }
+            preview.textContent = Object.values(parts).join('\n\n');
+            break;
+        }
+        case 'agent_completed':
+            // The final structured result follows on the next line and replaces the preview
+            delete streamingPreviews[agentName];
+            break;
+    }
+}
+
 function updateOverallProgress() {
     const agentStatusList = document.getElementById('agentStatusList');
     if (!agentStatusList) return;
@@ -1362,6 +1403,13 @@ analysisForm.addEventListener('submit', async (e) => {
                 }
                 
                 const data = parseResult.data;
+                
+                // Typed progress events carry live status and partial text
+                if (data.event) {
+                    handleStreamEvent(data);
+                    continue;
+                }
+                
                 console.log('Received data:', data);
                 
                 // Check for session info
@@ -1428,7 +1476,18 @@ analysisForm.addEventListener('submit', async (e) => {
                         completedAgents++;
                         continue;
                     }
-                    
+
+                    // Stages dropped by the pipeline profile to stay within the deadline
+                    if (agentData && agentData.status === 'skipped') {
+                        updateAgentOutput(agentName, `<div class="text-gray-600 bg-gray-50 rounded-lg p-4 border border-gray-200">
+                            <strong class="font-semibold">Skipped</strong>
+                            <p class="text-sm">${(agentData.degraded && agentData.degraded.reason) || 'Not run for this analysis profile'}</p>
+                            </div>`);
+                        removeLoadingState(agentName);
+                        completedAgents++;
+                        continue;
+                    }
+
                     // Handle successful responses - both with and without nested data
                     if (agentData && (agentData.status === 'success' || agentData.data || agentData.formatted_output)) {
                         console.log(`Agent ${agentName} completed successfully`);
@@ -2574,6 +2633,11 @@ async function handleStreamingAnalysis(formData) {
 
 // Handle individual agent data from streaming response
 function handleAnalysisData(data) {
+    if (data.event) {
+        handleStreamEvent(data);
+        return;
+    }
+    
     // Each data object contains one agent's result
     for (const [agentName, agentData] of Object.entries(data)) {
         if (agentName === 'session_info') {
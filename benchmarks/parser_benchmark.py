@@ -0,0 +1,153 @@
+"""
+CPU benchmark of the agents' response parsers on large recorded responses.
+
+Usage:
+    python benchmarks/parser_benchmark.py --size-kb 200 --repeat 20
+    python benchmarks/parser_benchmark.py --max-ms-per-analysis 50
+    python benchmarks/parser_benchmark.py --scenario-kb 50
+
+Each response is recorded from the fake LLM backend (fixed seeds, so runs are
+comparable) and grown to the requested size by concatenating further recordings.
+The report gives the CPU time of each parser per response and in total per
+analysis, plus header recognition on its own: HeaderMatcher.scan over the whole
+response against testing every header on every line, and the Scenario Planning
+markdown fallback: the single-pass line rewrite against the chain of whole-text
+re.sub passes it replaced (on responses of --scenario-kb, checking that both give
+the same markdown). With --max-ms-per-analysis the script exits non-zero when
+parsing an analysis costs more, so it can guard against regressions.
+"""
+
+import os
+import sys
+import json
+import time
+import re
+import random
+import logging
+import argparse
+import statistics
+from pathlib import Path
+
+# Force the offline backend before any app module reads its configuration
+os.environ["LLM_BACKEND"] = "fake"
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.core.fake_llm import render_fake_response
+from app.agents.problem_explorer_agent import ProblemExplorerAgent
+from app.agents.research_synthesis_agent import ResearchSynthesisAgent, SECTION_HEADERS, SECTION_HEADER_MATCHER
+from app.agents.scenario_planning_agent import ScenarioPlanningAgent, format_raw_response
+
+# The parsers warn about every recorded response they cannot structure
+logging.disable(logging.WARNING)
+
+# (name, agent class, parse routine) for every parser measured per analysis
+PARSERS = [
+    ("Problem Explorer", ProblemExplorerAgent, lambda agent, text: agent._parse_sections(text)),
+    ("Research Synthesis", ResearchSynthesisAgent, lambda agent, text: agent._parse_sections(text)),
+    ("Scenario Planning", ScenarioPlanningAgent, lambda agent, text: agent.format_output({
+        "structured_scenarios": agent._parse_multi_framework_scenarios(text), "raw_response": text})),
+]
+
+PROMPT = "Strategic Question: How should a mid-sized utility prepare for distributed energy storage?"
+
+def record_response(agent, size_kb: int) -> str:
+    """Fake responses for the agent's prompt, concatenated to at least size_kb."""
+    parts, size, seed = [], 0, 0
+    while size < size_kb * 1024:
+        text = render_fake_response(agent.system_prompt, PROMPT, random.Random(seed))
+        parts.append(text)
+        size += len(text) + 1
+        seed += 1
+    return "\n".join(parts)
+
+def cpu_ms(function, repeat: int):
+    """CPU milliseconds of each of `repeat` calls."""
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        function()
+        timings.append((time.process_time() - start) * 1000)
+    return timings
+
+def per_line_scan(lines):
+    """The header test the parsers made before HeaderMatcher.scan."""
+    for line in lines:
+        for header in SECTION_HEADERS:
+            if header in line:
+                break
+
+def regex_chain(text):
+    """The Scenario Planning markdown fallback before format_raw_response."""
+    flags = re.MULTILINE | re.IGNORECASE
+    text = re.sub(r'^\s*\d+\.\s*(GBN Framework)', r'# **\1**', text, flags=flags)
+    text = re.sub(r'^\s*\d+\.\s*(Change Progression Model)', r'# **\1**', text, flags=flags)
+    text = re.sub(r'^\s*(\*\*?Synthesis of scenarios:\*\*?)', r'# **Synthesis of Scenarios**', text, flags=flags)
+    text = re.sub(r'^\s*(\*\*?Key strategic insights.+:\*\*?)', r'# **Key Strategic Insights and Early Warning Indicators**', text, flags=flags)
+    text = re.sub(r'^\s*(?:[\*\-]\s*)?title:\s*\*\*(.*)\*\*', r'## **\1**', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*(?:[\*\-]\s*)?title:\s*(.*)', r'## **\1**', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*(?:[\*\-]\s*)?(matrix_position:)', r'**\1**', text, flags=flags)
+    text = re.sub(r'^\s*(?:[\*\-]\s*)?(level:)', r'**\1**', text, flags=flags)
+    text = re.sub(r'^\s*(?:[\*\-]\s*)?(description:)', r'**\1**', text, flags=flags)
+    return text
+
+def main(size_kb: int, repeat: int, max_ms: float, scenario_kb: int) -> int:
+    parsers = {}
+    total_ms = 0.0
+    for name, agent_class, parse in PARSERS:
+        agent = agent_class()
+        response = record_response(agent, size_kb)
+        timings = cpu_ms(lambda: parse(agent, response), repeat)
+        mean = statistics.mean(timings)
+        total_ms += mean
+        parsers[name] = {
+            "response_kb": round(len(response) / 1024, 1),
+            "lines": response.count("\n") + 1,
+            "cpu_ms_mean": round(mean, 3),
+            "cpu_ms_max": round(max(timings), 3),
+        }
+
+    lines = [line.strip() for line in record_response(ResearchSynthesisAgent(), size_kb).split("\n")]
+    per_line = statistics.mean(cpu_ms(lambda: per_line_scan(lines), repeat))
+    scanned = statistics.mean(cpu_ms(lambda: SECTION_HEADER_MATCHER.scan(lines), repeat))
+
+    scenario = record_response(ScenarioPlanningAgent(), scenario_kb)
+    chained = statistics.mean(cpu_ms(lambda: regex_chain(scenario), repeat))
+    single_pass = statistics.mean(cpu_ms(lambda: format_raw_response(scenario), repeat))
+    report = {
+        "size_kb": size_kb,
+        "repeat": repeat,
+        "parsers": parsers,
+        "cpu_ms_per_analysis": round(total_ms, 3),
+        "header_recognition": {
+            "lines": len(lines),
+            "headers": len(SECTION_HEADERS),
+            "per_line_cpu_ms": round(per_line, 3),
+            "scan_cpu_ms": round(scanned, 3),
+            "speedup": round(per_line / scanned, 2) if scanned else None,
+        },
+        "scenario_formatting": {
+            "response_kb": round(len(scenario) / 1024, 1),
+            "regex_chain_cpu_ms": round(chained, 3),
+            "single_pass_cpu_ms": round(single_pass, 3),
+            "speedup": round(chained / single_pass, 2) if single_pass else None,
+            "identical": regex_chain(scenario) == format_raw_response(scenario),
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+    if max_ms is not None and total_ms > max_ms:
+        print(f"Parsing took {total_ms:.1f} ms of CPU per analysis, above the {max_ms:.1f} ms limit", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark agent response parsers on large recorded responses")
+    parser.add_argument("--size-kb", type=int, default=200, help="size each recorded response is grown to")
+    parser.add_argument("--repeat", type=int, default=10, help="timed parses per response")
+    parser.add_argument("--scenario-kb", type=int, default=50, help="size of the Scenario Planning formatting response")
+    parser.add_argument("--max-ms-per-analysis", type=float, default=None,
+                        help="exit non-zero if parsing one analysis takes more CPU than this")
+    args = parser.parse_args()
+    sys.exit(main(args.size_kb, args.repeat, args.max_ms_per_analysis, args.scenario_kb))
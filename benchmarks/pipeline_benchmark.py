@@ -0,0 +1,106 @@
+"""
+Hermetic end-to-end benchmark of the agent pipeline using the fake LLM backend.
+
+Usage:
+    python benchmarks/pipeline_benchmark.py --runs 20 --concurrency 5
+
+Latency and failure injection are controlled with the FAKE_LLM_* environment
+variables documented in app/core/fake_llm.py. No GOOGLE_API_KEY is needed; database
+writes happen only if the configured database is reachable.
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+# Force the offline backend before any app module reads its configuration
+os.environ["LLM_BACKEND"] = "fake"
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("LLM_RATE_LIMIT_RPM", "100000")
+os.environ.setdefault("LLM_RATE_LIMIT_BURST", "100000")
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.agents.orchestrator_agent import AnalysisRun, get_orchestrator
+from app.core.llm import llm_pool
+from app.core.llm_cache import llm_cache
+from app.core.rate_limiter import llm_rate_limiter
+from app.core.concurrency import llm_concurrency
+from app.core.singleflight import llm_singleflight
+from app.core.condensation import context_condenser
+
+QUESTIONS = [
+    "How should a mid-sized utility prepare for distributed energy storage?",
+    "What is the best strategy for regional hospitals adopting AI diagnostics?",
+    "How can port cities remain competitive as shipping routes shift?",
+    "How should universities respond to the rise of micro-credentials?",
+]
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run_one(index: int, semaphore: asyncio.Semaphore):
+    async with semaphore:
+        run = AnalysisRun()
+        input_data = {
+            "strategic_question": QUESTIONS[index % len(QUESTIONS)],
+            "time_frame": "5 years",
+            "region": "Europe",
+            "prompt": "",
+        }
+        start = time.perf_counter()
+        results = await get_orchestrator().process(input_data, run)
+        elapsed = time.perf_counter() - start
+        ok = results.get("status") != "error"
+        return elapsed, ok, run.budget.get_stats()
+
+async def main(runs: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*[run_one(i, semaphore) for i in range(runs)])
+    wall_time = time.perf_counter() - start
+
+    latencies = [elapsed for elapsed, _, _ in outcomes]
+    succeeded = sum(1 for _, ok, _ in outcomes if ok)
+    attempts = [budget["attempts"] for _, _, budget in outcomes]
+    report = {
+        "runs": runs,
+        "concurrency": concurrency,
+        "succeeded": succeeded,
+        "wall_time_seconds": round(wall_time, 3),
+        "analyses_per_minute": round(runs / wall_time * 60, 2) if wall_time else None,
+        "latency_seconds": {
+            "mean": round(statistics.mean(latencies), 3),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "max": round(max(latencies), 3),
+        },
+        "llm_attempts_per_analysis": {
+            "mean": round(statistics.mean(attempts), 2),
+            "max": max(attempts),
+        },
+        "llm": {
+            "client_pool": llm_pool.get_stats(),
+            "response_cache": llm_cache.get_stats(),
+            "singleflight": llm_singleflight.get_stats(),
+            "rate_limiter": llm_rate_limiter.get_stats(),
+            "concurrency": llm_concurrency.get_stats(),
+            "context_condenser": context_condenser.get_stats(),
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline against the fake LLM backend")
+    parser.add_argument("--runs", type=int, default=10, help="number of full analyses to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="analyses running at the same time")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.concurrency))
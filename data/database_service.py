@@ -8,10 +8,10 @@ from psycopg2.extras import RealDictCursor
 from psycopg2 import sql
 import json
 
-from data.database_config import get_db_session, close_db_session, get_db_connection
+from data.database_config import get_db_session, close_db_session, get_db_connection, engine
 from data.models import (
     AnalysisSession, AgentResult, AnalysisTemplate, 
-    SystemLog, AgentPerformance, AgentRating, AgentRatingSummary
+    SystemLog, AgentPerformance, AgentRating, AgentRatingSummary, AnalysisJob
 )
 
 logger = logging.getLogger(__name__)
@@ -94,6 +94,28 @@ class DatabaseService:
         finally:
             close_db_session(session)
     
+    @staticmethod
+    def reopen_analysis_session(session_id: int, from_statuses: List[str]) -> bool:
+        """
+        Mark a session as processing again, but only if its status is one of from_statuses.
+        Returns False if it is not (e.g. another request already resumed it).
+        """
+        session = get_db_session()
+        try:
+            updated = session.query(AnalysisSession).filter(
+                AnalysisSession.id == session_id,
+                AnalysisSession.status.in_(from_statuses)
+            ).update({AnalysisSession.status: 'processing'}, synchronize_session=False)
+            session.commit()
+            return updated > 0
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to reopen analysis session: {str(e)}")
+            return False
+        finally:
+            close_db_session(session)
+    
     @staticmethod
     def save_agent_result(
         session_id: int,
@@ -166,6 +188,268 @@ class DatabaseService:
         finally:
             close_db_session(session)
     
+    @staticmethod
+    def get_completed_agent_results(session_id: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the latest successful structured output of each agent in a session,
+        keyed by agent name. Used to resume a failed or cancelled analysis.
+        """
+        session = get_db_session()
+        try:
+            agent_results = session.query(AgentResult).filter(
+                AgentResult.session_id == session_id,
+                AgentResult.status == 'completed'
+            ).order_by(AgentResult.created_at).all()
+            
+            # Later rows win, so a stage that was re-run replaces its earlier output
+            return {
+                agent_result.agent_name: agent_result.structured_data
+                for agent_result in agent_results
+                if isinstance(agent_result.structured_data, dict)
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to get completed agent results: {str(e)}")
+            return {}
+        finally:
+            close_db_session(session)
+    
+    # --- Background analysis jobs ---
+    
+    @staticmethod
+    def ensure_analysis_jobs_table() -> bool:
+        """
+        Create the analysis_jobs table if it does not exist yet.
+        """
+        try:
+            AnalysisJob.__table__.create(bind=engine, checkfirst=True)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to create analysis_jobs table: {str(e)}")
+            return False
+    
+    @staticmethod
+    def enqueue_analysis_job(payload: Dict[str, Any], max_attempts: int = 3) -> Optional[int]:
+        """
+        Add an analysis to the job queue.
+        Returns the job ID if successful, None if failed.
+        """
+        session = get_db_session()
+        try:
+            job = AnalysisJob(payload=payload, status='queued', attempts=0, max_attempts=max_attempts)
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            
+            logger.info(f"Queued analysis job {job.id}")
+            return job.id
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to enqueue analysis job: {str(e)}")
+            return None
+        finally:
+            close_db_session(session)
+    
+    @staticmethod
+    def claim_analysis_job(worker_id: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next runnable job: a queued job whose backoff has elapsed, or a running
+        job whose worker stopped renewing its lease. SKIP LOCKED lets many workers poll
+        the same table without blocking on (or double-claiming) each other's rows.
+        """
+        session = get_db_session()
+        try:
+            now = func.now()
+            job = session.query(AnalysisJob).filter(
+                or_(
+                    and_(AnalysisJob.status == 'queued', AnalysisJob.available_at <= now),
+                    and_(AnalysisJob.status == 'running', AnalysisJob.lease_expires_at < now)
+                )
+            ).order_by(AnalysisJob.available_at, AnalysisJob.id).with_for_update(skip_locked=True).first()
+            
+            if not job:
+                session.commit()
+                return None
+            
+            if job.attempts >= job.max_attempts:
+                # Its last worker died mid-run and no attempts are left
+                job.status = 'failed'
+                job.error_message = job.error_message or "Worker lease expired"
+                job.completed_at = datetime.utcnow()
+                session.commit()
+                logger.warning(f"Analysis job {job.id} failed after {job.attempts} attempts")
+                return None
+            
+            job.status = 'running'
+            job.attempts = (job.attempts or 0) + 1
+            job.worker_id = worker_id
+            job.lease_expires_at = now + timedelta(seconds=lease_seconds)
+            if not job.started_at:
+                job.started_at = datetime.utcnow()
+            session.commit()
+            session.refresh(job)
+            return job.to_dict()
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to claim analysis job: {str(e)}")
+            return None
+        finally:
+            close_db_session(session)
+    
+    @staticmethod
+    def renew_job_lease(job_id: int, worker_id: str, lease_seconds: int) -> bool:
+        """
+        Extend a running job's lease. Returns False if the worker no longer holds it.
+        """
+        session = get_db_session()
+        try:
+            updated = session.query(AnalysisJob).filter(
+                AnalysisJob.id == job_id,
+                AnalysisJob.worker_id == worker_id,
+                AnalysisJob.status == 'running'
+            ).update(
+                {AnalysisJob.lease_expires_at: func.now() + timedelta(seconds=lease_seconds)},
+                synchronize_session=False
+            )
+            session.commit()
+            return updated > 0
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to renew job lease: {str(e)}")
+            # Keep working; the lease only lapses if renewals keep failing
+            return True
+        finally:
+            close_db_session(session)
+    
+    @staticmethod
+    def set_analysis_job_session(job_id: int, worker_id: str, session_id: int) -> bool:
+        """
+        Record the analysis session a running job works in, so a worker that takes the
+        job over after this one dies resumes it. Returns False if the worker no longer holds it.
+        """
+        session = get_db_session()
+        try:
+            updated = session.query(AnalysisJob).filter(
+                AnalysisJob.id == job_id,
+                AnalysisJob.worker_id == worker_id,
+                AnalysisJob.status == 'running'
+            ).update({AnalysisJob.session_id: session_id}, synchronize_session=False)
+            session.commit()
+            return updated > 0
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to record analysis job session: {str(e)}")
+            return False
+        finally:
+            close_db_session(session)
+    
+    @staticmethod
+    def complete_analysis_job(
+        job_id: int, 
+        worker_id: str, 
+        result: Dict[str, Any], 
+        session_id: Optional[int] = None
+    ) -> bool:
+        """
+        Store a job's result and mark it completed.
+        """
+        session = get_db_session()
+        try:
+            job = session.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            if not job or job.worker_id != worker_id:
+                logger.warning(f"Analysis job {job_id} is no longer leased by {worker_id}")
+                return False
+            
+            job.status = 'completed'
+            job.result = result
+            job.session_id = session_id or job.session_id
+            job.error_message = None
+            job.lease_expires_at = None
+            job.completed_at = datetime.utcnow()
+            session.commit()
+            return True
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to complete analysis job: {str(e)}")
+            return False
+        finally:
+            close_db_session(session)
+    
+    @staticmethod
+    def fail_analysis_job(
+        job_id: int, 
+        worker_id: str, 
+        error_message: str, 
+        session_id: Optional[int] = None,
+        retry_delay: int = 30
+    ) -> Optional[str]:
+        """
+        Record a failed attempt. The job is queued again after retry_delay seconds
+        while attempts remain, otherwise marked failed. Returns the new status.
+        """
+        session = get_db_session()
+        try:
+            job = session.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            if not job or job.worker_id != worker_id:
+                logger.warning(f"Analysis job {job_id} is no longer leased by {worker_id}")
+                return None
+            
+            job.error_message = error_message
+            job.session_id = session_id or job.session_id
+            job.lease_expires_at = None
+            if job.attempts < job.max_attempts:
+                job.status = 'queued'
+                job.available_at = func.now() + timedelta(seconds=retry_delay)
+            else:
+                job.status = 'failed'
+                job.completed_at = datetime.utcnow()
+            session.commit()
+            return job.status
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to record analysis job failure: {str(e)}")
+            return None
+        finally:
+            close_db_session(session)
+    
+    @staticmethod
+    def get_analysis_job(job_id: int, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's status (and optionally its result).
+        """
+        session = get_db_session()
+        try:
+            job = session.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            return job.to_dict(include_result=include_result) if job else None
+            
+        except Exception as e:
+            logger.error(f"Failed to get analysis job: {str(e)}")
+            return None
+        finally:
+            close_db_session(session)
+    
+    @staticmethod
+    def get_job_queue_stats() -> Dict[str, int]:
+        """
+        Number of jobs per status.
+        """
+        session = get_db_session()
+        try:
+            rows = session.query(AnalysisJob.status, func.count(AnalysisJob.id)).group_by(AnalysisJob.status).all()
+            return {status: count for status, count in rows}
+            
+        except Exception as e:
+            logger.error(f"Failed to get job queue stats: {str(e)}")
+            return {}
+        finally:
+            close_db_session(session)
+    
     @staticmethod
     def get_agent_result_by_id(agent_result_id: int) -> Optional[Dict[str, Any]]:
         """
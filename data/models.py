@@ -57,7 +57,7 @@ class AnalysisSession(Base):
     time_frame = Column(String(50))
     region = Column(String(100))
     additional_instructions = Column(Text)
-    status = Column(String(50), default='processing')  # processing, completed, failed
+    status = Column(String(50), default='processing')  # processing, completed, failed, cancelled
     total_processing_time = Column(Float)  # in seconds
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True))
@@ -313,4 +313,47 @@ class AgentRatingSummary(Base):
                 '2': self.two_star_count,
                 '1': self.one_star_count
             }
-        } 
\ No newline at end of file
+        } 
+
+
+class AnalysisJob(Base):
+    """
+    Background analysis jobs.
+    Durable queue consumed by the analysis worker pool (app/core/jobs.py).
+    """
+    __tablename__ = 'analysis_jobs'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String(50), default='queued', index=True)  # queued, running, completed, failed
+    payload = Column(JSON, nullable=False)  # analysis request (strategic_question, time_frame, region, ...)
+    result = Column(JSON)  # orchestrator results once completed
+    error_message = Column(Text)  # last error, kept across retries
+    session_id = Column(Integer, ForeignKey('analysis_sessions.id'), nullable=True)  # resumed on retry
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    worker_id = Column(String(100))  # worker holding the lease
+    lease_expires_at = Column(DateTime(timezone=True))  # expired leases are reclaimed by other workers
+    available_at = Column(DateTime(timezone=True), server_default=func.now())  # not claimed before this (retry backoff)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
+    
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        data = {
+            'id': self.id,
+            'status': self.status,
+            'payload': self.payload,
+            'error_message': self.error_message,
+            'session_id': self.session_id,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'worker_id': self.worker_id,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+        if include_result:
+            data['result'] = self.result
+        return data
@@ -0,0 +1,19 @@
+import os
+import asyncio
+import argparse
+import logging
+from app.core.jobs import AnalysisWorkerPool, ANALYSIS_WORKERS
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background analysis workers")
+    parser.add_argument("--workers", type=int, default=max(ANALYSIS_WORKERS, 1),
+                        help="number of concurrent analyses in this process")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    
+    # Run the workers until interrupted; unfinished jobs are reclaimed when their lease expires
+    try:
+        asyncio.run(AnalysisWorkerPool(args.workers).run_forever())
+    except KeyboardInterrupt:
+        pass